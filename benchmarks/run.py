@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+"""
+Offline benchmarks of document generation. Every schema is on disk, so no network is used:
+
+  schemas/hca        HCA-style bundle schemas split over core, module and type files joined by relative `$ref`s.
+  schemas/synthetic  the synthetic schemas of test/test_jsongenerator.py.
+  stress schemas     built below: a wide oneOf, deep and recursive nesting, large uniqueItems and heavy patterns.
+
+Each case generates a fixed number of documents with a fixed seed and measures the documents per second and the p50 and
+p99 latency per document of the fastest of a few runs, and the peak memory traced while generating. Results are compared
+to benchmarks/baseline.json and the run exits with status 1 if a case got slower or uses more memory than the tolerance
+allows. Baselines are machine specific, so record one with --save on the machine that runs the comparison.
+
+    python benchmarks/run.py                  # run and compare to the baseline
+    python benchmarks/run.py --save           # run and store the results as the baseline
+    python benchmarks/run.py -k hca --quick   # a tenth of the documents, only cases matching 'hca'
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from functools import partial
+from random import Random
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsonschema import RefResolver
+
+from jsongen import columnar
+from jsongen.generator import JsonGenerator
+from jsongen.hca_generator import HCAJsonGenerator
+
+here = os.path.dirname(os.path.abspath(__file__))
+default_baseline = os.path.join(here, 'baseline.json')
+# The analysis schema references itself and core.json by their published URLs, so both are served from disk.
+hca_remote = 'https://raw.githubusercontent.com/HumanCellAtlas/metadata-schema/4.6.1/json_schema/'
+hca_bundles = ['project.json', 'biomaterial.json', 'protocol.json', 'submission.json', 'ingest_audit.json']
+# Metrics that fail the comparison when worse than the baseline by more than the tolerance, with the sign of worse.
+# Latencies are reported but not checked, they follow throughput and are noisier.
+checked = {'docs_per_sec': -1, 'peak_kib': 1}
+timings = {'docs_per_sec', 'p50_ms', 'p99_ms'}
+
+
+def load(*path: str) -> dict:
+    with open(os.path.join(here, 'schemas', *path)) as fh:
+        return json.load(fh)
+
+
+def hca_urls() -> List[str]:
+    directory = os.path.join(here, 'schemas', 'hca', 'bundle')
+    return ['file://' + os.path.join(directory, name) for name in hca_bundles]
+
+
+def wide_one_of(width: int=50) -> dict:
+    """An object that is one of width variants, told apart by their kind."""
+    return {'type': 'object', 'required': ['id'], 'properties': {'id': {'type': 'integer', 'minimum': 0}},
+            'oneOf': [{'required': ['kind', f'field_{i}'], 'additionalProperties': False,
+                       'properties': {'id': {'type': 'integer', 'minimum': 0},
+                                      'kind': {'type': 'string', 'enum': [f'kind_{i}']},
+                                      f'field_{i}': {'type': 'string', 'maxLength': 20},
+                                      f'count_{i}': {'type': 'integer', 'minimum': i, 'maximum': 100 + i}}}
+                      for i in range(width)]}
+
+
+def deep_nesting(depth: int=24) -> dict:
+    """Objects nested depth levels deep, every level required."""
+    schema = {'type': 'object', 'required': ['value'], 'properties': {'value': {'type': 'string', 'maxLength': 8}}}
+    for level in range(depth):
+        schema = {'type': 'object', 'required': ['level', 'child'],
+                  'properties': {'level': {'type': 'integer', 'enum': [level]}, 'child': schema,
+                                 'note': {'type': 'string', 'maxLength': 16}}}
+    return schema
+
+
+def recursive_tree() -> dict:
+    """A tree of nodes through a recursive `$ref`, bounded by max_depth."""
+    return {'$ref': '#/definitions/node', 'definitions': {'node': {
+        'type': 'object', 'required': ['value'],
+        'properties': {'value': {'type': 'integer'},
+                       'children': {'type': 'array', 'maxItems': 3, 'items': {'$ref': '#/definitions/node'}}}}}}
+
+
+def large_unique(size: int=2000) -> dict:
+    """A uniqueItems array of objects too many to enumerate."""
+    return {'type': 'array', 'uniqueItems': True, 'minItems': size, 'maxItems': size,
+            'items': {'type': 'object', 'required': ['id', 'name'], 'additionalProperties': False,
+                      'properties': {'id': {'type': 'integer', 'minimum': 0, 'maximum': 10 ** 9},
+                                     'name': {'type': 'string', 'pattern': '^[a-z]{4,12}$'}}}}
+
+
+def heavy_patterns() -> dict:
+    """Strings drawn from long and alternating patterns, and pattern properties."""
+    patterns = {
+        'uuid': '^[a-f0-9]{8}-[a-f0-9]{4}-4[a-f0-9]{3}-[89ab][a-f0-9]{3}-[a-f0-9]{12}$',
+        'ipv4': '^((25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])\\.){3}(25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])$',
+        'address': '^[a-z0-9._%+-]{1,20}@([a-z0-9-]{1,12}\\.){1,3}(com|org|net|edu|io)$',
+        'accession': '^(SRR|ERR|DRR)[0-9]{6,9}(_[12])?$',
+        'sequence': '^[ACGT]{50,150}$',
+        'words': '^([A-Z][a-z]{2,9} ){3,8}[A-Z][a-z]{2,9}\\.$',
+        'version': '^v?[0-9]{1,3}\\.[0-9]{1,3}\\.[0-9]{1,3}(-(alpha|beta|rc)\\.[0-9]{1,2})?$',
+        'iso': '^[0-9]{4}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])T([01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]Z$'}
+    return {'type': 'object', 'required': sorted(patterns), 'additionalProperties': False, 'minProperties': 12,
+            'properties': {name: {'type': 'string', 'pattern': pattern} for name, pattern in patterns.items()},
+            'patternProperties': {'^x-[a-z]{3,8}$': {'type': 'string', 'pattern': '^[A-Z0-9]{8}$'}}}
+
+
+def schemas() -> Dict[str, dict]:
+    return {'synthetic/analysis': load('synthetic', 'analysis.json'),
+            'synthetic/compile': load('synthetic', 'compile.json'),
+            'synthetic/simple_object': load('synthetic', 'simple_object.json'),
+            'stress/wide_one_of': wide_one_of(),
+            'stress/deep_nesting': deep_nesting(),
+            'stress/recursive_tree': recursive_tree(),
+            'stress/large_unique': large_unique(),
+            'stress/heavy_patterns': heavy_patterns()}
+
+
+class Case(object):
+    """A benchmark: documents() returns an iterator of n documents, whose yields are timed."""
+
+    def __init__(self, name: str, n: int, documents: Callable[[int], Iterator], batch: int=1,
+                 latency: bool=True) -> None:
+        """
+        :param name: the name of the case, as '<mode>:<schema>'.
+        :param n: the number of documents generated.
+        :param documents: called with n, returns an iterator of n documents. Setup, like compiling the schema, is done
+        before the iterator is returned so it isn't timed.
+        :param batch: the number of documents per yield, for modes that generate in batches.
+        :param latency: False for modes that yield documents in chunks of their own, whose latency isn't measured.
+        """
+        self.name = name
+        self.n = n
+        self.documents = documents
+        self.batch = batch
+        self.latency = latency
+
+
+def repeat(generate: Callable[[], Any], n: int) -> Iterator:
+    return (generate() for _ in range(n))
+
+
+def json_generator(schema: dict, seed: int, validation: str, **kwargs) -> JsonGenerator:
+    """A generator with the schema compiled, so compiling isn't timed."""
+    store = {hca_remote + 'analysis.json': load('synthetic', 'analysis.json'),
+             hca_remote + 'core.json': load('synthetic', 'core.json')}
+    generator = JsonGenerator(resolver=RefResolver.from_schema(schema, store=store), seed=seed, validation=validation,
+                              **kwargs)
+    generator.generate_json(schema)
+    return generator
+
+
+def json_cases(seed: int, validation: str) -> List[Case]:
+    cases = []
+    counts = {'synthetic/analysis': 500, 'stress/deep_nesting': 500, 'stress/recursive_tree': 500,
+              'stress/large_unique': 10, 'stress/heavy_patterns': 500}
+    options = {'stress/recursive_tree': {'max_depth': 8}}
+    for name, schema in schemas().items():
+        count = counts.get(name, 1000)
+
+        def prepare(schema=schema, name=name):
+            return json_generator(schema, seed, validation, **options.get(name, {}))
+
+        cases.append(Case('generate_json:' + name, count, lambda n, schema=schema, prepare=prepare:
+                          repeat(partial(prepare().generate_json, schema), n)))
+        cases.append(Case('generate_many:' + name, count, lambda n, schema=schema, prepare=prepare:
+                          prepare().generate_many(schema, n)))
+        if name in ('synthetic/analysis', 'stress/wide_one_of'):
+            cases.append(Case('generate_parallel:' + name, count * 2, lambda n, schema=schema, prepare=prepare:
+                              prepare().generate_parallel(schema, n, workers=2, seed=seed), latency=False))
+        if name in ('synthetic/compile', 'synthetic/simple_object') and columnar.np is not None:
+            # documents are generated 500 at a time, so latency is per document averaged over each batch
+            cases.append(Case('generate_columns:' + name, count * 5, lambda n, schema=schema, prepare=prepare:
+                              repeat(partial(prepare().generate_columns, schema, 500), n // 500), batch=500))
+    return cases
+
+
+def hca_cases(seed: int, validation: str) -> List[Case]:
+    cases = []
+    for bundle in hca_bundles:
+        def prepare(bundle=bundle):
+            generator = HCAJsonGenerator(hca_urls(), validation=validation, seed=seed)
+            generator.generate(bundle)
+            return generator
+
+        cases.append(Case('hca_generate:' + bundle, 250, lambda n, bundle=bundle, prepare=prepare:
+                          repeat(partial(prepare().generate, bundle), n)))
+    cases.append(Case('hca_generate_parallel:*', 500, lambda n: HCAJsonGenerator(
+        hca_urls(), validation=validation, seed=seed).generate_parallel(n=n, workers=2, seed=seed), latency=False))
+    return cases
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def calibrate(repeat: int=5) -> float:
+    """
+    Times a fixed workload of the interpreter operations generation relies on. Timings are compared in units of this,
+    so a baseline still applies when the machine is busier or slower than when it was recorded.
+
+    :return: the fastest time of the workload, in seconds.
+    """
+    def workload():
+        rng = Random(0)
+        documents = []
+        for i in range(2000):
+            document = {'id': i, 'name': ''.join(rng.choice('abcdef') for _ in range(8)), 'tags': []}
+            for _ in range(rng.randint(0, 4)):
+                document['tags'].append(rng.random())
+            documents.append(document)
+        return len(json.dumps(documents))
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        workload()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def timed(case: Case, n: int) -> Tuple[float, List[float]]:
+    """:return: the time to generate n documents and the latency of each."""
+    gc.collect()
+    documents = case.documents(n)
+    latencies = []
+    start = last = perf_counter()
+    for _ in documents:
+        now = perf_counter()
+        latencies.append((now - last) / case.batch)
+        last = now
+    return last - start, latencies
+
+
+def measure(case: Case, scale: float, repeat: int) -> dict:
+    """
+    Times case repeat times and keeps the fastest run, which is the least disturbed by other processes, then runs it
+    once more under tracemalloc for its peak memory.
+    """
+    n = max(case.batch, int(case.n * scale) // case.batch * case.batch)
+    calibration = calibrate()
+    elapsed, latencies = min((timed(case, n) for _ in range(repeat)), key=lambda run: run[0])
+    calibration = min(calibration, calibrate())
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in case.documents(n):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result = {'n': n, 'docs_per_sec': round(n / elapsed, 1), 'p50_ms': None, 'p99_ms': None,
+              'peak_kib': round(peak / 1024, 1), 'calibration_ms': round(calibration * 1e3, 4)}
+    if case.latency:
+        result['p50_ms'] = round(percentile(latencies, 0.5) * 1e3, 4)
+        result['p99_ms'] = round(percentile(latencies, 0.99) * 1e3, 4)
+    return result
+
+
+def change(result: dict, expected: dict, metric: str) -> float:
+    """
+    :return: the relative change of the metric from expected to result. Times are compared relative to the calibration
+    measured with each, memory is compared as is.
+    """
+    value, base = result[metric], expected[metric]
+    if metric in timings and result.get('calibration_ms') and expected.get('calibration_ms'):
+        speed = expected['calibration_ms'] / result['calibration_ms']
+        value = value / speed if metric == 'docs_per_sec' else value * speed
+    return (value - base) / base
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    :return: a message for every checked metric of every case that is worse than its baseline by more than tolerance.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for metric, sign in checked.items():
+            if not expected.get(metric) or result[metric] is None:
+                continue
+            relative = change(result, expected, metric)
+            if relative * sign > tolerance:
+                calibrated = ' calibrated' if metric in timings else ''
+                regressions.append(f'{name}: {metric} {expected[metric]} -> {result[metric]} '
+                                   f'({relative:+.0%}{calibrated})')
+    return regressions
+
+
+def table(results: Dict[str, dict], baseline: Dict[str, dict]) -> str:
+    header = ('case', 'docs', 'docs/s', 'vs base', 'p50 ms', 'p99 ms', 'peak KiB')
+    rows = []
+    for name, r in results.items():
+        relative = f'{change(r, baseline[name], "docs_per_sec"):+.0%}' if name in baseline else '-'
+        latency = [f'{r[metric]:.3f}' if r[metric] is not None else '-' for metric in ('p50_ms', 'p99_ms')]
+        rows.append([name, str(r['n']), f'{r["docs_per_sec"]:.1f}', relative] + latency + [f'{r["peak_kib"]:.1f}'])
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    return '\n'.join('  '.join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                               for i, (cell, width) in enumerate(zip(row, widths)))
+                     for row in [header] + rows)
+
+
+def main(argv: Optional[List[str]]=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks JSON generation over local schemas.')
+    parser.add_argument('-k', dest='pattern', help='only run the cases whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='generate a tenth of the documents')
+    parser.add_argument('--repeat', type=int, default=3, help='the timed runs of each case, the fastest is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--validation', default='never', help='the validation policy, see JsonGenerator')
+    parser.add_argument('--baseline', default=default_baseline, help='the stored results to compare to')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='the fraction a metric may get worse before it is a regression')
+    parser.add_argument('--json', dest='output', help='write the results to this file as JSON')
+    args = parser.parse_args(argv)
+
+    cases = json_cases(args.seed, args.validation) + hca_cases(args.seed, args.validation)
+    if args.pattern:
+        cases = [case for case in cases if args.pattern in case.name]
+    scale = 0.1 if args.quick else 1.0
+    results = {}
+    for case in cases:
+        results[case.name] = measure(case, scale, args.repeat)
+        print(f'{case.name}: {results[case.name]["docs_per_sec"]:.1f} docs/s', file=sys.stderr)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)['results']
+    print(table(results, baseline))
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'python': sys.version.split()[0], 'results': results}, fh, indent=2, sort_keys=True)
+    if args.save:
+        stored = dict(baseline, **results)
+        with open(args.baseline, 'w') as fh:
+            json.dump({'python': sys.version.split()[0], 'results': stored}, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print('REGRESSION ' + regression, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+An asyncio interface to HCAJsonGenerator, for services that generate documents on an event loop. Generation, and the
+fetching of the schemas it needs, runs in an executor, so awaiting a document never blocks the loop.
+"""
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Optional, Set, Union
+
+from jsongen.hca_generator import HCAJsonGenerator
+
+
+class AsyncHCAJsonGenerator(object):
+    """
+    Generates random JSON from a list of URLs containing JSON schemas, without blocking the event loop.
+    """
+    def __init__(self, schema_urls, executor: Optional[Executor]=None, **kwargs) -> None:
+        """
+        :param schema_urls: a list of URL's pointing to valid json schemas.
+        :param executor: the thread pool generation and fetching run in. It may be shared with other work, since calls
+        into the generator take turns. Defaults to a single thread owned by this generator, shut down by close.
+        :param kwargs: passed on to HCAJsonGenerator.
+        """
+        self.generator = HCAJsonGenerator(schema_urls, **kwargs)
+        self._owns_executor = executor is None
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='jsongen') if executor is None else executor
+        # HCAJsonGenerator isn't thread safe, so the calls from the executor threads take turns.
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> Counter:
+        """Counts of generated, validated and invalid documents and the time spent, see HCAJsonGenerator.stats."""
+        return self.generator.stats
+
+    async def generate(self, name: str=None, target_bytes: Union[int, str, None]=None) -> Union[dict, str, bytes]:
+        """
+        Generates a document, see HCAJsonGenerator.generate. A schema that hasn't been generated before is fetched and
+        resolved first, in the executor.
+        :param name: the name of a JSON schema to generate. If None, then a random schema is chosen.
+        :param target_bytes: the size the serialized JSON should have, see HCAJsonGenerator.generate.
+        :return: the document, as HCAJsonGenerator.generate returns it.
+        """
+        return await self._run(self.generator.generate, name, target_bytes)
+
+    async def generate_at(self, index: int, seed: int, name: str=None,
+                          target_bytes: Union[int, str, None]=None) -> Union[dict, str, bytes]:
+        """
+        Generates the document at index in the run of documents seeded with seed, see HCAJsonGenerator.generate_at.
+        :return: the document, as HCAJsonGenerator.generate returns it.
+        """
+        return await self._run(self.generator.generate_at, index, seed, name, target_bytes)
+
+    async def stream(self, name: str=None, n: int=1, seed: Optional[int]=None,
+                     target_bytes: Union[int, str, None]=None,
+                     buffer: int=16) -> AsyncIterator[Union[dict, str, bytes]]:
+        """
+        Generates n documents in the background and yields them in order. Generation stays at most buffer documents
+        ahead of the consumer, and stops when the iteration is closed early.
+        :param name: the name of a JSON schema to generate. If None, then a random schema is chosen for each document.
+        :param n: the number of documents to generate.
+        :param seed: the seed of the run. The documents are the ones HCAJsonGenerator.generate_parallel gives for the
+        same seed.
+        :param target_bytes: the size of each serialized document, see HCAJsonGenerator.generate.
+        :param buffer: the most documents generated ahead of the consumer.
+        :return: an async iterator of the documents, as HCAJsonGenerator.generate returns them.
+        """
+        assert buffer > 0
+        if name is not None:
+            assert name in self.generator.schemas.keys()
+        if seed is None:
+            seed = await self._run(self.generator._json_gen.random.getrandbits, 64)
+        queue = asyncio.Queue(buffer)
+
+        async def produce():
+            for index in range(n):
+                # a full queue holds the producer back until the consumer catches up
+                await queue.put(asyncio.ensure_future(self.generate_at(index, seed, name, target_bytes)))
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            for _ in range(n):
+                yield await (await queue.get())
+        finally:
+            producer.cancel()
+            while not queue.empty():
+                queue.get_nowait().cancel()
+
+    async def prefetch(self, max_workers: int=8) -> Set[str]:
+        """
+        Fetches the schemas and everything they reference concurrently, see HCAJsonGenerator.prefetch.
+        :param max_workers: the most documents fetched at the same time.
+        :return: the URLs that were fetched.
+        """
+        return await self._run(self.generator.prefetch, max_workers)
+
+    def close(self) -> None:
+        """Shuts down the executor, if it is owned by this generator."""
+        if self._owns_executor:
+            self._executor.shutdown()
+
+    async def __aenter__(self) -> 'AsyncHCAJsonGenerator':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # waiting for the executor to finish must not block the loop either
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def _run(self, function: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._locked, function, *args)
+
+    def _locked(self, function: Callable, *args):
+        with self._lock:
+            return function(*args)
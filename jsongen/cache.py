@@ -0,0 +1,172 @@
+"""
+A persistent schema cache. Fetched documents are stored once under the SHA-256 of their content, and an index file per
+URL points at the content of that URL. Every file is written to a temporary file and renamed into place, so processes
+sharing a cache directory never see a partial file.
+
+LRUCache bounds the caches a generator keeps in memory, such as its compiled plans and validators.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from urllib.request import urlopen
+
+from jsongen.types import Cache
+
+
+def _default_directory() -> str:
+    return os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'jsongen')
+
+
+def _fetch(url: str) -> bytes:
+    with urlopen(url) as response:
+        return response.read()
+
+
+class DiskCache(Cache):
+    """
+    Caches the documents behind URLs on disk, to be passed to HCAJsonGenerator as its cache.
+    """
+
+    def __init__(self, directory: Optional[str]=None, ttl: Optional[float]=None, offline: bool=False,
+                 fetch: Callable[[str], bytes]=_fetch) -> None:
+        """
+        :param directory: where the cache is stored. Defaults to $XDG_CACHE_HOME/jsongen.
+        :param ttl: the seconds after which a cached URL is fetched again. If None, then cached URLs never expire.
+        :param offline: if True the network is never used. Expired URLs are still served and a URL that isn't cached
+        raises a LookupError.
+        :param fetch: fetches the content of a URL.
+        """
+        self.directory = directory or _default_directory()
+        self.ttl = ttl
+        self.offline = offline
+        self.fetch = fetch
+        os.makedirs(os.path.join(self.directory, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(self.directory, 'index'), exist_ok=True)
+
+    def resolve(self, url: str) -> bytes:
+        """
+        :param url: the URL of a document.
+        :return: the content of the document, from the cache if it is there and hasn't expired.
+        """
+        entry = self._entry(url)
+        content = self._read(entry['digest']) if entry is not None else None
+        if content is not None and (self.offline or self.ttl is None or time.time() - entry['fetched'] < self.ttl):
+            return content
+        if self.offline:
+            raise LookupError(f"{url} is not cached and the cache is offline.")
+        try:
+            fetched = self.fetch(url)
+        except Exception:
+            if content is not None:
+                # an expired copy is better than none when the network is down
+                return content
+            raise
+        self.store(url, fetched)
+        return fetched
+
+    def store(self, url: str, content: bytes) -> str:
+        """
+        Adds the content of a URL to the cache.
+
+        :param url: the URL of the document.
+        :param content: the content of the document.
+        :return: the digest the content is stored under.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        if self._read(digest) is None:
+            path = self._object_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write(path, content)
+        entry = {'url': url, 'digest': digest, 'fetched': time.time()}
+        self._write(self._index_path(url), json.dumps(entry).encode('utf-8'))
+        return digest
+
+    def evict(self, url: str) -> None:
+        """
+        Drops a URL from the index. Its content is left in place, since other URLs may share it.
+
+        :param url: the URL to drop.
+        """
+        try:
+            os.remove(self._index_path(url))
+        except FileNotFoundError:
+            pass
+
+    def _entry(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._index_path(url), 'rb') as fh:
+                entry = json.loads(fh.read().decode('utf-8'))
+        except (FileNotFoundError, ValueError):
+            return None
+        return entry if entry.get('url') == url else None
+
+    def _read(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._object_path(digest), 'rb') as fh:
+                content = fh.read()
+        except FileNotFoundError:
+            return None
+        return content if hashlib.sha256(content).hexdigest() == digest else None
+
+    def _index_path(self, url: str) -> str:
+        return os.path.join(self.directory, 'index', hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    @staticmethod
+    def _write(path: str, content: bytes) -> None:
+        """Writes to a temporary file in the same directory and renames it over path, which is atomic."""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+class LRUCache(object):
+    """A mapping of at most maxsize entries, which drops the least recently used entry to make room for a new one."""
+
+    def __init__(self, maxsize: int) -> None:
+        """
+        :param maxsize: the most entries kept.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # type: OrderedDict
+
+    def get(self, key: Hashable, default: Any=None) -> Any:
+        """
+        :return: the value of the key, which becomes the most recently used, or default if it isn't cached.
+        """
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            return default
+        return self._entries[key]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,32 @@
+import hashlib
+import json
+from typing import Any, Hashable
+
+
+def fingerprint(value: Any) -> str:
+    """
+    A stable digest of a JSON value. Equal values have equal fingerprints regardless of the order of their keys. Other
+    iterables, such as the dict views schemas are sometimes built with, are digested as lists.
+
+    :param value: the JSON value, usually a schema.
+    :return: the hex digest.
+    """
+    serialized = json.dumps(value, sort_keys=True, separators=(',', ':'), default=list)
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+
+def canonical_key(value: Any) -> Hashable:
+    """
+    A hashable key for a JSON value. Two values have equal keys when they are equal as JSON, so dicts compare
+    regardless of the order of their keys, 1 equals 1.0 but true does not equal 1.
+
+    :param value: the JSON value.
+    :return: the key.
+    """
+    if isinstance(value, dict):
+        return dict, frozenset((k, canonical_key(v)) for k, v in value.items())
+    elif isinstance(value, list):
+        return list, tuple(canonical_key(v) for v in value)
+    elif isinstance(value, bool):
+        return bool, value
+    return value
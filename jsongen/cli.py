@@ -0,0 +1,172 @@
+"""
+Generates JSON documents from JSON schema files or URLs.
+
+    jsongen schema.json https://schema.humancellatlas.org/bundle/5.1.0/project -n 1000 -w 8 -s 42 -o out/
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, List, Optional
+
+from jsongen.cache import DiskCache
+from jsongen.hca_generator import HCAJsonGenerator
+from jsongen.plan import parse_size
+from jsongen.serialize import Serializer
+from jsongen.validation import ValidationPolicy
+
+
+def _schema_url(schema: str) -> str:
+    """File paths are turned into file URLs so they are resolved the same way as remote schemas."""
+    if '://' in schema:
+        return schema
+    return Path(schema).resolve().as_uri()
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='jsongen', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('schemas', nargs='+', help="JSON schema files or URLs.")
+    parser.add_argument('-n', '--count', type=int, default=1, help="The number of documents to generate per schema.")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="The number of worker processes.")
+    parser.add_argument('-s', '--seed', type=int, default=None,
+                        help="Seeds the run. The same seed generates the same documents for any number of workers.")
+    parser.add_argument('-o', '--output', default='-',
+                        help="'-' for stdout, a directory (existing or ending in '/') for one file per document, "
+                             "otherwise a file. Stdout and files get one document per line.")
+    parser.add_argument('--target-bytes', default=None, metavar='SIZE',
+                        help="The size each document should have, e.g. 1KB, 100KB or 10MB. Array lengths, optional "
+                             "properties and unbounded strings are chosen to reach it.")
+    parser.add_argument('--serializer', default='json', choices=['auto', 'json', 'orjson'],
+                        help="Serializes the documents of worker processes. 'auto' uses orjson if it is installed, "
+                             "which is faster but more compact than json. With one worker, documents are written "
+                             "as they are generated, formatted like json.")
+    parser.add_argument('--pool', type=int, default=None, metavar='SIZE',
+                        help="Draw formatted strings and 'fake' values from pools of this many values generated up "
+                             "front, which is much faster but repeats values.")
+    parser.add_argument('--validate', default='always',
+                        help="The validation policy: 'always', 'never', 'sample(rate)' or 'first(n)'.")
+    parser.add_argument('--cache', default=None, metavar='DIRECTORY',
+                        help="Caches fetched schemas in this directory, shared between runs and processes.")
+    parser.add_argument('--cache-ttl', type=float, default=None, metavar='SECONDS',
+                        help="Fetches cached schemas again after this many seconds.")
+    parser.add_argument('--offline', action='store_true',
+                        help="Never fetch schemas over the network, only use the cache.")
+    parser.add_argument('--estimate', action='store_true',
+                        help="Print the expected and worst-case size and the relative cost of the documents of each "
+                             "schema per schema path, with unbounded, recursive and explosive paths flagged, instead "
+                             "of generating documents.")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print the generation time per schema path to stderr. Only covers documents generated "
+                             "in the main process, so use it with --workers 1.")
+    parser.add_argument('--profile-json', default=None, metavar='FILE',
+                        help="Write the generation profile per schema path to this file as JSON.")
+    return parser
+
+
+def _write(document: bytes, fh: BinaryIO) -> int:
+    fh.write(document)
+    return len(document)
+
+
+def _generate(generator: HCAJsonGenerator, name: str, args: argparse.Namespace) -> Iterator[Callable[[BinaryIO], int]]:
+    """
+    Yields a function per document that writes it to a binary file and returns its size. Documents generated in this
+    process are written as they are generated, so they are never held in memory.
+    """
+    if args.workers > 1:
+        for document in generator.generate_parallel(name, args.count, workers=args.workers, seed=args.seed,
+                                                    target_bytes=args.target_bytes):
+            yield partial(_write, document)
+    else:
+        for index in range(args.count):
+            yield partial(generator.emit_at, index=index, seed=args.seed, name=name, target_bytes=args.target_bytes)
+
+
+def main(argv: Optional[List[str]]=None) -> int:
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.count < 0 or args.workers < 1:
+        parser.error("count must be >= 0 and workers >= 1")
+    if args.pool is not None and args.pool < 1:
+        parser.error("pool must be >= 1")
+    if args.target_bytes is not None:
+        try:
+            args.target_bytes = parse_size(args.target_bytes)
+        except ValueError as ex:
+            parser.error(str(ex))
+    try:
+        serializer = Serializer.parse(args.serializer)
+    except ImportError as ex:
+        parser.error(str(ex))
+    try:
+        validation = ValidationPolicy.parse(args.validate)
+    except ValueError as ex:
+        parser.error(f"--validate: {ex}")
+    if args.seed is None:
+        args.seed = random.SystemRandom().getrandbits(32)
+    cache = None
+    if args.cache is not None or args.offline:
+        cache = DiskCache(args.cache, ttl=args.cache_ttl, offline=args.offline)
+    # The seed also seeds the pools, which are shared by all documents.
+    generator = HCAJsonGenerator([_schema_url(schema) for schema in args.schemas], cache=cache, seed=args.seed,
+                                 validation=validation, profile=args.profile or args.profile_json is not None,
+                                 return_type='bytes', serializer=serializer, pools=args.pool)
+    generator.prefetch()
+    if args.estimate:
+        for name in generator.schemas.keys():
+            estimate = generator.estimate(name)
+            document = estimate.document
+            print(f"{name}: {document.nodes:.0f} values and {document.bytes:.0f} bytes per document on average, "
+                  f"{document.max_nodes:.0f} values and {document.max_bytes:.0f} bytes at most, "
+                  f"about {document.bytes * args.count / 1e6:.2f} MB for {args.count} documents.")
+            print(estimate.table())
+        return 0
+
+    directory = args.output != '-' and (args.output.endswith(os.sep) or os.path.isdir(args.output))
+    if directory:
+        os.makedirs(args.output, exist_ok=True)
+        out = None
+    else:
+        out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+
+    documents = 0
+    size = 0
+    start = time.perf_counter()
+    try:
+        for name in generator.schemas.keys():
+            for index, write in enumerate(_generate(generator, name, args)):
+                if directory:
+                    path = os.path.join(args.output, f"{name.rsplit('.json', 1)[0]}-{index:06d}.json")
+                    with open(path, 'wb') as fh:
+                        size += write(fh)
+                else:
+                    size += write(out) + 1
+                    out.write(b'\n')
+                documents += 1
+    finally:
+        if out is sys.stdout.buffer:
+            out.flush()
+        elif out is not None:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    stats = generator.stats
+    print(f"Generated {documents} documents ({size / 1e6:.2f} MB) in {elapsed:.2f}s with seed {args.seed}: "
+          f"{documents / elapsed if elapsed else 0:.1f} docs/s, {size / 1e6 / elapsed if elapsed else 0:.2f} MB/s. "
+          f"Validated {stats['validated']}, invalid {stats['invalid']}.", file=sys.stderr)
+    if stats['serialization_time']:
+        print(f"Generation took {stats['generation_time']:.2f}s and serialization {stats['serialization_time']:.2f}s "
+              f"with {generator.serializer}.", file=sys.stderr)
+    if args.profile:
+        print(generator.profiler.table(), file=sys.stderr)
+    if args.profile_json is not None:
+        with open(args.profile_json, 'w') as fh:
+            fh.write(generator.profiler.to_json(indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Columnar batch generation. Each leaf of a flat or shallow object schema is drawn for a whole batch of documents with a
+single NumPy call, and documents are assembled column by column. Constructs that can't be vectorized fall back to the
+compiled scalar plan for that field. Requires numpy, e.g. `pip install pyjsongen[columnar]`.
+"""
+import string
+from math import ceil, floor
+from typing import Any, Dict, List, Optional, Tuple
+
+from jsongen.plan import Limits, run
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Columnar generation requires numpy. Install it with `pip install pyjsongen[columnar]`.")
+
+
+class Field(object):
+    """Draws the values of one schema node for a batch of documents."""
+
+    def draw(self, rng, n: int, present=None):
+        """
+        :param rng: a numpy.random.Generator.
+        :param n: the number of documents in the batch.
+        :param present: a boolean mask of the documents the values are present in, None if present in all. Fields
+        drawn one document at a time skip the others.
+        :return: the n values, as a numpy array or a list.
+        """
+        raise NotImplementedError
+
+
+class Const(Field):
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def draw(self, rng, n: int, present=None) -> list:
+        return [self.value] * n
+
+
+class Enum(Field):
+    def __init__(self, values: list) -> None:
+        self.values = np.empty(len(values), dtype=object)
+        self.values[:] = values
+
+    def draw(self, rng, n: int, present=None):
+        return self.values[rng.integers(0, len(self.values), n)]
+
+
+class Integer(Field):
+    def __init__(self, minimum: int, maximum: int, multiple_of: int=1) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiple_of = multiple_of
+
+    def draw(self, rng, n: int, present=None):
+        return rng.integers(self.minimum, self.maximum + 1, n) * self.multiple_of
+
+
+class Number(Field):
+    def __init__(self, minimum: float, maximum: float, multiple_of: Optional[float]=None) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiple_of = multiple_of
+
+    def draw(self, rng, n: int, present=None):
+        if self.multiple_of is None:
+            return rng.uniform(self.minimum, self.maximum, n)
+        values = rng.integers(ceil(self.minimum / self.multiple_of), floor(self.maximum / self.multiple_of) + 1, n)
+        return np.round(values * self.multiple_of, 12)
+
+
+class Boolean(Field):
+    def draw(self, rng, n: int, present=None):
+        return rng.random(n) < 0.5
+
+
+class String(Field):
+    """Random letters with a length between minimum and maximum, like Faker's pystr."""
+    _LETTERS = np.frombuffer(string.ascii_letters.encode('ascii'), dtype=np.uint8) if np is not None else None
+
+    def __init__(self, minimum: int, maximum: int) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def draw(self, rng, n: int, present=None) -> list:
+        lengths = rng.integers(self.minimum, self.maximum + 1, n)
+        ends = np.cumsum(lengths).tolist()
+        letters = self._LETTERS[rng.integers(0, len(self._LETTERS), ends[-1] if ends else 0)].tobytes().decode('ascii')
+        starts = [0] + ends[:-1]
+        return [letters[start:end] for start, end in zip(starts, ends)]
+
+
+class Scalar(Field):
+    """
+    Falls back to running the compiled scalar node once per document it is present in, within the max_depth and
+    max_nodes of the generator.
+    """
+
+    def __init__(self, node, depth: int, max_depth: Optional[int], max_nodes: Optional[int]) -> None:
+        self.node = node
+        self.depth = depth
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+
+    def draw(self, rng, n: int, present=None) -> list:
+        node, depth, max_depth, max_nodes = self.node, self.depth, self.max_depth, self.max_nodes
+        if present is None:
+            return [run(node, Limits(max_depth, max_nodes), depth) for _ in range(n)]
+        return [run(node, Limits(max_depth, max_nodes), depth) if is_present else None
+                for is_present in present.tolist()]
+
+
+class Object(Field):
+    """
+    Required properties are always present. The number of properties of each document is drawn like
+    jsongen.plan.Object does and the optional properties are chosen uniformly, which gives a presence mask per
+    optional property.
+    """
+
+    def __init__(self, required: List[Tuple[str, Field]], optional: List[Tuple[str, Field]], minimum: int,
+                 maximum: int) -> None:
+        self.required = required
+        self.optional = optional
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def draw(self, rng, n: int, present=None) -> 'DrawnObject':
+        required = [(key, field.draw(rng, n, present)) for key, field in self.required]
+        optional = []
+        if self.optional:
+            if self.minimum == self.maximum:
+                make_properties = np.full(n, self.minimum)
+            else:
+                make_properties = rng.integers(self.minimum, self.maximum, n)
+            count = np.clip(make_properties - len(self.required), 0, len(self.optional))
+            # the rank of each optional property in a random order, per document
+            ranks = np.argsort(rng.random((n, len(self.optional))), axis=1)
+            chosen = ranks < count[:, None]
+            optional = [(key, field.draw(rng, n, chosen[:, i] if present is None else present & chosen[:, i]),
+                         chosen[:, i]) for i, (key, field) in enumerate(self.optional)]
+        return DrawnObject(n, required, optional)
+
+
+class DrawnObject(object):
+    """The columns drawn for an object."""
+
+    def __init__(self, n: int, required: List[Tuple[str, Any]], optional: List[Tuple[str, Any, Any]]) -> None:
+        self.n = n
+        self.required = required
+        self.optional = optional
+
+
+def _to_list(values) -> list:
+    if isinstance(values, DrawnObject):
+        return _assemble(values)
+    return values.tolist() if isinstance(values, np.ndarray) else values
+
+
+def _assemble(drawn: DrawnObject) -> List[dict]:
+    documents = [{} for _ in range(drawn.n)]
+    for key, values in drawn.required:
+        for document, value in zip(documents, _to_list(values)):
+            document[key] = value
+    for key, values, present in drawn.optional:
+        for document, value, is_present in zip(documents, _to_list(values), present.tolist()):
+            if is_present:
+                document[key] = value
+    return documents
+
+
+class ColumnBatch(object):
+    """
+    The columns of a batch of documents. Columns are named by the JSON pointer of the property they hold, and optional
+    properties have a boolean mask of the documents they are present in. Columns generated by the scalar plan hold None
+    for the documents they aren't present in.
+    """
+
+    def __init__(self, n: int, drawn) -> None:
+        self.n = n
+        self._drawn = drawn
+        self.columns = {}  # type: Dict[str, Any]
+        self.present = {}  # type: Dict[str, Any]
+        self._flatten(drawn, '', None)
+
+    def _flatten(self, drawn, path: str, present) -> None:
+        if isinstance(drawn, DrawnObject):
+            for key, values in drawn.required:
+                self._flatten(values, f'{path}/{key}', present)
+            for key, values, is_present in drawn.optional:
+                self._flatten(values, f'{path}/{key}', is_present if present is None else present & is_present)
+        else:
+            self.columns[path] = drawn
+            if present is not None:
+                self.present[path] = present
+
+    def to_documents(self) -> list:
+        """
+        :return: the n documents, assembled column by column.
+        """
+        return _to_list(self._drawn)
+
+
+class ColumnPlan(object):
+    """A schema compiled into fields by compile_columns."""
+
+    def __init__(self, root: Field) -> None:
+        self.root = root
+
+    def __call__(self, rng, n: int) -> ColumnBatch:
+        """
+        :param rng: a numpy.random.Generator.
+        :param n: the number of documents to draw.
+        :return: the columns of the batch.
+        """
+        return ColumnBatch(n, self.root.draw(rng, n))
+
+
+def compile_columns(generator, schema: dict) -> ColumnPlan:
+    """
+    Compiles the schema into fields that draw whole columns at once.
+
+    :param generator: the JsonGenerator used for the scalar fallbacks and its limits.
+    :param schema: the JSON schema to generate data from.
+    :return: the column plan.
+    """
+    _require_numpy()
+    generator._compiled_refs = {}
+    try:
+        return ColumnPlan(_ColumnCompiler(generator).compile(schema))
+    finally:
+        generator._compiled_refs = {}
+
+
+class _ColumnCompiler(object):
+
+    def __init__(self, generator) -> None:
+        self.generator = generator
+
+    def scalar(self, schema: dict, depth: int) -> Field:
+        generator = self.generator
+        return Scalar(generator._compile_json(schema), depth, generator.max_depth, generator.max_nodes)
+
+    def compile(self, schema: dict, depth: int=0) -> Field:
+        """
+        :param schema: the schema of the field.
+        :param depth: the depth of the field within the document.
+        """
+        if '$ref' in schema or 'id' in schema:
+            return self.scalar(schema, depth)
+        effective = self.generator._effective_schemas(schema)
+        if len(effective) != 1:
+            return self.scalar(schema, depth)
+        schema = effective[0]
+        fake = schema.get('fake')
+        const = schema.get('const')
+        enums = schema.get('enum')
+        json_type = schema.get('type', 'object')
+        if fake:
+            return self.scalar(schema, depth)
+        if not const and enums and json_type != 'array':
+            return Enum(list(enums))
+        if const is not None and json_type != 'array':
+            return Const(const)
+        compile_type = getattr(self, f'_{json_type}', None)
+        field = compile_type(schema, depth) if compile_type is not None else None
+        return self.scalar(schema, depth) if field is None else field
+
+    def _object(self, schema: dict, depth: int) -> Optional[Field]:
+        if schema.get('patternProperties') or schema.get('additionalProperties'):
+            return None
+        generator = self.generator
+        required = schema.get('required', [])
+        properties = schema.get('properties') or {}
+        required_fields = [(key, self.compile(schema['properties'][key], depth + 1)) for key in required]
+        required = set(required)
+        optional_fields = [(key, self.compile(subschema, depth + 1)) for key, subschema in properties.items()
+                           if key not in required]
+        return Object(required_fields, optional_fields, schema.get('minProperties', generator.UNBOUND_MIN_OBJECTS),
+                      schema.get('maxProperties', generator.UNBOUND_MAX_OBJECTS))
+
+    def _integer(self, schema: dict, depth: int) -> Optional[Field]:
+        generator = self.generator
+        maximum = schema.get('maximum', schema.get('exclusiveMaximum', generator.UNBOUND_MAX_INT) - 1)
+        minimum = schema.get('minimum', schema.get('exclusiveMinimum', generator.UNBOUND_MIN_INT) + 1)
+        if minimum == maximum:
+            return Const(minimum)
+        multiple_of = schema.get('multipleOf')
+        if multiple_of is not None:
+            if multiple_of <= 0:
+                raise ValueError("multipleOf must be > 0")
+            minimum, maximum = ceil(minimum / multiple_of), floor(maximum / multiple_of)
+        if not (_INT64_MIN <= minimum and maximum < _INT64_MAX) or not isinstance(multiple_of or 1, int):
+            return None
+        return Integer(minimum, maximum, multiple_of or 1)
+
+    def _number(self, schema: dict, depth: int) -> Optional[Field]:
+        generator = self.generator
+        maximum = schema.get('maximum', schema.get('exclusiveMaximum', generator.UNBOUND_MAX_INT) - 1e-12)
+        minimum = schema.get('minimum', schema.get('exclusiveMinimum', generator.UNBOUND_MIN_INT) + 1e-12)
+        if minimum == maximum:
+            return Const(minimum)
+        multiple_of = schema.get('multipleOf')
+        if multiple_of is not None and multiple_of <= 0:
+            raise ValueError("multipleOf must be > 0")
+        return Number(minimum, maximum, multiple_of)
+
+    def _boolean(self, schema: dict, depth: int) -> Optional[Field]:
+        return Boolean()
+
+    def _string(self, schema: dict, depth: int) -> Optional[Field]:
+        if schema.get('format') or schema.get('pattern'):
+            return None
+        generator = self.generator
+        return String(schema.get('minLength', generator.UNBOUND_MIN_STRING),
+                      schema.get('maxLength', generator.UNBOUND_MAX_STRING))
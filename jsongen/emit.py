@@ -0,0 +1,154 @@
+"""
+Writes documents to a binary stream while they are generated. A container being generated is represented by a sink
+that writes its values as they are added, so neither the document nor its serialization is ever held in memory, and
+arrays of any length are written in constant memory. The output is byte for byte what json.dumps gives.
+"""
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Any, BinaryIO, Iterable, List, Optional
+
+# Passed to a sink in place of a value the writer has already written, e.g. a nested container.
+WRITTEN = object()
+
+
+def _dumps(value: Any) -> str:
+    """Serializes a value like json.dumps, without its overhead for the strings and integers most leaves are."""
+    kind = type(value)
+    if kind is str:
+        return encode_basestring_ascii(value)
+    if kind is int:
+        return int.__repr__(value)
+    return json.dumps(value)
+
+
+class JsonWriter(object):
+    """Writes JSON tokens to a binary stream, with the separators of json.dumps, in buffered chunks."""
+
+    def __init__(self, stream: BinaryIO, buffer_size: int=1 << 16) -> None:
+        """
+        :param stream: a writable binary stream.
+        :param buffer_size: the number of bytes collected before they are written to the stream.
+        """
+        self.stream = stream
+        self.buffer_size = buffer_size
+        # the number of bytes written, including those still buffered
+        self.position = 0
+        self._buffer = []  # type: List[str]
+        self._buffered = 0
+        # the number of values written to each open container, innermost last
+        self._counts = []  # type: List[int]
+        # whether a key was just written, so the next value follows it without a separator
+        self._after_key = False
+
+    def key(self, key: str) -> None:
+        """Writes the key of the next value of the innermost object."""
+        self._separate()
+        self._write(encode_basestring_ascii(key) + ': ')
+        self._after_key = True
+
+    def value(self, value: Any) -> None:
+        """Writes a value that is already complete."""
+        self._separate()
+        self._write(_dumps(value))
+
+    def begin(self, bracket: str) -> None:
+        """Opens a container, '{' or '['."""
+        self._separate()
+        self._write(bracket)
+        self._counts.append(0)
+
+    def end(self, bracket: str) -> None:
+        """Closes the innermost container, '}' or ']'."""
+        self._counts.pop()
+        self._write(bracket)
+
+    def flush(self) -> None:
+        """Writes the buffered bytes to the stream."""
+        if self._buffer:
+            # json.dumps escapes non-ASCII characters, so the text is ASCII
+            self.stream.write(''.join(self._buffer).encode('ascii'))
+            self._buffer.clear()
+            self._buffered = 0
+
+    def _separate(self) -> None:
+        if self._after_key:
+            self._after_key = False
+        elif self._counts:
+            if self._counts[-1]:
+                self._write(', ')
+            self._counts[-1] += 1
+
+    def _write(self, text: str) -> None:
+        self._buffer.append(text)
+        self._buffered += len(text)
+        self.position += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+
+class Sink(object):
+    """Stands in for the value of a container while it is written. Sinks are closed by jsongen.plan.run."""
+    __slots__ = ('writer', 'count')
+
+    bracket = ''
+
+    def __init__(self, writer: JsonWriter) -> None:
+        self.writer = writer
+        # the number of values added, as len would count them in the container
+        self.count = 0
+        writer.begin(self.bracket)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self.writer.end(']' if self.bracket == '[' else '}')
+
+
+class ObjectSink(Sink):
+    """Stands in for the dict of an object. Values are written with their keys when they are set."""
+    __slots__ = ('keys',)
+
+    bracket = '{'
+
+    def __init__(self, writer: JsonWriter, duplicates: bool=False) -> None:
+        """
+        :param duplicates: whether the object may draw a key twice, e.g. from patternProperties. The keys are then
+        remembered, so the object can check for a key before generating its value, and a key set again is ignored
+        rather than written twice.
+        """
+        super().__init__(writer)
+        self.keys = set() if duplicates else None  # type: Optional[set]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if self.keys is not None:
+            if key in self.keys:
+                return
+            self.keys.add(key)
+        if value is not WRITTEN:
+            self.writer.key(key)
+            self.writer.value(value)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return self.keys is not None and key in self.keys
+
+
+class ArraySink(Sink):
+    """Stands in for the list of an array. Items are written when they are appended."""
+    __slots__ = ()
+
+    bracket = '['
+
+    def __init__(self, writer: JsonWriter, items: Iterable=()) -> None:
+        super().__init__(writer)
+        self.extend(items)
+
+    def append(self, value: Any) -> None:
+        if value is not WRITTEN:
+            self.writer.value(value)
+        self.count += 1
+
+    def extend(self, values: Iterable) -> None:
+        for value in values:
+            self.append(value)
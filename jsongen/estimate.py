@@ -0,0 +1,531 @@
+"""
+Estimates the documents of a schema without generating any. JsonGenerator.estimate compiles the schema and walks its
+plan, and reports for each schema path how many values it is expected to generate per document, the expected and
+worst-case number of values and bytes of each one once serialized by json.dumps, and the expected relative cost of
+generating them. Paths are the JSON pointers of jsongen.profile, so an estimate can be checked against a profile.
+
+Costs are relative to drawing a random integer with the fast backend, about half a microsecond, and were measured for
+the providers of both backends. Formats and 'fake' providers the estimator doesn't know are taken to be as slow as
+Faker's name provider. Sizes of formatted values are the typical sizes of their providers.
+
+Paths are flagged when their size is only bounded by the UNBOUND_* defaults of JsonGenerator ('unbounded'), when they
+refer back to a schema being generated so only max_depth bounds them ('recursive'), and when their worst case reaches
+a number of values that none of their children reach ('explosive'). The depth of containers is modelled as it is when
+generating, but max_nodes, uniqueness retries and target sizes are not. Without max_depth, recursive schemas are
+estimated to be infinite.
+"""
+import json
+from collections import Counter
+from inspect import unwrap
+from math import inf
+from random import Random
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from faker.providers import BaseProvider
+
+from jsongen.fast import FastProvider
+from jsongen.plan import (Array, Branch, Choice, Const, Container, Leaf, Multiple, Node, Object, Profiled, Ref, Text,
+                          _size)
+from jsongen.pool import ValuePool
+from jsongen.xeger import PatternSampler
+
+# The cost of expanding a container, and of yielding each of its children or adding an optional one.
+CONTAINER_COST = 5.0
+CHILD_COST = 0.5
+# The cost of drawing from a ValuePool or choosing from an enum.
+CHOICE_COST = 1.0
+# The cost of a string of letters by backend: per string and per letter.
+TEXT_COST = {'fast': (2.0, 0.03), 'faker': (23.0, 0.73)}
+# The cost of a string matching a pattern: per string and per character.
+PATTERN_COST = (4.0, 0.3)
+# The cost, expected bytes and maximum bytes of the values of providers, by backend and name.
+PROVIDERS = {
+    ('fast', 'iso8601'): (6.0, 21.0, 21), ('faker', 'iso8601'): (23.0, 21.0, 21),
+    ('fast', 'date'): (5.0, 12.0, 12), ('faker', 'date'): (27.0, 12.0, 12),
+    ('fast', 'time'): (5.0, 10.0, 10), ('faker', 'time'): (24.0, 10.0, 10),
+    ('fast', 'email'): (6.0, 21.3, 29), ('faker', 'email'): (650.0, 24.0, 48),
+    ('fast', 'uuid4'): (4.0, 38.0, 38), ('faker', 'uuid4'): (9.0, 38.0, 38),
+    ('faker', 'uri'): (600.0, 37.0, 72),
+    ('faker', 'name'): (330.0, 15.4, 32),
+    ('fast', 'pybool'): (0.3, 4.5, 5), ('faker', 'pybool'): (2.0, 4.5, 5),
+    ('fast', 'uniform'): (1.0, 18.0, 24),
+}
+UNKNOWN_PROVIDER = (330.0, 16.0, 64)
+# The cost per integer of random_int by backend.
+INT_COST = {'fast': 1.0, 'faker': 2.0}
+# The values of additional properties, one of Faker's jsondict, jsonlist, pystr, pyint, pyfloat and pybool: their cost,
+# expected and maximum number of values, and expected and maximum bytes. Their keys are uuid4s.
+ADDITIONAL = (550.0, 4.2, 16, 85.0, 512)
+UUID_BYTES = 38
+# The functions of the providers that draw integers between two arguments.
+RANDOM_INTS = (FastProvider.random_int, BaseProvider.random_int)
+
+_Key = Tuple[int, int]
+
+
+class PathEstimate(object):
+    """
+    The estimate for one schema path. Values and bytes are those of one value generated for the path, calls and cost
+    are per document and the cost includes the cost of the children.
+    """
+    __slots__ = ('calls', 'nodes', 'max_nodes', 'bytes', 'max_bytes', 'cost', 'flags')
+
+    def __init__(self) -> None:
+        self.calls = 0.0
+        self.nodes = 0.0
+        self.max_nodes = 0.0
+        self.bytes = 0.0
+        self.max_bytes = 0.0
+        self.cost = 0.0
+        self.flags = set()  # type: Set[str]
+
+    def as_dict(self) -> dict:
+        stats = {name: getattr(self, name) for name in self.__slots__}
+        stats['flags'] = sorted(self.flags)
+        return stats
+
+
+class Estimate(object):
+    """The estimates of a schema by JSON pointer, and of its documents."""
+
+    COLUMNS = ('calls', 'nodes', 'max_nodes', 'bytes', 'max_bytes', 'cost')
+
+    def __init__(self, paths: Dict[str, PathEstimate], document: PathEstimate) -> None:
+        """
+        :param paths: the estimates by path.
+        :param document: the estimate of a whole document.
+        """
+        self.paths = paths
+        self.document = document
+
+    @property
+    def flagged(self) -> Dict[str, List[str]]:
+        """
+        :return: the flags of the paths that have any, by path.
+        """
+        return {path: sorted(estimate.flags) for path, estimate in self.paths.items() if estimate.flags}
+
+    def as_dict(self) -> Dict[str, dict]:
+        """
+        :return: the estimate of every path, by path.
+        """
+        return {path: estimate.as_dict() for path, estimate in self.paths.items()}
+
+    def to_json(self, **kwargs) -> str:
+        """
+        :param kwargs: passed to json.dumps.
+        :return: the estimate of every path as JSON, with infinite estimates as null.
+        """
+        return json.dumps({path: {name: None if value == inf else value for name, value in stats.items()}
+                           for path, stats in self.as_dict().items()}, **kwargs)
+
+    def table(self, sort_by: str='cost', limit: Optional[int]=None) -> str:
+        """
+        :param sort_by: the column to sort by, descending.
+        :param limit: the most rows to show.
+        :return: a text table of the estimates, one path per row, with the share of the cost of a document. Costs
+        include those of the children, so paths that recur within themselves can take more than all of it.
+        """
+        if sort_by not in self.COLUMNS:
+            raise ValueError(f"Can't sort by '{sort_by}', must be one of {', '.join(self.COLUMNS)}.")
+        rows = sorted(self.paths.items(), key=lambda item: getattr(item[1], sort_by), reverse=True)[:limit]
+        total = self.document.cost
+        header = ('path', 'calls', 'values', 'max values', 'bytes', 'max bytes', 'cost', 'cost %', 'flags')
+        lines = [[path, f'{e.calls:.2f}', f'{e.nodes:.1f}', f'{e.max_nodes:.0f}', f'{e.bytes:.1f}',
+                  f'{e.max_bytes:.0f}', f'{e.cost:.1f}', f'{100 * e.cost / total:.1f}' if 0 < total < inf else '-',
+                  ','.join(sorted(e.flags))] for path, e in rows]
+        widths = [max(len(row[i]) for row in [header] + lines) for i in range(len(header))]
+        return '\n'.join(
+            '  '.join(cell.ljust(width) if i in (0, len(header) - 1) else cell.rjust(width) for i, (cell, width) in
+                      enumerate(zip(row, widths))).rstrip()
+            for row in [header] + lines)
+
+
+class _Node(object):
+    """The estimate of one plan node at one depth, and the expected number of each child per value."""
+    __slots__ = ('nodes', 'max_nodes', 'bytes', 'max_bytes', 'cost', 'flags', 'children')
+
+    def __init__(self, nodes: float, max_nodes: float, bytes: float, max_bytes: float, cost: float,
+                 flags: Iterable[str]=(), children: Optional[List[Tuple[_Key, float]]]=None) -> None:
+        self.nodes = nodes
+        self.max_nodes = max_nodes
+        self.bytes = bytes
+        self.max_bytes = max_bytes
+        self.cost = cost
+        # the flags of the node and of the nodes below it up to the next path
+        self.flags = set(flags)
+        self.children = children or []
+
+
+# A reference back to a node being estimated at the same depth, which has no finite documents.
+_INFINITE = _Node(inf, inf, inf, inf, inf)
+
+
+def estimate(root: Node, paths: Dict[int, str], max_depth: Optional[int]=None, explosive: int=10 ** 5) -> Estimate:
+    """
+    :param root: the root of a plan compiled with a profiler, so each schema path is a Profiled node.
+    :param paths: the path of each Profiled node, by the id of its stats.
+    :param max_depth: the max_depth of the plan.
+    :param explosive: the worst-case number of values from which a subtree is flagged explosive.
+    :return: the estimate of the plan.
+    """
+    return _Estimator(paths, max_depth, explosive).run(root)
+
+
+class _Estimator(object):
+
+    def __init__(self, paths: Dict[int, str], max_depth: Optional[int], explosive: int) -> None:
+        self.paths = paths
+        self.max_depth = max_depth
+        self.explosive = explosive
+        self.estimates = {}  # type: Dict[_Key, _Node]
+        self.nodes = {}  # type: Dict[_Key, Node]
+        # references to a schema being estimated
+        self.recursive = set()  # type: Set[int]
+
+    def run(self, root: Node) -> Estimate:
+        """Estimates the nodes after their children, keeping the nodes being estimated on an explicit stack."""
+        order = []  # type: List[_Key]
+        visiting = set()  # type: Set[_Key]
+        # the paths being estimated, at any depth
+        visiting_paths = Counter()  # type: Counter
+        stack = [(root, 0, False)]
+        while stack:
+            node, depth, children_done = stack.pop()
+            key = (id(node), self._level(depth))
+            path = self._path(node)
+            if children_done:
+                visiting.discard(key)
+                visiting_paths[path] -= 1
+                self.estimates[key] = self._estimate(node, key[1])
+                order.append(key)
+                continue
+            target = self._path(node.target) if isinstance(node, Ref) else None
+            if target is not None and visiting_paths[target]:
+                self.recursive.add(id(node))
+            if key not in self.estimates and key not in visiting:
+                visiting.add(key)
+                visiting_paths[path] += 1
+                self.nodes[key] = node
+                stack.append((node, depth, True))
+                child_depth = depth + 1 if isinstance(node, Container) and not isinstance(node, Profiled) else depth
+                stack.extend((child, child_depth, False) for child in self._children(node, key[1]))
+        return self._report(order, (id(root), 0))
+
+    def _path(self, node: Node) -> Optional[str]:
+        return self.paths.get(id(node.stats)) if isinstance(node, Profiled) else None
+
+    def _level(self, depth: int) -> int:
+        """Containers are pruned from max_depth on, so all depths past it are estimated alike."""
+        return 0 if self.max_depth is None else min(depth, self.max_depth)
+
+    def _pruned(self, level: int) -> bool:
+        return self.max_depth is not None and level >= self.max_depth
+
+    def _children(self, node: Node, level: int) -> List[Node]:
+        if isinstance(node, Object):
+            children = [child for _, child in node.required]
+            if self._object_slots(node, level)[1] > 0:
+                children.extend(child for _, child in node.properties + node.patterns)
+            return children
+        if isinstance(node, Array):
+            return [child for child, _, most in self._array_parts(node, level)[0] if most > 0]
+        if isinstance(node, Branch):
+            return list(node.branches)
+        if isinstance(node, Ref):
+            return [node.target]
+        if isinstance(node, Profiled):
+            return [node.node]
+        return []
+
+    def _child(self, node: Node, level: int) -> Tuple[_Key, _Node]:
+        key = (id(node), level)
+        # a child that isn't estimated yet is being estimated, so it refers back to itself at the same depth
+        return key, self.estimates.get(key, _INFINITE)
+
+    def _estimate(self, node: Node, level: int) -> _Node:
+        if isinstance(node, Object):
+            return self._object(node, level)
+        if isinstance(node, Array):
+            return self._array(node, level)
+        if isinstance(node, Branch):
+            branches = [self._child(branch, level) for branch in node.branches]
+            n = len(branches)
+            return _Node(sum(e.nodes for _, e in branches) / n, max(e.max_nodes for _, e in branches),
+                         sum(e.bytes for _, e in branches) / n, max(e.max_bytes for _, e in branches),
+                         CHOICE_COST + sum(e.cost for _, e in branches) / n,
+                         set().union(*(e.flags for _, e in branches)), [(key, 1 / n) for key, _ in branches])
+        if isinstance(node, (Ref, Profiled)):
+            key, target = self._child(node.target if isinstance(node, Ref) else node.node, level)
+            # the target of a reference is a path of its own
+            flags = target.flags if isinstance(node, Profiled) else ['recursive'] if id(node) in self.recursive else []
+            return _Node(target.nodes, target.max_nodes, target.bytes, target.max_bytes, target.cost, flags,
+                         [(key, 1.0)])
+        return _leaf(node)
+
+    def _object_slots(self, node: Object, level: int) -> Tuple[float, int]:
+        """The expected and the most optional properties of an object."""
+        required = len(node.required)
+        pruned = self._pruned(level)
+        lo, hi = _length_range(node.min_properties if pruned else node.minimum, node.maximum, pruned)
+        cap = inf if node.patterns or node.additional else required + len(node.properties)
+        return _mean_clipped(lo, hi, required, cap) - required, max(0, min(hi, cap) - required)
+
+    def _object(self, node: Object, level: int) -> _Node:
+        child_level = self._level(level + 1)
+        added, most = self._object_slots(node, level)
+        required = [(key, self._child(child, child_level)) for key, child in node.required]
+        optional = [(key, self._child(child, child_level)) for key, child in node.properties]
+        patterns = [(_key_lengths(sample_key, node.key_len), self._child(child, child_level))
+                    for sample_key, child in node.patterns]
+        unbounded = bool(node.patterns) + bool(node.additional)
+        # each optional property is a uniform choice between declared, pattern and additional properties, and declared
+        # properties are chosen at most once
+        options = bool(optional) + unbounded
+        declared = min(len(optional), added / options) if optional and unbounded else added if optional else 0.0
+        per_option = (added - declared) / unbounded if unbounded else 0.0
+        included = declared / len(optional) if optional else 0.0
+        pattern_picks = per_option if node.patterns else 0.0
+        additional_picks = per_option if node.additional else 0.0
+
+        nodes = 1 + sum(e.nodes for _, (_, e) in required) + _times(sum(e.nodes for _, (_, e) in optional), included)
+        size = 2 + sum(_size(key) + 4 + e.bytes for key, (_, e) in required) + \
+            _times(sum(_size(key) + 4 + e.bytes for key, (_, e) in optional), included) - \
+            2 * min(1.0, len(required) + added)
+        cost = CONTAINER_COST + sum(e.cost + CHILD_COST for _, (_, e) in required) + \
+            _times(sum(e.cost + CHILD_COST + 1 for _, (_, e) in optional), included)
+        children = [(key, 1.0) for _, (key, _) in required] + [(key, included) for _, (key, _) in optional]
+        # a random pattern and the largest pattern that can be drawn, with its key
+        worst_extras = []  # type: List[Tuple[float, float]]
+        if patterns:
+            n = len(patterns)
+            nodes += _times(sum(e.nodes for _, (_, e) in patterns) / n, pattern_picks)
+            size += _times(sum(k + 4 + e.bytes for (k, _, _), (_, e) in patterns) / n, pattern_picks)
+            cost += _times(sum(c + e.cost + CHILD_COST + 1 for (_, _, c), (_, e) in patterns) / n, pattern_picks)
+            children.extend((key, pattern_picks / n) for _, (key, _) in patterns)
+            worst_extras.append((max(e.max_nodes for _, (_, e) in patterns),
+                                 max(k + 4 + e.max_bytes for (_, k, _), (_, e) in patterns)))
+        if node.additional:
+            additional_cost, additional_nodes, max_additional_nodes, additional_bytes, max_additional_bytes = ADDITIONAL
+            nodes += additional_picks * additional_nodes
+            size += additional_picks * (UUID_BYTES + 4 + additional_bytes)
+            cost += additional_picks * (additional_cost + PROVIDERS['faker', 'uuid4'][0] + CHILD_COST + 1)
+            worst_extras.append((max_additional_nodes, UUID_BYTES + 4 + max_additional_bytes))
+
+        members = len(required) + most
+        max_nodes = 1 + sum(e.max_nodes for _, (_, e) in required) + \
+            _most(most, [e.max_nodes for _, (_, e) in optional], max((n for n, _ in worst_extras), default=None))
+        max_size = 2 + sum(_size(key) + 4 + e.max_bytes for key, (_, e) in required) + \
+            _most(most, [_size(key) + 4 + e.max_bytes for key, (_, e) in optional],
+                  max((b for _, b in worst_extras), default=None)) - (2 if members else 0)
+        flags = ['unbounded'] if (node.patterns or node.additional) and node.max_properties is None else []
+        estimate = _Node(nodes, max_nodes, size, max_size, cost, flags, children)
+        optional_children = [e for _, (_, e) in optional + patterns] if most else []
+        self._explosive(estimate, [e for _, (_, e) in required] + optional_children)
+        return estimate
+
+    def _array_parts(self, node: Array, level: int) -> Tuple[List[Tuple[Node, float, int]], Tuple[float, int]]:
+        """
+        :return: each child of the array with its expected and maximum number of items, and the expected and maximum
+        number of items drawn from the enum of the array.
+        """
+        pruned = self._pruned(level)
+        lo, hi = _length_range(node.min_items if pruned else node.minimum, node.maximum, pruned)
+        const = len(node.const)
+        parts = []  # type: List[Tuple[Node, float, int]]
+        rest, fixed = None, const
+        if node.items is not None:
+            if node.contains is not None:
+                parts.append((node.contains, 1.0, 1))
+                fixed += 1
+            rest = node.items
+        elif node.positional is not None:
+            parts.extend((child, 1.0, 1) for child in node.positional)
+            fixed += len(node.positional)
+            rest = node.additional
+        choices = 0.0, 0
+        if rest is not None:
+            if node.enums and node.unique:
+                choices = _mean_clipped(lo, hi, 0, len(node.enums)), min(hi, len(node.enums))
+            elif node.enums:
+                # enums are drawn for the whole length, after the fixed items
+                choices = (lo + hi) / 2, hi
+            else:
+                parts.append((rest, _mean_clipped(lo, hi, fixed, inf) - fixed, max(hi, fixed) - fixed))
+        return parts, choices
+
+    def _array(self, node: Array, level: int) -> _Node:
+        child_level = self._level(level + 1)
+        parts, (choices, most_choices) = self._array_parts(node, level)
+        children = [(self._child(child, child_level), expected, most) for child, expected, most in parts]
+        const = len(node.const)
+        const_nodes = sum(_count(value) for value in node.const)
+        const_bytes = sum(_size(value) for value in node.const)
+        enums = node.enums or [None]
+        enum_nodes = [_count(value) for value in enums]
+        enum_bytes = [_size(value) for value in enums]
+        items = const + choices + sum(expected for _, expected, _ in children)
+        most_items = const + most_choices + sum(most for _, _, most in children)
+        nodes = 1 + const_nodes + choices * sum(enum_nodes) / len(enums) + \
+            sum(_times(e.nodes, expected) for (_, e), expected, _ in children)
+        max_nodes = 1 + const_nodes + most_choices * max(enum_nodes) + \
+            sum(_times(e.max_nodes, most) for (_, e), _, most in children)
+        size = 2 + const_bytes + choices * sum(enum_bytes) / len(enums) + \
+            sum(_times(e.bytes, expected) for (_, e), expected, _ in children) + 2 * max(0.0, items - 1)
+        max_size = 2 + const_bytes + most_choices * max(enum_bytes) + \
+            sum(_times(e.max_bytes, most) for (_, e), _, most in children) + 2 * max(0, most_items - 1)
+        cost = CONTAINER_COST + choices * CHOICE_COST + \
+            sum(_times(e.cost + CHILD_COST, expected) for (_, e), expected, _ in children)
+        rest = node.items if node.items is not None else node.additional
+        flags = ['unbounded'] if rest is not None and node.max_items is None else []
+        estimate = _Node(nodes, max_nodes, size, max_size, cost, flags,
+                         [(key, expected) for (key, _), expected, _ in children])
+        self._explosive(estimate, [e for (_, e), _, most in children if most > 0])
+        return estimate
+
+    def _explosive(self, estimate: _Node, children: List[_Node]) -> None:
+        """Flags a container whose worst case reaches the threshold when none of its children does."""
+        if estimate.max_nodes >= self.explosive and all(child.max_nodes < self.explosive for child in children):
+            estimate.flags.add('explosive')
+
+    def _report(self, order: List[_Key], root: _Key) -> Estimate:
+        """Finds how many times each node is expected per document, parents first, and sums the estimates by path."""
+        calls = Counter({root: 1.0})  # type: Counter
+        for key in reversed(order):
+            count = calls[key]
+            if count:
+                for child, weight in self.estimates[key].children:
+                    if weight and child in self.estimates:
+                        calls[child] += count * weight
+        paths = {}  # type: Dict[str, PathEstimate]
+        # sums of values and bytes by path, to average them over the calls, or over the depths when never called
+        sums = {}  # type: Dict[str, List[float]]
+        for key in order:
+            node = self.nodes[key]
+            if not isinstance(node, Profiled):
+                continue
+            path = self.paths.get(id(node.stats))
+            if path is None:
+                continue
+            e, count = self.estimates[key], calls[key]
+            stats = paths.get(path)
+            if stats is None:
+                stats = paths[path] = PathEstimate()
+                sums[path] = [0.0, 0.0, 0.0, 0.0, 0]
+            total = sums[path]
+            total[0] += _times(e.nodes, count)
+            total[1] += _times(e.bytes, count)
+            total[2] += e.nodes
+            total[3] += e.bytes
+            total[4] += 1
+            stats.calls += count
+            stats.cost += _times(e.cost, count)
+            stats.max_nodes = max(stats.max_nodes, e.max_nodes)
+            stats.max_bytes = max(stats.max_bytes, e.max_bytes)
+            stats.flags.update(e.flags)
+        for path, stats in paths.items():
+            nodes, size, all_nodes, all_size, n = sums[path]
+            if stats.calls:
+                stats.nodes, stats.bytes = nodes / stats.calls, size / stats.calls
+            else:
+                stats.nodes, stats.bytes = all_nodes / n, all_size / n
+        e = self.estimates[root]
+        document = PathEstimate()
+        document.calls, document.nodes, document.max_nodes = 1.0, e.nodes, e.max_nodes
+        document.bytes, document.max_bytes, document.cost = e.bytes, e.max_bytes, e.cost
+        document.flags = set().union(*(stats.flags for stats in paths.values()))
+        return Estimate(paths, document)
+
+
+def _leaf(node: Node) -> _Node:
+    """Estimates a node without children from its arguments and the typical values of its provider."""
+    if isinstance(node, Const):
+        return _Node(_count(node.value), _count(node.value), _size(node.value), _size(node.value), 0.0)
+    if isinstance(node, Choice):
+        counts, sizes = [_count(value) for value in node.values], [_size(value) for value in node.values]
+        return _Node(sum(counts) / len(counts), max(counts), sum(sizes) / len(sizes), max(sizes), CHOICE_COST)
+    if isinstance(node, Text):
+        minimum, maximum = node.args
+        per_string, per_letter = TEXT_COST[_backend(node.func)]
+        length = (minimum + maximum) / 2
+        return _Node(1, 1, length + 2, maximum + 2, per_string + per_letter * length,
+                     ['unbounded'] if node.max_length is None else [])
+    if not isinstance(node, Leaf):
+        return _Node(1, 1, UNKNOWN_PROVIDER[1], UNKNOWN_PROVIDER[2], UNKNOWN_PROVIDER[0])
+    func = node.func
+    if isinstance(func, PatternSampler):
+        length, maximum = func.lengths()
+        return _Node(1, 1, length + 2, maximum + 2, PATTERN_COST[0] + PATTERN_COST[1] * length)
+    if isinstance(func, ValuePool):
+        _, size, max_size = _provider(func.provider)
+        return _Node(1, 1, size, max_size, CHOICE_COST)
+    if isinstance(func, Multiple) or getattr(func, '__func__', None) in RANDOM_INTS:
+        # integers between the two arguments, or their multiples
+        random_int, scale = (func.random_int, func.scale) if isinstance(func, Multiple) else (func, int)
+        sizes = [_size(scale(arg)) for arg in node.args]
+        return _Node(1, 1, sum(sizes) / 2, max(sizes), INT_COST[_backend(random_int)])
+    cost, size, max_size = _provider(func)
+    return _Node(1, 1, size, max_size, cost)
+
+
+def _provider(func: Callable) -> Tuple[float, float, int]:
+    if getattr(func, '__func__', None) is Random.uniform:
+        # random.uniform is as fast with either backend
+        return PROVIDERS['fast', 'uniform']
+    return PROVIDERS.get((_backend(func), getattr(func, '__name__', None)), UNKNOWN_PROVIDER)
+
+
+def _backend(func: Callable) -> str:
+    return 'fast' if isinstance(getattr(func, '__self__', None), FastProvider) else 'faker'
+
+
+def _key_lengths(sample_key: Callable, key_len: int) -> Tuple[float, int, float]:
+    """The expected and maximum bytes of the keys of pattern properties, and the cost of a key."""
+    sampler = unwrap(sample_key)
+    if not isinstance(sampler, PatternSampler):
+        return key_len / 2 + 2, key_len + 2, PATTERN_COST[0]
+    length, maximum = sampler.lengths()
+    return min(length, key_len) + 2, min(maximum, key_len) + 2, PATTERN_COST[0] + PATTERN_COST[1] * length
+
+
+def _length_range(minimum: int, maximum: int, pruned: bool) -> Tuple[int, int]:
+    """The least and the most properties or items drawn, as containers draw them."""
+    if pruned or minimum >= maximum:
+        return minimum, minimum
+    return minimum, maximum - 1
+
+
+def _mean_clipped(lo: int, hi: int, a: float, b: float) -> float:
+    """The mean of min(max(k, a), b) for the integers k from lo to hi."""
+    if b <= lo or a >= hi:
+        return min(max(lo, a), b) if b <= lo else min(max(hi, a), b)
+    below = max(0, int(a) - lo)
+    above = max(0, hi - int(b)) if b < inf else 0
+    first, last = lo + below, hi - above
+    middle = (first + last) * (last - first + 1) / 2
+    return (below * a + middle + (above * b if above else 0)) / (hi - lo + 1)
+
+
+def _most(slots: int, values: List[float], repeated: Optional[float]) -> float:
+    """The largest sum of slots values, taking each value at most once and the repeated value any number of times."""
+    total = 0.0
+    for value in sorted(values, reverse=True)[:slots]:
+        if repeated is not None and repeated >= value:
+            break
+        total += value
+        slots -= 1
+    return total + (_times(repeated, slots) if repeated is not None else 0.0)
+
+
+def _times(value: float, weight: float) -> float:
+    """value * weight, where a weight of 0 cancels an infinite value."""
+    return value * weight if weight else 0.0
+
+
+def _count(value: Any) -> int:
+    """The number of JSON values in a value, itself included."""
+    if isinstance(value, dict):
+        return 1 + sum(_count(item) for item in value.values())
+    if isinstance(value, list):
+        return 1 + sum(_count(item) for item in value)
+    return 1
@@ -1,13 +1,32 @@
+import logging
 import random
 import re
-import rstr
-from typing import Union, List, Optional, Dict, Any
+from collections import Counter
+from itertools import islice
+from typing import Union, List, Optional, Dict, Any, Tuple, Iterator, Callable, BinaryIO
 
 from copy import deepcopy
+from functools import lru_cache, wraps
 from faker import Faker
 from faker.providers.python import Provider as PythonProvider
-from jsonschema import RefResolver, Draft4Validator
+from jsonschema import RefResolver, Draft4Validator, ValidationError
 from math import ceil, floor
+from time import perf_counter
+
+from jsongen import columnar, parallel, plan
+from jsongen.cache import LRUCache
+from jsongen.canonical import canonical_key, fingerprint
+from jsongen.emit import JsonWriter
+from jsongen.estimate import Estimate, estimate
+from jsongen.fast import FastProvider
+from jsongen.plan import GenerationPlan
+from jsongen.pool import PoolPolicy, ValuePool
+from jsongen.profile import Profiler, pointer
+from jsongen.unique import UniqueItems, item_domain
+from jsongen.validation import ValidationPolicy
+from jsongen.xeger import PatternSampler, compile_pattern
+
+logger = logging.getLogger(__name__)
 
 
 class JsonProvider(PythonProvider):
@@ -36,6 +55,25 @@ class JsonProvider(PythonProvider):
 type_not_matching_str = "key value types do not match"
 
 
+def _union(first: list, second: list) -> list:
+    """
+    The items of both lists without duplicates, in the order they first appear. Items are compared by their canonical
+    keys, so lists of subschemas can be merged too.
+    """
+    union = {}
+    for item in first + second:
+        union.setdefault(canonical_key(item), item)
+    return list(union.values())
+
+
+def _difference(first: list, second: list) -> list:
+    """
+    The items of the first list that are not in the second list, in order. Items are compared by their canonical keys.
+    """
+    exclude = {canonical_key(item) for item in second}
+    return [item for item in first if canonical_key(item) not in exclude]
+
+
 def _update(target: dict, updates: dict) -> dict:
     """
     Updates an existing JSON schema. If the item is a list it is appended with the new values. If the item is a dict it
@@ -53,7 +91,7 @@ def _update(target: dict, updates: dict) -> dict:
         elif isinstance(v, list):
             vt = target.get(k, [])
             assert isinstance(vt, list), type_not_matching_str
-            target[k] = list(set(vt + v))
+            target[k] = _union(vt, v)
         else:
             vt = target.get(k, v)
             if 'min' in k:
@@ -69,29 +107,24 @@ def _update(target: dict, updates: dict) -> dict:
 
 def _symmetric_difference(provided: dict, chosen: dict) -> dict:
     """
-    Returns the fields that are not in common between provided and chosen JSON schema.
+    Returns the fields that are not in common between provided and chosen JSON schema. Neither schema is modified.
 
     :param provided: the JSON schema to removed the chosen schema from.
     :param chosen: the JSON schema to remove from the provided schema.
     :return: a JSON schema with the chosen JSON schema removed.
     """
-    remove_keys = []
+    difference = {}
     for k, vp in provided.items():
         vc = chosen.get(k)
-        if vc is not None:
-            if isinstance(vp, dict):
-                vc = chosen.get(k, {})
-                assert isinstance(vc, dict), type_not_matching_str
-                provided[k] = _symmetric_difference(vp, vc)
-            elif isinstance(vp, list):
-                vc = chosen.get(k, [])
-                assert isinstance(vc, list), type_not_matching_str
-                provided[k] = [i for i in vp if i not in vc]  # quadratic performance, optimize
-            else:
-                remove_keys.append(k)
-    for k in remove_keys:
-        provided.pop(k)
-    return provided
+        if vc is None:
+            difference[k] = vp
+        elif isinstance(vp, dict):
+            assert isinstance(vc, dict), type_not_matching_str
+            difference[k] = _symmetric_difference(vp, vc)
+        elif isinstance(vp, list):
+            assert isinstance(vc, list), type_not_matching_str
+            difference[k] = _difference(vp, vc)
+    return difference
 
 
 def _remove(target, delete):
@@ -107,14 +140,24 @@ def _remove(target, delete):
             if k == 'required':
                 for req in v:
                     target['properties'].pop(req, None)
-                target[k] = [i for i in target[k] if i not in v]  # quadratic performance, optimize
+                target[k] = _difference(target[k], v)
             elif isinstance(v, dict):
                 target[k] = _remove(dv, v)
             elif isinstance(v, list):
-                target[k] = [i for i in dv if i not in v]  # quadratic performance, optimize
+                target[k] = _difference(dv, v)
     return target
 
 
+@lru_cache(maxsize=4096)
+def _escape_dots(pattern: str) -> str:
+    # The '.' needs to be escaped because JSON schema regexs don't treat '.' as a special character.
+    return re.sub(r'\.', r'\.', pattern)
+
+
+def _target_bytes(target_bytes: Union[int, str, None]) -> Optional[int]:
+    return None if target_bytes is None else plan.parse_size(target_bytes)
+
+
 class JsonGenerator(object):
     """Generate a random JSON document based on the provided schema."""
 
@@ -130,8 +173,15 @@ class JsonGenerator(object):
     UNBOUND_MIN_OBJECTS = 1
     UNBOUND_MAX_OBJECTS = 16
 
+    # The most repetitions added above the minimum for unbounded repeats such as '*' and '+' in patterns.
+    UNBOUND_MAX_REPEAT = 16
+
     KEY_LEN = 64
 
+    # The most schemas whose plans and validators are kept, and the most subschemas whose effective schemas are kept.
+    CACHE_SIZE = 256
+    EFFECTIVE_CACHE_SIZE = 4096
+
     #  Providers of the Faker library used to generate data in a specific format. The dictionary key name must match
     #  the format field of the JSON schema. Example:
     #   "stop_time": {
@@ -146,14 +196,36 @@ class JsonGenerator(object):
         'email': 'email'
     }
 
-    def __init__(self, resolver: RefResolver=None, formats: dict=None) -> None:
+    def __init__(self, resolver: RefResolver=None, formats: dict=None,
+                 validation: Union[str, ValidationPolicy]='always', strict: bool=True, seed: Optional[int]=None,
+                 backend: str='faker', max_depth: Optional[int]=None, max_nodes: Optional[int]=None,
+                 profile: bool=False, pools: Union[int, PoolPolicy, None]=None) -> None:
         """
         :param resolver: used to resolved '$ref' within the schema.
         :param formats: replaces _default_format_generators for determining the type of strings to generate. Must be a
         dict with keys associated with JSON string formats, and items as strings matching a Faker providers.
         Attributes of the Faker library used to generate data in a specific format.
+        :param validation: which generated documents are validated against their schema. Either a ValidationPolicy or
+        one of 'always', 'never', 'sample(rate)' or 'first(n)'.
+        :param strict: if True an invalid document raises a ValidationError, otherwise it is counted in stats['invalid']
+        and logged.
+        :param seed: seeds the generator. Every random choice made during generation, including those made by Faker, is
+        drawn from self.random.
+        :param backend: what generates strings, numbers, booleans and formatted strings. 'faker' uses Faker's
+        providers, 'fast' uses the much faster FastProvider and falls back to Faker for formats it doesn't provide.
+        Schemas with 'fake' always use Faker.
+        :param max_depth: objects and arrays nested deeper than this only get their required properties and minItems
+        items, which bounds recursive schemas. None, the default, for no limit.
+        :param max_nodes: once a document has this many values, objects and arrays only get their required properties
+        and minItems items, which bounds the size of each document. None for no limit.
+        :param profile: if True generation is profiled per schema path in self.profiler, see jsongen.profile. It slows
+        generation down and only covers documents generated in this process.
+        :param pools: pre-generates the values of formats and 'fake' providers in pools that are sampled instead of
+        calling the provider, see jsongen.pool. Either a PoolPolicy or the size of each pool. None calls the providers.
         """
+        self.random = random.Random(seed)
         self.faker = Faker()
+        self.faker.random = self.random
         self.faker.add_provider(JsonProvider)
         self._fake_pytypes = [self.faker.jsondict, self.faker.pybool, self.faker.pystr, self.faker.pyint,
                               self.faker.pyfloat, self.faker.jsonlist]
@@ -161,246 +233,551 @@ class JsonGenerator(object):
         for value in self.formats.values():
             if not getattr(self.faker, value):
                 raise KeyError(f"'{value}' provider not an attribute of Faker.")
+        if backend == 'faker':
+            self.provider = self.faker
+        elif backend == 'fast':
+            self.provider = FastProvider(self.random)
+        else:
+            raise ValueError(f"Unknown backend '{backend}'.")
         self.resolver = resolver if resolver else RefResolver('', '')
         self.path = []  # type: List[str]
+        self._compiled_refs = {}  # type: Dict[str, plan.Ref]
+        # Caches are bounded, so generators given fresh schemas for a long time don't keep every one of them. Entries
+        # keyed by id hold their schema, so its id can't be reused by another object while the entry exists.
+        self._effective_cache = LRUCache(self.EFFECTIVE_CACHE_SIZE)  # (schema, effective schemas) by id
+        self._fingerprints = LRUCache(self.CACHE_SIZE)  # (schema, fingerprint) by id, to tell modified schemas
+        self.validation = ValidationPolicy.parse(validation)
+        self.strict = strict
+        self._validators = LRUCache(self.CACHE_SIZE)  # validators by fingerprint
+        self._plans = LRUCache(self.CACHE_SIZE)  # plans by fingerprint
+        self._column_plans = LRUCache(self.CACHE_SIZE)  # column plans by fingerprint
+        # 'documents' generated, how many of them were 'validated' and how many were 'invalid'.
+        self.stats = Counter()  # type: Counter
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.profiler = Profiler() if profile else None  # type: Optional[Profiler]
+        self.pools = PoolPolicy.parse(pools)
+        # Pools by backend and provider name. Their values are seeded by name, so they don't depend on when a schema
+        # is compiled.
+        self._pools = {}  # type: Dict[Tuple[str, str], ValuePool]
+        self._pool_seed = self.random.getrandbits(64) if self.pools is not None else None
+
+    def generate_json(self, schema: dict, target_bytes: Union[int, str, None]=None) -> dict:
+        """
+        Generates a document with the compiled plan of the schema, which is cached by the fingerprint of the schema, so
+        the schema can be modified between calls. Schemas it references through the resolver must not be modified.
+
+        :param schema: the JSON schema to generate data from.
+        :param target_bytes: the size each document should have once serialized by json.dumps, in bytes or as a string
+        such as '100KB'. Array lengths, optional properties and the length of strings without a pattern or format are
+        chosen while generating to reach it. Documents of schemas that bound their size stay within those bounds.
+        :return: generated JSON data
+        """
+        key = self._fingerprint(schema)
+        validator = self._validator(schema, key)
+        impostor = self._plan(schema, key)(_target_bytes(target_bytes))
+        self._validate(validator, impostor)
+        return impostor
 
-    def generate_json(self, schema: dict) -> dict:
+    def emit_json(self, schema: dict, stream: BinaryIO, target_bytes: Union[int, str, None]=None) -> int:
         """
+        Writes a document to a binary stream as it is generated, so neither the document nor its serialization is held
+        in memory. The bytes are those of json.dumps(self.generate_json(schema, target_bytes)) with the same seed.
+        Documents the validation policy picks are built in memory to be validated, so use the 'never' or a sampling
+        policy to write very large documents.
+
         :param schema: the JSON schema to generate data from.
+        :param stream: a writable binary stream.
+        :param target_bytes: the size of the document, see generate_json.
+        :return: the number of bytes written.
+        """
+        out = JsonWriter(stream)
+        key = self._fingerprint(schema)
+        self._write(self._plan(schema, key), self._validator(schema, key), out, _target_bytes(target_bytes))
+        out.flush()
+        return out.position
+
+    def iter_json(self, schema: dict, target_bytes: Union[int, str, None]=None) -> Iterator[dict]:
+        """
+        Checks and compiles the schema once, then lazily generates an endless stream of documents from it.
+
+        :param schema: the JSON schema to generate data from.
+        :param target_bytes: the size of each document, see generate_json.
+        :return: an iterator of generated JSON data.
+        """
+        key = self._fingerprint(schema)
+        return self._iter_plan(self._plan(schema, key), self._validator(schema, key), _target_bytes(target_bytes))
+
+    def generate_many(self, schema: dict, n: int, target_bytes: Union[int, str, None]=None) -> Iterator[dict]:
+        """
+        Like iter_json but stops after n documents.
+
+        :param schema: the JSON schema to generate data from.
+        :param n: the number of documents to generate.
+        :param target_bytes: the size of each document, see generate_json.
+        :return: an iterator of n generated JSON documents.
+        """
+        return islice(self.iter_json(schema, target_bytes), n)
+
+    def generate_parallel(self, schema: dict, n: int, workers: Optional[int]=None, seed: Optional[int]=None,
+                          chunk_size: Optional[int]=None, target_bytes: Union[int, str, None]=None) -> Iterator[dict]:
+        """
+        Generates n documents over a pool of worker processes. The schema is checked and compiled before the workers
+        are forked, so they share it. Each document is seeded from the seed and its index, so the same seed gives the
+        same documents in the same order for any number of workers.
+
+        :param schema: the JSON schema to generate data from.
+        :param n: the number of documents to generate.
+        :param workers: the number of worker processes. Defaults to the number of CPUs.
+        :param seed: the seed of the run. If None a random seed is used.
+        :param chunk_size: the number of documents sent to a worker at a time.
+        :param target_bytes: the size of each document, see generate_json.
+        :return: an iterator of n generated JSON documents, in a stable order.
+        """
+        key = self._fingerprint(schema)
+        validator = self._validator(schema, key)
+        generate = self._plan(schema, key)
+        target_bytes = _target_bytes(target_bytes)
+
+        def make_document(document_seed: int) -> dict:
+            self._seed(document_seed)
+            impostor = generate(target_bytes)
+            self._validate(validator, impostor)
+            return impostor
+
+        seed = self.random.getrandbits(64) if seed is None else seed
+        return parallel.generate_parallel(make_document, n, seed, self.stats, workers, chunk_size)
+
+    def generate_at(self, schema: dict, index: int, seed: int, target_bytes: Union[int, str, None]=None) -> dict:
+        """
+        Generates the document at index in the run of documents seeded with seed, without generating the documents
+        before it. It is the same document generate_parallel(schema, n, seed=seed) yields at that index.
+
+        :param schema: the JSON schema to generate data from.
+        :param index: the index of the document within the run.
+        :param seed: the seed of the run.
+        :param target_bytes: the size of the document, see generate_json.
         :return: generated JSON data
         """
-        validator = Draft4Validator(schema, resolver=self.resolver)
-        validator.check_schema(schema)
-        impostor = self._gen_json(schema)
-        validator.validate(impostor)
+        key = self._fingerprint(schema)
+        validator = self._validator(schema, key)
+        generate = self._plan(schema, key)
+        self._seed(parallel.document_seed(seed, index))
+        impostor = generate(_target_bytes(target_bytes))
+        self._validate(validator, impostor)
         return impostor
 
-    def _gen_json(self, schema: dict):
+    def generate_columns(self, schema: dict, n: int, as_columns: bool=False) -> Union[List[dict], columnar.ColumnBatch]:
+        """
+        Generates a batch of documents column by column with NumPy, which is much faster for flat or shallow object
+        schemas. Properties that can't be vectorized, such as patterns, formats, arrays and anyOf/oneOf, are generated
+        one document at a time by the compiled plan. Requires numpy.
+
+        :param schema: the JSON schema to generate data from.
+        :param n: the number of documents to generate.
+        :param as_columns: if True the columns are returned without assembling documents, and aren't validated.
+        :return: the generated JSON documents, or a ColumnBatch if as_columns is True.
+        """
+        key = self._fingerprint(schema)
+        validator = self._validator(schema, key)
+        generate = self._column_plans.get(key)
+        if generate is None:
+            generate = self._column_plans[key] = columnar.compile_columns(self, schema)
+        batch = generate(columnar.np.random.default_rng(self.random.getrandbits(64)), n)
+        if as_columns:
+            return batch
+        documents = batch.to_documents()
+        for impostor in documents:
+            self._validate(validator, impostor)
+        return documents
+
+    def _seed(self, seed: int) -> None:
+        """
+        Reseeds self.random, the only source of randomness used during generation, and the validation policy, so
+        which documents are validated doesn't depend on which process generates them.
+        """
+        self.random.seed(seed)
+        self.validation.seed(seed)
+        if isinstance(self.provider, FastProvider):
+            self.provider.reset()
+
+    def _iter_plan(self, generate: GenerationPlan, validator: Draft4Validator,
+                   target_bytes: Optional[int]=None) -> Iterator[dict]:
+        while True:
+            impostor = generate(target_bytes)
+            self._validate(validator, impostor)
+            yield impostor
+
+    def _fingerprint(self, schema: dict) -> str:
+        """
+        Returns the fingerprint of the schema. It is computed on every call, so a schema modified in place between calls
+        gets a plan and a validator of its own. A schema object whose fingerprint changed since it was last seen also
+        clears the effective schemas, which are cached by the identity of the subschemas.
+        """
+        key = fingerprint(schema)
+        cached = self._fingerprints.get(id(schema))
+        if cached is not None and cached[1] != key:
+            self._effective_cache.clear()
+        self._fingerprints[id(schema)] = (schema, key)
+        return key
+
+    def _validator(self, schema: dict, key: Optional[str]=None) -> Draft4Validator:
+        """
+        Returns a validator for the schema, checking the schema against the metaschema the first time it is seen.
+        Validators are cached by the fingerprint of the schema, key if it was already computed.
+        """
+        key = key or self._fingerprint(schema)
+        validator = self._validators.get(key)
+        if validator is None:
+            Draft4Validator.check_schema(schema)
+            validator = self._validators[key] = Draft4Validator(schema, resolver=self.resolver)
+        return validator
+
+    def _plan(self, schema: dict, key: Optional[str]=None) -> GenerationPlan:
+        """
+        Returns the compiled plan for the schema. Plans are cached by the fingerprint of the schema, key if it was
+        already computed.
+        """
+        key = key or self._fingerprint(schema)
+        generate = self._plans.get(key)
+        if generate is None:
+            generate = self._plans[key] = self.compile(schema)
+        return generate
+
+    def _validate(self, validator: Draft4Validator, impostor) -> None:
+        """Validates the generated document if the validation policy asks for it."""
+        count = self.stats['documents']
+        self.stats['documents'] += 1
+        if self.validation.should_validate(count):
+            self._check(validator, impostor)
+
+    def _write(self, generate: GenerationPlan, validator: Draft4Validator, out: JsonWriter,
+               target_bytes: Optional[int]=None) -> None:
+        """
+        Writes a document to out as it is generated. A document the validation policy asks to validate is built in
+        memory, validated and then written.
+        """
+        count = self.stats['documents']
+        self.stats['documents'] += 1
+        if self.validation.should_validate(count):
+            impostor = generate(target_bytes)
+            self._check(validator, impostor)
+            out.value(impostor)
+        else:
+            generate.write(out, target_bytes)
+
+    def _check(self, validator: Draft4Validator, impostor) -> None:
+        self.stats['validated'] += 1
+        try:
+            validator.validate(impostor)
+        except ValidationError as ex:
+            self.stats['invalid'] += 1
+            if self.strict:
+                raise
+            logger.warning("Generated an invalid document: %s", ex.message)
+
+    def estimate(self, schema: dict, explosive: int=10 ** 5) -> Estimate:
+        """
+        Estimates the documents of the schema without generating any, see jsongen.estimate. Pools are filled when the
+        schema is compiled, as they would be by the first document.
+
+        :param schema: the JSON schema to estimate.
+        :param explosive: the worst-case number of values from which a subtree is flagged as explosive.
+        :return: the expected and worst-case number of values and bytes and the expected relative cost of generation,
+        per schema path and per document, with unbounded, recursive and explosive paths flagged.
+        """
+        # the plan is compiled with a profiler of its own, which names the path of each node
+        profiler, self.profiler = self.profiler, Profiler()
+        try:
+            generate = self.compile(schema)
+            paths = {id(stats): path for path, stats in self.profiler.paths.items()}
+        finally:
+            self.profiler = profiler
+        return estimate(generate.root, paths, self.max_depth, explosive)
+
+    def compile(self, schema: dict) -> GenerationPlan:
+        """
+        Compiles the schema into a reusable plan. References are resolved, combinators merged and value providers bound
+        once, so calling the plan repeatedly generates documents much faster than interpreting the schema each time.
+
+        :param schema: the JSON schema to generate data from.
+        :return: a plan that generates JSON data when called, from the schema as it is when compiled.
+        """
+        # drops the effective schemas of the schema if it was modified since it was last seen
+        self._fingerprint(schema)
+        self._compiled_refs = {}
+        path, self.path = self.path, [self.resolver.resolution_scope]
+        try:
+            root = self._compile_json(schema)
+        finally:
+            self._compiled_refs = {}
+            self.path = path
+        return GenerationPlan(schema, root, self.max_depth, self.max_nodes)
+
+    def _format(self, generate_format: str) -> Callable[[], str]:
+        """Returns the provider generating strings in the format, falling back to Faker."""
+        name = self.formats[generate_format]
+        return self._pooled(name, getattr(self.provider, name, None) or getattr(self.faker, name))
+
+    def _fake(self, fake: str) -> Callable[[], Any]:
+        """Returns the Faker provider named by the 'fake' of a schema."""
+        return self._pooled(fake, getattr(self.faker, fake))
+
+    def _pooled(self, name: str, provider: Callable[[], Any]) -> Callable[[], Any]:
+        """Returns the pool of the provider if the pool policy covers it, otherwise the provider."""
+        if self.pools is None or not self.pools.covers(name):
+            return provider
+        backend = 'fast' if isinstance(getattr(provider, '__self__', None), FastProvider) else 'faker'
+        pool = self._pools.get((backend, name))
+        if pool is None:
+            # The values are generated by a provider of their own, so they can be generated in the background.
+            rng = random.Random(f'{self._pool_seed}:{backend}:{name}')
+            if backend == 'fast':
+                source = FastProvider(rng)
+            else:
+                source = Faker()
+                source.random = rng
+                source.add_provider(JsonProvider)
+            pool = self._pools[backend, name] = ValuePool(getattr(source, name), self.random, self.pools)
+        return pool
+
+    def _pattern(self, pattern: str) -> PatternSampler:
+        """Returns the cached sampler generating strings that match the pattern."""
+        return compile_pattern(pattern, self.UNBOUND_MAX_REPEAT)
+
+    def _property_pattern(self, pattern: str) -> PatternSampler:
+        """Like _pattern, for the keys of patternProperties."""
+        return self._pattern(_escape_dots(pattern))
+
+    def _unique_items(self, schema: dict, generate: Callable[[], Any]) -> UniqueItems:
+        """
+        :param schema: the item schema of an array with uniqueItems.
+        :param generate: generates an item.
+        :return: appends unique items, sampling without replacement when the values of the schema can be enumerated.
+        """
+        return UniqueItems(generate, *item_domain(self, schema))
+
+    def _effective_schemas(self, schema: dict) -> List[dict]:
+        """
+        Merges allOf into the schema and returns one merged schema for every combination of anyOf and oneOf branches,
+        so choosing a branch is a uniform choice from the returned list. The result is computed once per schema object
+        and cached, up to EFFECTIVE_CACHE_SIZE of them. The cache is cleared when a schema is modified in place between
+        calls, see _fingerprint.
+
+        :param schema: the JSON schema to merge.
+        :return: the effective schemas. These are shared between calls and must not be modified.
+        """
+        if 'allOf' not in schema and 'anyOf' not in schema and 'oneOf' not in schema:
+            return [schema]
+        cached = self._effective_cache.get(id(schema))
+        if cached is not None:
+            return cached[1]
+        base = deepcopy(schema)
+        all_of = base.get('allOf')
+        if all_of is not None:
+            for subschema in all_of:
+                _update(base, subschema)
+        any_of = base.get('anyOf')
+        if any_of is not None:
+            candidates = [_update(deepcopy(base), subschema) for subschema in any_of]
+        else:
+            candidates = [base]
+        effective = []
+        for candidate in candidates:
+            one_of = candidate.get('oneOf')
+            if one_of is None:
+                effective.append(candidate)
+                continue
+            for subschema_choice in one_of:
+                remove_subschema = {}  # type: Dict[str, Any]
+                for subschema in one_of:
+                    if subschema is not subschema_choice:
+                        _update(remove_subschema, _symmetric_difference(subschema, subschema_choice))
+                temp_schema = _update(deepcopy(candidate), subschema_choice)
+                effective.append(_remove(temp_schema, remove_subschema))
+        # The schema is kept alive with its entry so its id can't be reused by another object.
+        self._effective_cache[id(schema)] = (schema, effective)
+        return effective
+
+    def _compile_json(self, schema: dict) -> plan.Node:
         scope = schema.get("id")
+        path = self.path
         if scope:
             self.resolver.push_scope(scope)
+            # schemas with an id, such as those inlined by HCAJsonGenerator, are profiled relative to it
+            self.path = [self.resolver.resolution_scope]
         try:
-            # should be inside an object now otherwise there should be a ref.
             ref = schema.get(u"$ref")
             if ref is not None:
-                impostor = self._ref(ref)
+                node = self._compile_ref(ref)
             else:
-                # Using a combination of allOf, anyOf, and oneOf can produce an invalid JSON schema if a combination
-                # of the sub-schemas can contradict one another.
-                temp_schema = deepcopy(schema)
-                all_of = temp_schema.get('allOf')
-                if all_of is not None:
-                    for subschema in all_of:
-                        _update(temp_schema, subschema)
-                any_of = temp_schema.get('anyOf')
-                if any_of is not None:
-                    subschema = random.choice(any_of)
-                    _update(temp_schema, subschema)
-                one_of = temp_schema.get('oneOf')
-                if one_of is not None:
-                    subschema_choice = random.choice(one_of)
-                    _update(temp_schema, subschema_choice)
-                    remove_subschema = {}  # type: Dict[str, Any]
-                    for subschema in one_of:
-                        if subschema is not subschema_choice:
-                            _update(remove_subschema, _symmetric_difference(subschema, subschema_choice))
-                    _remove(temp_schema, remove_subschema)
-
-                json_type = temp_schema.get(u"type", "object")
-                impostor = getattr(self, f"_{json_type}")(temp_schema)
+                branches = [getattr(self, f"_compile_{temp_schema.get(u'type', 'object')}")(temp_schema)
+                            for temp_schema in self._effective_schemas(schema)]
+                node = branches[0] if len(branches) == 1 else plan.Branch(self.random.choice, branches)
+            if self.profiler is not None:
+                node = plan.Profiled(node, self.profiler, self.profiler.stats(pointer(self.path or [''])),
+                                     isinstance(node, plan.Leaf) and isinstance(node.func, PatternSampler))
         finally:
             if scope:
                 self.resolver.pop_scope()
-        return impostor
+                self.path = path
+        return node
 
-    def _ref(self, r: str):
+    def _compile_at(self, schema: dict, *segments: Union[str, int]) -> plan.Node:
+        """Compiles a subschema, with the keys leading to it added to self.path."""
+        self.path.extend(segments)
+        try:
+            return self._compile_json(schema)
+        finally:
+            del self.path[-len(segments):]
+
+    def _compile_ref(self, r: str) -> plan.Node:
         resolve = getattr(self.resolver, "resolve", None)
         if resolve is None:
             with self.resolver.resolving(r) as resolved:
-                impostor = self._gen_json(resolved)
-        else:
-            scope, resolved = self.resolver.resolve(r)
+                return self._compile_json(resolved)
+        scope, resolved = self.resolver.resolve(r)
+        node = self._compiled_refs.get(scope)
+        if node is None:
+            node = self._compiled_refs[scope] = plan.Ref()
             self.resolver.push_scope(scope)
+            # the referenced schema is profiled where it is defined
+            path, self.path = self.path, [scope]
             try:
-                impostor = self._gen_json(resolved)
+                node.target = self._compile_json(resolved)
             finally:
+                self.path = path
                 self.resolver.pop_scope()
-        return impostor
+        return node
 
-    def _common(self, schema: dict):
+    def _profile_pattern(self, sample: Callable[[random.Random], str]) -> Callable[[random.Random], str]:
+        """Adds the time taken by a pattern property key sampler to the pattern time of the object being compiled."""
+        if self.profiler is None:
+            return sample
+        stats = self.profiler.stats(pointer(self.path or ['']))
+
+        @wraps(sample)
+        def profiled(rng):
+            start = perf_counter()
+            try:
+                return sample(rng)
+            finally:
+                stats.pattern_time += perf_counter() - start
+        return profiled
+
+    def _compile_common(self, schema: dict) -> Optional[plan.Node]:
         fake = schema.get('fake')
-        impostor = schema.get('const')
+        const = schema.get('const')
         enums = schema.get('enum')
         if fake:
-            impostor = getattr(self.faker, fake)()
-        elif not impostor and enums:
-            impostor = random.choice(enums)
-        return impostor
-
-    def _object(self, schema: dict) -> dict:
-        impostor = self._common(schema)
-        if impostor is None:
+            return plan.Leaf(self._fake(fake))
+        if not const and enums:
+            return plan.Choice(self.random.choice, list(enums))
+        if const is not None:
+            return plan.Const(const)
+        return None
+
+    def _compile_object(self, schema: dict) -> plan.Node:
+        node = self._compile_common(schema)
+        if node is None:
             required = schema.get('required', [])
-            properties = schema.get('properties')
-            if properties:
-                properties = list(schema['properties'].keys())
-            impostor = {}
-            # create required
-            for j_object in required:
-                self.path.append(j_object)
-                impostor[j_object] = self._gen_json(schema['properties'][j_object])
-                properties.remove(j_object)
-                self.path.pop()
-            maximum = schema.get('maxProperties', self.UNBOUND_MAX_OBJECTS)
-            minimum = schema.get('minProperties', self.UNBOUND_MIN_OBJECTS)
-            make_properties = minimum if minimum == maximum else random.randrange(minimum, maximum)
-            if len(impostor) < make_properties:
-                options = []
-                if properties:
-                    options.append('pr')
-                pattern_properties = schema.get('patternProperties')
-                if pattern_properties:
-                    options.append('pa')
-                    # The '.' needs to be escaped because JSON schema regexs don't treat '.' as a special character.
-                    patterns = [(pattern, re.sub(r'\.', '\.', pattern)) for pattern in pattern_properties.keys()]
-                additional_properties = schema.get('additionalProperties')
-                if additional_properties:
-                    options.append('ad')
-                while len(impostor) < make_properties:
-                    #  make a property if there are properties to make
-                    if options:
-                        choice = random.choice(options)
-                    else:
-                        break  # in case there are no other options
-
-                    if choice == 'pr':  # make properties if any remain
-                        j_object = random.choice(properties)
-                        properties.remove(j_object)
-                        impostor[j_object] = self._gen_json(schema['properties'][j_object])
-                        if not properties:
-                            options.remove('pr')
-                    elif choice == 'pa':  # make a patternProperty
-                        pattern, pyregex = random.choice(patterns)
-                        j_object = rstr.xeger(pyregex)[:self.KEY_LEN]
-                        impostor[j_object] = self._gen_json(pattern_properties[pattern])
-                    elif choice == 'ad':  # make an additionalProperty
-                        j_object = self.faker.uuid4()
-                        impostor[j_object] = random.choice(self._fake_pytypes)()
-        return impostor
-
-    def _number(self, schema: dict) -> Union[int, float]:
-        impostor = self._common(schema)
-        if impostor is None:
+            properties = schema.get('properties') or {}
+            required_nodes = [(j_object, self._compile_at(schema['properties'][j_object], 'properties', j_object))
+                              for j_object in required]
+            required = set(required)
+            property_nodes = [(j_object, self._compile_at(subschema, 'properties', j_object))
+                              for j_object, subschema in properties.items() if j_object not in required]
+            pattern_properties = schema.get('patternProperties') or {}
+            pattern_nodes = [(self._profile_pattern(self._property_pattern(pattern)),
+                              self._compile_at(subschema, 'patternProperties', pattern))
+                             for pattern, subschema in pattern_properties.items()]
+            node = plan.Object(self.random, required_nodes, property_nodes, pattern_nodes,
+                               bool(schema.get('additionalProperties')),
+                               schema.get('minProperties', self.UNBOUND_MIN_OBJECTS),
+                               schema.get('maxProperties', self.UNBOUND_MAX_OBJECTS),
+                               self.KEY_LEN, self.provider.uuid4, self._fake_pytypes, schema.get('maxProperties'),
+                               schema.get('minProperties', 0))
+        return node
+
+    def _compile_number(self, schema: dict) -> plan.Node:
+        node = self._compile_common(schema)
+        if node is None:
             maximum = schema.get('maximum', schema.get('exclusiveMaximum', self.UNBOUND_MAX_INT) - 1e-12)
             minimum = schema.get('minimum', schema.get('exclusiveMinimum', self.UNBOUND_MIN_INT) + 1e-12)
             if minimum == maximum:
-                impostor = minimum
+                node = plan.Const(minimum)
             else:
                 multiple_of = schema.get('multipleOf')
                 if multiple_of is not None:
                     if multiple_of <= 0:
                         raise ValueError("multipleOf must be > 0")
-                    v = self.faker.random_int(ceil(minimum / multiple_of), floor(maximum / multiple_of))
-                    impostor = round(v * multiple_of, 12)
+                    node = plan.Leaf(plan.Multiple(self.provider.random_int, multiple_of, 12),
+                                     ceil(minimum / multiple_of), floor(maximum / multiple_of))
                 else:
-                    impostor = self.faker.random.uniform(minimum, maximum)
-        return impostor
+                    node = plan.Leaf(self.random.uniform, minimum, maximum)
+        return node
 
-    def _integer(self, schema: dict) -> int:
-        impostor = self._common(schema)
-        if impostor is None:
+    def _compile_integer(self, schema: dict) -> plan.Node:
+        node = self._compile_common(schema)
+        if node is None:
             maximum = schema.get('maximum', schema.get('exclusiveMaximum', self.UNBOUND_MAX_INT) - 1)
             minimum = schema.get('minimum', schema.get('exclusiveMinimum', self.UNBOUND_MIN_INT) + 1)
             if minimum == maximum:
-                impostor = minimum
+                node = plan.Const(minimum)
             else:
                 multiple_of = schema.get('multipleOf')
                 if multiple_of is not None:
                     if multiple_of <= 0:
                         raise ValueError("multipleOf must be > 0")
-                    v = self.faker.random_int(ceil(minimum / multiple_of), floor(maximum / multiple_of))
-                    impostor = v * multiple_of
+                    node = plan.Leaf(plan.Multiple(self.provider.random_int, multiple_of),
+                                     ceil(minimum / multiple_of), floor(maximum / multiple_of))
                 else:
-                    impostor = self.faker.random_int(minimum, maximum)
-        return impostor
+                    node = plan.Leaf(self.provider.random_int, minimum, maximum)
+        return node
 
-    def _string(self, schema: dict) -> str:
-        impostor = self._common(schema)
-        if impostor is None:
+    def _compile_string(self, schema: dict) -> plan.Node:
+        node = self._compile_common(schema)
+        if node is None:
             generate_format = schema.get('format')
             generate_pattern = schema.get('pattern')
             if generate_format:
-                impostor = getattr(self.faker, self.formats[generate_format])()
+                node = plan.Leaf(self._format(generate_format))
             elif generate_pattern:
-                impostor = rstr.xeger(generate_pattern)
+                node = plan.Leaf(self._pattern(generate_pattern), self.random)
             else:
                 maximum = schema.get('maxLength', self.UNBOUND_MAX_STRING)
                 minimum = schema.get('minLength', self.UNBOUND_MIN_STRING)
-                impostor = self.faker.pystr(minimum, maximum)
-        return impostor
+                node = plan.Text(self.provider.pystr, minimum, maximum, schema.get('maxLength'))
+        return node
 
-    def _boolean(self, schema: dict) -> bool:
-        impostor = self._common(schema)
-        if impostor is None:
-            impostor = self.faker.pybool()
-        return impostor
+    def _compile_boolean(self, schema: dict) -> plan.Node:
+        node = self._compile_common(schema)
+        if node is None:
+            node = plan.Leaf(self.provider.pybool)
+        return node
 
-    def _array(self, schema: dict) -> list:
+    def _compile_array(self, schema: dict) -> plan.Node:
         items = schema.get('items')
         contains = schema.get('contains')
-        unique = schema.get('uniqueItems', False)
+        additional_items = schema.get('additionalItems')
         minimum = schema.get('minItems', self.UNBOUND_MIN_ITEMS)
-        maximum = schema.get('maxItems', minimum + self.UNBOUND_MAX_ITEMS)
-        length = minimum if minimum == maximum else random.randrange(minimum, maximum)
-
-        def simple_gen(make_item):
-            if enums:
-                impostor.extend(random.choices(enums, k=length))
-            else:
-                while len(impostor) < length:
-                    impostor.append(self._gen_json(make_item))
-
-        def unique_gen(make_item):
-            if enums:
-                random.shuffle(enums)
-                impostor.extend(enums[:length])
-            else:
-                _retry = 3   # To prevent infinite loops
-                while len(impostor) < length and _retry:
-                    _retry -= 1
-                    u_item = self._gen_json(make_item)
-                    if u_item not in impostor:
-                        impostor.append(u_item)
-                        _retry = 3
-
-        impostor = schema.get('const', [])
         enums = schema.get('enum')
-        if isinstance(items, dict):
-            if contains:
-                impostor.append(self._gen_json(contains))
-            if unique:
-                unique_gen(items)
-            else:
-                simple_gen(items)
-        elif isinstance(items, list):
-            # TODO: Handle contains
-            additional_items = schema.get('additionalItems')
-            if unique:
-                item_count = len(items)
-                i = 0
-                retry = 0  # To prevent infinite loops
-                while i < item_count and retry < 3:
-                    item = self._gen_json(items[i])
-                    retry += 1
-                    if item not in impostor:
-                        impostor.append(item)
-                        i += 1
-                        retry = 0
-                if additional_items:
-                    unique_gen(additional_items)
-            else:
-                for item in items:
-                    impostor.append(self._gen_json(item))
-                if additional_items:
-                    simple_gen(additional_items)
-        return impostor
+        unique = schema.get('uniqueItems', False)
+        items_node = self._compile_at(items, 'items') if isinstance(items, dict) else None
+        additional_node = self._compile_at(additional_items, 'additionalItems') \
+            if isinstance(additional_items, dict) else None
+        return plan.Array(self.random,
+                          items_node,
+                          [self._compile_at(item, 'items', i) for i, item in enumerate(items)]
+                          if isinstance(items, list) else None,
+                          additional_node,
+                          self._compile_at(contains, 'contains') if contains else None,
+                          unique,
+                          self._unique_items(items, items_node) if unique and items_node else None,
+                          self._unique_items(additional_items, additional_node) if unique and additional_node else None,
+                          minimum,
+                          schema.get('maxItems', minimum + self.UNBOUND_MAX_ITEMS),
+                          schema.get('const', []),
+                          list(enums) if enums else None,
+                          schema.get('maxItems'),
+                          schema.get('minItems', 0))
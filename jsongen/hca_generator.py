@@ -1,47 +1,287 @@
 import json
-from typing import Optional
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from copy import deepcopy
+from time import perf_counter
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple, Union, Iterator
+from urllib.parse import urldefrag, urljoin
 
-import random
-
-from jsonschema import RefResolver
+from jsonschema import Draft4Validator, RefResolver
+from jsongen import parallel
+from jsongen.emit import JsonWriter
+from jsongen.estimate import Estimate
 from jsongen.generator import JsonGenerator
+from jsongen.plan import GenerationPlan, parse_size
+from jsongen.pool import PoolPolicy
+from jsongen.profile import Profiler
+from jsongen.serialize import Serializer
 from jsongen.types import Cache
+from jsongen.validation import ValidationPolicy
 
 
 class HCAJsonGenerator(object):
     """
     Used to generate random JSON from a from a list of URLs containing JSON schemas.
     """
-    def __init__(self, schema_urls, cache: Optional[Cache]=None):
+    def __init__(self, schema_urls, cache: Optional[Cache]=None,
+                 validation: Union[str, ValidationPolicy]='always', strict: bool=True, seed: Optional[int]=None,
+                 max_depth: Optional[int]=None, max_nodes: Optional[int]=None, profile: bool=False,
+                 return_type: str='str', serializer: Union[str, Serializer]='json',
+                 pools: Union[int, PoolPolicy, None]=None):
         """
         :param schema_urls: a list of URL's pointing to valid json schemas.
         :param cache: an object used for caching URL's during the generation process.
+        :param validation: which generated documents are validated, see JsonGenerator.
+        :param strict: if True an invalid document raises a ValidationError, otherwise it is counted and logged.
+        :param seed: seeds the generator, including the choice of schema when no name is given.
+        :param max_depth: the depth past which optional properties and items are pruned, see JsonGenerator.
+        :param max_nodes: the number of values per document past which optional properties and items are pruned.
+        :param profile: if True generation is profiled per schema path in self.profiler.
+        :param return_type: what generated documents are returned as: 'dict', 'str' or 'bytes' of UTF-8 encoded JSON.
+        :param serializer: serializes the documents returned as 'str' or 'bytes': 'json', the default, 'auto', 'orjson'
+        or a Serializer, see jsongen.serialize. 'auto' uses orjson if it is installed, which writes compact JSON.
+        :param pools: pools the values of formats and 'fake' providers, see JsonGenerator.
         """
+        if return_type not in ('dict', 'str', 'bytes'):
+            raise ValueError(f"Unknown return type '{return_type}'.")
         self.schemas = dict()
         for url in schema_urls:
             name = url.split('/')[-1]
             self.schemas[name] = {'$ref': url, 'id': url}
         # The resolver used to dereference JSON '$ref'.
         self.resolver = self.resolver_factory(cache) if cache is not None else RefResolver('', '')
-        self._json_gen = JsonGenerator(resolver=self.resolver)
+        self._json_gen = JsonGenerator(resolver=self.resolver, validation=validation, strict=strict, seed=seed,
+                                       max_depth=max_depth, max_nodes=max_nodes, profile=profile, pools=pools)
+        self.return_type = return_type
+        self.serializer = Serializer.parse(serializer)
+        # Resolved schemas with their plan and validator, by schema name and by URL.
+        self._resolved = {}  # type: Dict[str, Tuple[dict, GenerationPlan, Draft4Validator]]
+        # The shared node of every schema resolved so far, by its identifier.
+        self._interned = {}  # type: Dict[str, dict]
 
-    def generate(self, name: str=None) -> str:
+    @property
+    def stats(self) -> Counter:
+        """
+        Counts of generated, validated and invalid documents, and the seconds spent generating them and serializing
+        them, as 'generation_time' and 'serialization_time'.
+        """
+        return self._json_gen.stats
+
+    @property
+    def profiler(self) -> Optional[Profiler]:
+        """The generation profile per schema path, if profiling is on."""
+        return self._json_gen.profiler
+
+    def generate(self, name: str=None, target_bytes: Union[int, str, None]=None) -> Union[dict, str, bytes]:
         """
         Chooses a random JSON schema from self.schemas and generates JSON data.
         :param name: the name of a JSON schema to generate. If None, then a random schema is chosen.
-        :return: serialized JSON.
+        :param target_bytes: the size the serialized JSON should have, in bytes or as a string such as '100KB', see
+        JsonGenerator.generate_json. Sizes are those of json.dumps, so compact serializers give slightly smaller JSON.
+        :return: {name: document}, as a dict or serialized JSON depending on self.return_type.
         """
 
         if name is None:
-            name = random.choice(list(self.schemas.keys()))
-            schema = self.schemas[name]
+            name = self._json_gen.random.choice(list(self.schemas.keys()))
+        else:
+            assert name in self.schemas.keys()
+        self.last_name = name
+        return self._generate(name, target_bytes)
+
+    def emit(self, stream: BinaryIO, name: str=None, target_bytes: Union[int, str, None]=None) -> int:
+        """
+        Like generate, but writes the JSON to a binary stream as it is generated, formatted like json.dumps, see
+        JsonGenerator.emit_json.
+        :param stream: a writable binary stream.
+        :param name: the name of a JSON schema to generate. If None, then a random schema is chosen.
+        :param target_bytes: the size of the serialized JSON, see generate.
+        :return: the number of bytes written.
+        """
+        if name is None:
+            name = self._json_gen.random.choice(list(self.schemas.keys()))
         else:
             assert name in self.schemas.keys()
-            schema = self.schemas[name]
         self.last_name = name
-        self.resolve_references(schema)
-        generated_json = {name: self._json_gen.generate_json(schema)}
-        return json.dumps(generated_json)
+        return self._emit(stream, name, target_bytes)
+
+    def emit_at(self, stream: BinaryIO, index: int, seed: int, name: str=None,
+                target_bytes: Union[int, str, None]=None) -> int:
+        """
+        Writes the document generate_at(index, seed, name, target_bytes) returns to a binary stream as it is generated.
+        :return: the number of bytes written.
+        """
+        if name is not None:
+            assert name in self.schemas.keys()
+        names = sorted(self.schemas.keys()) if name is None else [name]
+        json_gen = self._json_gen
+        json_gen._seed(parallel.document_seed(seed, index))
+        return self._emit(stream, json_gen.random.choice(names), target_bytes)
+
+    def generate_parallel(self, name: str=None, n: int=1, workers: Optional[int]=None, seed: Optional[int]=None,
+                          chunk_size: Optional[int]=None,
+                          target_bytes: Union[int, str, None]=None) -> Iterator[Union[dict, str, bytes]]:
+        """
+        Generates n documents over a pool of worker processes, see JsonGenerator.generate_parallel. The schemas are
+        resolved and compiled before the workers are forked, so they share them.
+        :param name: the name of a JSON schema to generate. If None, then a random schema is chosen for each document.
+        :param n: the number of documents to generate.
+        :param workers: the number of worker processes. Defaults to the number of CPUs.
+        :param seed: the seed of the run. The same seed gives the same documents for any number of workers.
+        :param chunk_size: the number of documents sent to a worker at a time.
+        :param target_bytes: the size of each serialized document, see generate.
+        :return: an iterator of documents as generate returns them, in a stable order.
+        """
+        if name is not None:
+            assert name in self.schemas.keys()
+        names = sorted(self.schemas.keys()) if name is None else [name]
+        for _name in names:
+            self._resolve(_name)
+        seed = self._json_gen.random.getrandbits(64) if seed is None else seed
+        return parallel.generate_parallel(
+            lambda document_seed: self._generate_seeded(names, document_seed, target_bytes), n, seed, self.stats,
+            workers, chunk_size)
+
+    def generate_at(self, index: int, seed: int, name: str=None,
+                    target_bytes: Union[int, str, None]=None) -> Union[dict, str, bytes]:
+        """
+        Generates the document at index in the run of documents seeded with seed, without generating the documents
+        before it. It is the same document generate_parallel(name, n, seed=seed) yields at that index.
+        :param index: the index of the document within the run.
+        :param seed: the seed of the run.
+        :param name: the name of a JSON schema to generate. If None, then a random schema is chosen.
+        :param target_bytes: the size of the serialized document, see generate.
+        :return: the document as generate returns it.
+        """
+        if name is not None:
+            assert name in self.schemas.keys()
+        names = sorted(self.schemas.keys()) if name is None else [name]
+        return self._generate_seeded(names, parallel.document_seed(seed, index), target_bytes)
+
+    def prefetch(self, max_workers: int=8) -> Set[str]:
+        """
+        Fetches the documents of self.schemas and everything they reference, transitively, into the resolver store.
+        Documents are fetched concurrently, each URL once, so resolving the schemas afterwards doesn't wait on the
+        network. URLs already in the store aren't fetched again.
+        :param max_workers: the most documents fetched at the same time.
+        :return: the URLs that were fetched.
+        """
+        store = self.resolver.store
+        pending = {urldefrag(schema['id'])[0] for schema in self.schemas.values()}
+        seen = set(pending)
+        fetched = set()
+
+        def follow(document, url):
+            for ref in _references(document, url):
+                if ref not in seen:
+                    seen.add(ref)
+                    pending.add(ref)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = {}
+            while pending or in_flight:
+                while pending:
+                    url = pending.pop()
+                    if url in store:
+                        follow(store[url], url)
+                    else:
+                        in_flight[executor.submit(self.resolver.resolve_remote, url)] = url
+                if in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url = in_flight.pop(future)
+                        store[url] = document = future.result()
+                        fetched.add(url)
+                        follow(document, url)
+        return fetched
+
+    def estimate(self, name: str, explosive: int=10 ** 5) -> Estimate:
+        """
+        Estimates the documents of the named schema without generating any, see JsonGenerator.estimate. Documents are
+        wrapped in an object keyed by the name, which the estimate leaves out.
+        :param name: the name of a JSON schema.
+        :param explosive: the worst-case number of values from which a subtree is flagged as explosive.
+        :return: the estimate per schema path and per document.
+        """
+        return self._json_gen.estimate(self.resolved_schema(name), explosive)
+
+    def resolved_schema(self, name: str) -> dict:
+        """
+        The named schema with all `$ref`s inlined. Each schema is resolved once and cached by its name and its URL until
+        invalidate is called. self.schemas is left untouched.
+        :param name: the name of a JSON schema.
+        :return: the resolved schema. It is shared between calls and must not be modified.
+        """
+        return self._resolve(name)[0]
+
+    def invalidate(self, name: str=None) -> None:
+        """
+        Drops cached resolved schemas and the documents they were resolved from, so they are fetched and resolved again
+        the next time they are generated.
+        :param name: the name or URL of the schema to drop. If None, then every schema is dropped.
+        """
+        if name is None:
+            keys = list(self._resolved.keys())
+        else:
+            url = self.schemas[name]['id'] if name in self.schemas else name
+            keys = [url] + [_name for _name, schema in self.schemas.items() if schema['id'] == url]
+        urls = set()
+        for key in keys:
+            resolved = self._resolved.pop(key, None)
+            if resolved is not None:
+                urls.add(urldefrag(key)[0])
+                urls.update(_identifiers(resolved[0]))
+        for url in urls:
+            self.resolver.store.pop(url, None)
+        # any shared node may embed a dropped document
+        self._interned.clear()
+        remote_cache = getattr(self.resolver, '_remote_cache', None)
+        if remote_cache is not None and hasattr(remote_cache, 'cache_clear'):
+            remote_cache.cache_clear()
+
+    def _resolve(self, name: str) -> Tuple[dict, GenerationPlan, Draft4Validator]:
+        """Resolves the schema and compiles it once, so repeat calls and workers forked afterwards share the result."""
+        resolved = self._resolved.get(name)
+        if resolved is None:
+            url = self.schemas[name]['id']
+            resolved = self._resolved.get(url)
+            if resolved is None:
+                schema = self.resolve_references(deepcopy(self.schemas[name]))
+                resolved = schema, self._json_gen._plan(schema), self._json_gen._validator(schema)
+                self._resolved[url] = resolved
+            self._resolved[name] = resolved
+        return resolved
+
+    def _generate_seeded(self, names: list, document_seed: int,
+                         target_bytes: Union[int, str, None]=None) -> Union[dict, str, bytes]:
+        json_gen = self._json_gen
+        json_gen._seed(document_seed)
+        return self._generate(json_gen.random.choice(names), target_bytes)
+
+    def _generate(self, name: str, target_bytes: Union[int, str, None]) -> Union[dict, str, bytes]:
+        """Generates a document of the named schema and returns it as self.return_type, timing each step."""
+        schema, generation_plan, validator = self._resolve(name)
+        stats = self.stats
+        start = perf_counter()
+        impostor = generation_plan(_document_bytes(name, target_bytes))
+        stats['generation_time'] += perf_counter() - start
+        self._json_gen._validate(validator, impostor)
+        document = {name: impostor}
+        if self.return_type == 'dict':
+            return document
+        start = perf_counter()
+        serialized = self.serializer.dumpb(document) if self.return_type == 'bytes' else self.serializer.dumps(document)
+        stats['serialization_time'] += perf_counter() - start
+        return serialized
+
+    def _emit(self, stream: BinaryIO, name: str, target_bytes: Union[int, str, None]) -> int:
+        schema, generation_plan, validator = self._resolve(name)
+        out = JsonWriter(stream)
+        out.begin('{')
+        out.key(name)
+        self._json_gen._write(generation_plan, validator, out, _document_bytes(name, target_bytes))
+        out.end('}')
+        out.flush()
+        return out.position
 
     def resolve_references(self, schema: dict) -> dict:
         """
@@ -52,24 +292,53 @@ class HCAJsonGenerator(object):
             schema = {'$ref': 'http://test.com/this.json'}
             self.resolve_reference(schema) == {'id': 'test file'}
 
+        Every referenced schema is resolved once into a node that is shared by all the `$ref`s to it, including those in
+        other schemas resolved by this generator, so the result is a DAG rather than a tree. Shared nodes must not be
+        modified. A `$ref` back to a schema that is still being resolved is a cycle and is left in place, with its URL
+        made absolute, for JsonGenerator to follow lazily.
+
         :param schema: the JSON schema to use.
         :return: the schema with `$ref`'s inline.
         """
-        ref_url = schema.pop('$ref', '')
-        if ref_url:
-            identifier, ref = self.resolver.resolve(ref_url)
-            schema.update(ref)
-            schema['id'] = identifier
-
-        for value in schema.values():
-            if isinstance(value, dict):
-                self.resolve_references(value)
-            elif isinstance(value, list):
-                for i in value:
-                    if isinstance(i, dict):
-                        self.resolve_references(i)
+        resolved = self._intern(schema, [])
+        if resolved is not schema:
+            schema.clear()
+            schema.update(resolved)
         return schema
 
+    def _intern(self, value, stack: List[str]):
+        """
+        Returns value with its `$ref`s replaced by shared nodes. Containers are copied, so documents in the resolver
+        store are never modified.
+        :param stack: the identifiers of the schemas being resolved, to detect cycles.
+        """
+        if isinstance(value, list):
+            return [self._intern(i, stack) for i in value]
+        elif not isinstance(value, dict):
+            return value
+        ref_url = value.get('$ref')
+        if not isinstance(ref_url, str):
+            return {k: self._intern(v, stack) for k, v in value.items()}
+        identifier, document = self.resolver.resolve(ref_url)
+        if identifier in stack:
+            return dict(value, **{'$ref': identifier})
+        node = self._interned.get(identifier)
+        if node is None:
+            stack.append(identifier)
+            self.resolver.push_scope(identifier)
+            try:
+                node = dict(self._intern(document, stack))
+            finally:
+                self.resolver.pop_scope()
+                stack.pop()
+            node['id'] = identifier
+            self._interned[identifier] = node
+        siblings = {k: self._intern(v, stack) for k, v in value.items() if k not in ('$ref', 'id')}
+        if siblings:
+            siblings.update(node)
+            return siblings
+        return node
+
     @staticmethod
     def resolver_factory(cache: Cache) -> RefResolver:
         """
@@ -82,3 +351,51 @@ class HCAJsonGenerator(object):
 
         resolver = RefResolver('', '', handlers={'http': request_json, 'https': request_json})
         return resolver
+
+
+def _document_bytes(name: str, target_bytes: Union[int, str, None]) -> Optional[int]:
+    """The target size of the document generated for a schema, leaving room for the {name: document} around it."""
+    if target_bytes is None:
+        return None
+    return parse_size(target_bytes) - len(json.dumps(name)) - 4
+
+
+def _identifiers(schema: dict, urls: Set[str]=None, visited: Set[int]=None) -> Set[str]:
+    """The URLs of the documents inlined into a resolved schema, without fragments."""
+    urls = set() if urls is None else urls
+    visited = set() if visited is None else visited
+    if id(schema) in visited:
+        return urls
+    visited.add(id(schema))
+    identifier = schema.get('id')
+    if isinstance(identifier, str):
+        urls.add(urldefrag(identifier)[0])
+    for value in schema.values():
+        if isinstance(value, dict):
+            _identifiers(value, urls, visited)
+        elif isinstance(value, list):
+            for i in value:
+                if isinstance(i, dict):
+                    _identifiers(i, urls, visited)
+    return urls
+
+
+def _references(document, base: str, refs: Set[str]=None) -> Set[str]:
+    """The URLs of the documents a document references, without fragments."""
+    refs = set() if refs is None else refs
+    if isinstance(document, dict):
+        identifier = document.get('id')
+        if isinstance(identifier, str):
+            base = urljoin(base, identifier)
+        ref = document.get('$ref')
+        if isinstance(ref, str):
+            url = urldefrag(urljoin(base, ref))[0]
+            if url:
+                refs.add(url)
+        for value in document.values():
+            if isinstance(value, (dict, list)):
+                _references(value, base, refs)
+    elif isinstance(document, list):
+        for value in document:
+            _references(value, base, refs)
+    return refs
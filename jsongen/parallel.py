@@ -0,0 +1,63 @@
+import hashlib
+import multiprocessing
+import os
+from collections import Counter
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+# The job run by the worker processes. It is set in the parent before the pool forks, so the workers inherit the
+# compiled schemas through shared memory pages instead of receiving a pickled copy, along with the number of documents
+# counted before the run.
+_job = None  # type: Optional[Tuple[Callable[[int], Any], Counter, int]]
+
+
+def document_seed(seed: int, index: int) -> int:
+    """
+    Derives the seed of a single document. The seed of each document only depends on the seed of the run and the index
+    of the document, so the output doesn't depend on how documents are distributed between workers.
+
+    :param seed: the seed of the whole run.
+    :param index: the index of the document within the run.
+    :return: a 64 bit seed.
+    """
+    return int.from_bytes(hashlib.sha256(f'{seed}:{index}'.encode('ascii')).digest()[:8], 'big')
+
+
+def _run_chunk(chunk: Tuple[int, int, int]) -> Tuple[List[Any], dict]:
+    start, stop, seed = chunk
+    make_document, stats, counted = _job
+    stats.clear()
+    # the documents are counted from their index in the run, as they would be in a single process
+    stats['documents'] = counted + start
+    documents = [make_document(document_seed(seed, index)) for index in range(start, stop)]
+    stats['documents'] -= counted + start
+    return documents, dict(stats)
+
+
+def generate_parallel(make_document: Callable[[int], Any], n: int, seed: int, stats: Counter,
+                      workers: Optional[int]=None, chunk_size: Optional[int]=None) -> Iterator[Any]:
+    """
+    Generates n documents over a pool of forked worker processes and yields them in index order.
+
+    :param make_document: called in a worker with the seed of a document, returns the document.
+    :param n: the number of documents to generate.
+    :param seed: the seed of the run.
+    :param stats: the counter make_document updates. The counts from the workers are added to it. While a worker makes
+    a document, stats['documents'] is the number of documents before it in a single process.
+    :param workers: the number of worker processes. Defaults to the number of CPUs.
+    :param chunk_size: the number of documents sent to a worker at a time.
+    :return: an iterator of the generated documents.
+    """
+    global _job
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, min(256, n // (workers * 4)))
+    chunks = [(start, min(start + chunk_size, n), seed) for start in range(0, n, chunk_size)]
+    _job = (make_document, stats, stats['documents'])
+    try:
+        pool = multiprocessing.get_context('fork').Pool(workers)
+    finally:
+        _job = None
+    with pool:
+        for documents, chunk_stats in pool.imap(_run_chunk, chunks):
+            stats.update(chunk_stats)
+            yield from documents
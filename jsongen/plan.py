@@ -0,0 +1,794 @@
+"""
+Compiled generation plans. Leaves are called directly, while objects and arrays are expanded by run, which keeps the
+containers being filled on an explicit stack instead of recursing through Python frames. That way deeply nested and
+recursive schemas never hit the recursion limit, and each document can be held to a maximum depth and node budget.
+
+A document can also be generated to a target size in bytes. Each container then shares the bytes left in its budget
+between the children it still expects to generate and tracks the bytes they took, so arrays grow and objects gain
+optional properties until they reach their budget, and strings without a pattern or format are stretched to fill theirs.
+
+A document can also be written to a stream as it is generated, see jsongen.emit. Containers then add their values to
+sinks instead of dicts and lists, and run writes the keys of the containers objects yield and the values it generates
+itself.
+"""
+import json
+import re
+from functools import partial
+from math import inf
+from random import Random
+from time import perf_counter
+from typing import Any, Callable, Dict, Generator, List, Optional, Sequence, Tuple, Union
+
+from jsongen.emit import WRITTEN, ArraySink, JsonWriter, ObjectSink, Sink
+from jsongen.unique import UniqueItems, unique_positional
+
+# How far past max_depth required properties and items may nest before a schema is taken to have no finite documents.
+REQUIRED_DEPTH = 256
+# The most bytes of a target size an array item gets while the array can still add items, so arrays reach large targets
+# with more items rather than larger ones, and no single value of a document written to a stream is large.
+MAX_ITEM_SHARE = 1 << 16
+# The most pattern property keys an object draws that it already has before it stops adding pattern properties.
+MAX_DUPLICATE_KEYS = 16
+
+
+class Node(object):
+    """A compiled schema node. Calling the node generates a value for the schema it was compiled from."""
+    __slots__ = ()
+
+    def __call__(self):
+        raise NotImplementedError
+
+
+class Const(Node):
+    """Always returns the same value."""
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+
+class Leaf(Node):
+    """Calls a pre-bound value provider with pre-computed arguments."""
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func: Callable, *args) -> None:
+        self.func = func
+        self.args = args
+
+    def __call__(self):
+        return self.func(*self.args)
+
+
+class Text(Leaf):
+    """A string of any characters between a minimum and a maximum length, which can be stretched to a target size."""
+    __slots__ = ('max_length',)
+
+    def __init__(self, func: Callable[[int, int], str], minimum: int, maximum: int,
+                 max_length: Optional[int]=None) -> None:
+        """
+        :param func: returns a string of letters between its two arguments long.
+        :param minimum: the minimum length.
+        :param maximum: the maximum length of strings generated without a target size.
+        :param max_length: the maxLength of the schema, if it has one.
+        """
+        super().__init__(func, minimum, maximum)
+        self.max_length = max_length
+
+    def fill(self, budget: float) -> str:
+        """
+        :param budget: the bytes the string may take once serialized, including its quotes.
+        :return: a string as close to the budget as the minimum and maxLength allow.
+        """
+        length = max(self.args[0], int(budget) - 2)
+        if self.max_length is not None:
+            length = min(length, self.max_length)
+        return self.func(length, length)
+
+
+class Multiple(object):
+    """The func of a Leaf for multipleOf: draws an integer between its two arguments and scales it."""
+    __slots__ = ('random_int', 'multiple_of', 'digits')
+
+    def __init__(self, random_int: Callable[[int, int], int], multiple_of: Union[int, float],
+                 digits: Optional[int]=None) -> None:
+        """
+        :param random_int: draws an integer between its two arguments, both included.
+        :param multiple_of: the multipleOf of the schema.
+        :param digits: the decimal digits multiples are rounded to, None to leave them as they are.
+        """
+        self.random_int = random_int
+        self.multiple_of = multiple_of
+        self.digits = digits
+
+    def __call__(self, minimum: int, maximum: int) -> Union[int, float]:
+        return self.scale(self.random_int(minimum, maximum))
+
+    def scale(self, value: int) -> Union[int, float]:
+        value *= self.multiple_of
+        return value if self.digits is None else round(value, self.digits)
+
+
+class Choice(Node):
+    """Picks one of a fixed list of values, e.g. an enum."""
+    __slots__ = ('choice', 'values')
+
+    def __init__(self, choice: Callable[[Sequence], Any], values: Sequence) -> None:
+        self.choice = choice
+        self.values = values
+
+    def __call__(self):
+        return self.choice(self.values)
+
+
+class Branch(Node):
+    """Picks one of several compiled nodes, one per effective schema of an anyOf/oneOf."""
+    __slots__ = ('choice', 'branches')
+
+    def __init__(self, choice: Callable[[Sequence], Any], branches: List[Node]) -> None:
+        self.choice = choice
+        self.branches = branches
+
+    def __call__(self):
+        return self.choice(self.branches)()
+
+    def select(self) -> Node:
+        return self.choice(self.branches)
+
+
+class Ref(Node):
+    """
+    A resolved '$ref'. The target is assigned once the referenced schema is compiled, so a schema referring to itself
+    compiles to a cycle instead of recursing forever.
+    """
+    __slots__ = ('target',)
+
+    def __init__(self, target: Optional[Node]=None) -> None:
+        self.target = target
+
+    def __call__(self):
+        return self.target()
+
+    def select(self) -> Node:
+        return self.target
+
+
+class Limits(object):
+    """The maximum depth, node budget and target size of one document, and the nodes and bytes generated so far."""
+    __slots__ = ('max_depth', 'max_nodes', 'nodes', 'retries', 'target_bytes', 'bytes', 'budget', 'capacities', 'out')
+
+    def __init__(self, max_depth: Optional[int]=None, max_nodes: Optional[int]=None,
+                 target_bytes: Optional[int]=None, capacities: Optional[Dict[int, float]]=None,
+                 out: Optional[JsonWriter]=None) -> None:
+        """
+        :param max_depth: containers nested deeper than this only get their required properties and minItems items.
+        :param max_nodes: once a document has this many nodes, containers only get their required properties and
+        minItems items.
+        :param target_bytes: the size the document should have once serialized by json.dumps. None for no target.
+        :param capacities: the most bytes each node can generate, by id, see capacities. Nodes that aren't in it are
+        taken to be unbounded.
+        :param out: the writer the document is written to as it is generated. None to return the document.
+        """
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        # duplicates drawn for unique arrays, for the profiler
+        self.retries = 0
+        self.target_bytes = target_bytes
+        # with a target size, the bytes generated so far and the budget of the next value to generate
+        self.bytes = 0
+        self.budget = target_bytes
+        self.capacities = capacities or {}
+        self.out = out
+
+    def prune(self, depth: int) -> bool:
+        """
+        :param depth: the depth of a container about to be expanded.
+        :return: whether the optional parts of the container are pruned.
+        """
+        if self.max_depth is not None and depth >= self.max_depth:
+            if depth >= self.max_depth + REQUIRED_DEPTH:
+                raise ValueError(f"Required properties and items nest deeper than {depth}. The schema may have no "
+                                 f"finite documents.")
+            return True
+        return self.max_nodes is not None and self.nodes >= self.max_nodes
+
+
+class Container(Node):
+    """A node whose value holds other generated values. Containers are generated by run."""
+    __slots__ = ()
+
+    def __call__(self):
+        return run(self, Limits())
+
+    def expand(self, limits: Limits, depth: int, prune: bool) -> Generator[Node, Any, Any]:
+        """
+        Yields the child nodes to generate, is sent their values and returns the container. Objects yield a (key, node)
+        pair. Children that are leaves are called directly rather than yielded, and are counted against the node budget
+        when the container is done. When the document is written as it is generated, the container is a sink writing
+        to limits.out and the values sent to it are WRITTEN. With a target size the container takes limits.budget as its
+        own budget, sets limits.budget before generating each child and adds the bytes of its value that its children
+        didn't add to limits.bytes.
+
+        :param limits: the limits of the document.
+        :param depth: the depth of this container.
+        :param prune: if True only the required properties and minItems items are generated.
+        """
+        raise NotImplementedError
+
+
+def run(root: Node, limits: Limits, depth: int=0):
+    """
+    Generates a value for root. Containers being filled are kept on an explicit stack, so the depth of the value is
+    not limited by the recursion limit.
+
+    :param root: the node to generate.
+    :param limits: the limits of the document.
+    :param depth: the depth of root within the document.
+    :return: the generated value, or WRITTEN if it was written to limits.out.
+    """
+    stack = []  # type: List[Generator[Node, Any, Any]]
+    node = root
+    while True:
+        if type(node) is tuple:
+            key, node = node
+            if limits.out is not None:
+                limits.out.key(key)
+        while isinstance(node, (Branch, Ref)):
+            node = node.select()
+        if isinstance(node, Container):
+            level = depth + len(stack)
+            stack.append(node.expand(limits, level, limits.prune(level)))
+            value = None
+        else:
+            value = node() if limits.target_bytes is None else _sized(node, limits)
+            if limits.out is not None:
+                limits.out.value(value)
+                value = WRITTEN
+            if not stack:
+                return value
+        while True:
+            try:
+                node = stack[-1].send(value)
+                break
+            except StopIteration as stop:
+                stack.pop()
+                value = stop.value
+                if limits.out is not None:
+                    # a container built in memory, e.g. a unique array, is written once it is done
+                    if isinstance(value, Sink):
+                        value.close()
+                    else:
+                        limits.out.value(value)
+                    value = WRITTEN
+                if not stack:
+                    return value
+
+
+def _size(value) -> int:
+    """The length of the value serialized by json.dumps."""
+    return len(value) + 2 if type(value) is str and value.isalnum() and value.isascii() else len(json.dumps(value))
+
+
+def _sized(node: Node, limits: Limits):
+    """Calls a leaf within limits.budget and adds its size to limits.bytes."""
+    value = node.fill(limits.budget) if type(node) is Text else node()
+    limits.bytes += _size(value)
+    return value
+
+
+def _level(remaining: float, pending: List[float], capacity: float) -> float:
+    """
+    Shares the remaining bytes between the children still to generate, such that children that can't take an equal
+    share get all they can take and the others get equal shares of the rest. If all of them fit, what is left over is
+    shared equally, since capacities leave out the size of most leaves.
+
+    :param pending: the capacity of each child still to generate, including the next one.
+    :param capacity: the capacity of the next child.
+    :return: the share of the next child.
+    """
+    n = len(pending)
+    for bound in sorted(pending):
+        if bound * n >= remaining:
+            return min(capacity, remaining / n)
+        remaining -= bound
+        n -= 1
+    return capacity + remaining / max(1, len(pending))
+
+
+def _member_capacity(key: str, node: Node, capacities: Dict[int, float]) -> float:
+    return _size(key) + 4 + capacities.get(id(node), inf)
+
+
+def capacities(root: Node) -> Dict[int, float]:
+    """
+    Bounds the bytes each node of a plan can generate once serialized, which lets containers with a target size give
+    their budget to the children that can use it. Strings without maxLength, arrays without maxItems, objects that can
+    add properties without maxProperties, and references back to a node being generated are unbounded. Leaves other
+    than strings and fixed values take little space and are counted as none.
+
+    :param root: the root of the plan.
+    :return: the capacity of each node, by id.
+    """
+    bounds = {}  # type: Dict[int, float]
+    visiting = set()
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        key = id(node)
+        if children_done:
+            visiting.discard(key)
+            bounds[key] = _capacity(node, bounds)
+        elif key not in bounds and key not in visiting:
+            # a node that is still being visited is an ancestor, so it is a cycle and stays unbounded
+            visiting.add(key)
+            stack.append((node, True))
+            stack.extend((child, False) for child in _children(node))
+    return bounds
+
+
+def _children(node: Node) -> List[Node]:
+    if isinstance(node, Object):
+        return [child for _, child in node.required + node.properties + node.patterns]
+    if isinstance(node, Array):
+        children = [node.items, node.additional, node.contains] + (node.positional or [])
+        return [child for child in children if child is not None]
+    if isinstance(node, Branch):
+        return list(node.branches)
+    if isinstance(node, Ref):
+        return [node.target]
+    if isinstance(node, Profiled):
+        return [node.node]
+    return []
+
+
+def _capacity(node: Node, bounds: Dict[int, float]) -> float:
+    def bound(child):
+        return bounds.get(id(child), inf)
+
+    if isinstance(node, Const):
+        return _size(node.value)
+    if isinstance(node, Choice):
+        return max((_size(value) for value in node.values), default=0)
+    if isinstance(node, Text):
+        return inf if node.max_length is None else node.max_length + 2
+    if isinstance(node, Leaf):
+        return 0
+    if isinstance(node, Object):
+        members = node.required + node.properties
+        capacity = 2 + sum(_member_capacity(key, child, bounds) for key, child in members)
+        if node.patterns or node.additional:
+            if node.max_properties is None:
+                return inf
+            extra = max([bound(child) for _, child in node.patterns] + [inf if node.additional else 0])
+            capacity += max(0, node.max_properties - len(members)) * (node.key_len + 6 + extra)
+        return capacity
+    if isinstance(node, Array):
+        if node.unique:
+            maximum = node.maximum
+        elif node.max_items is None:
+            return inf
+        else:
+            maximum = node.max_items
+        items = [bound(child) + 2 for child in node.positional or []]
+        rest = node.items if node.items is not None else node.additional
+        if rest is not None:
+            items.extend([bound(rest) + 2] * max(0, maximum - len(items)))
+        return 2 + sum(_size(value) + 2 for value in node.const) + sum(items)
+    if isinstance(node, Branch):
+        return max(bound(child) for child in node.branches)
+    if isinstance(node, Ref):
+        return bound(node.target)
+    if isinstance(node, Profiled):
+        return bound(node.node)
+    return inf
+
+
+def _share(budget: float, start: int, limits: Limits, expected: float) -> float:
+    """Splits the bytes left in a budget between the expected number of children."""
+    return (budget - (limits.bytes - start)) / max(1, expected)
+
+
+def parse_size(size: Union[int, str]) -> int:
+    """
+    :param size: a number of bytes, or a string such as '512', '1KB', '100 KiB' or '10MB'. KB, MB and GB are powers of
+    1000, KiB, MiB and GiB are powers of 1024.
+    :return: the number of bytes.
+    """
+    if isinstance(size, int):
+        return size
+    match = re.fullmatch(r'\s*([0-9]+(?:\.[0-9]+)?)\s*([KMG]i?B|B)?\s*', size, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"Can't parse '{size}' as a size, e.g. '100KB'.")
+    number, unit = match.groups()
+    unit = (unit or 'B').upper()
+    scale = 1 if unit == 'B' else (1024 if 'I' in unit else 1000) ** ('KMG'.index(unit[0]) + 1)
+    return int(float(number) * scale)
+
+
+class Object(Container):
+    """
+    Generates the required properties, then draws how many properties the object has and adds declared, pattern and
+    additional properties, chosen uniformly, until it has them.
+    """
+    __slots__ = ('rng', 'required', 'properties', 'patterns', 'additional', 'minimum', 'maximum', 'key_len', 'uuid4',
+                 'fake_pytypes', 'max_properties', 'min_properties')
+
+    def __init__(self, rng, required: List[Tuple[str, Node]], properties: List[Tuple[str, Node]],
+                 patterns: List[Tuple[Callable[[Random], str], Node]], additional: bool, minimum: int,
+                 maximum: int, key_len: int, uuid4: Callable[[], str], fake_pytypes: List[Callable],
+                 max_properties: Optional[int]=None, min_properties: int=0) -> None:
+        self.rng = rng
+        self.required = required
+        self.properties = properties
+        self.patterns = patterns
+        self.additional = additional
+        self.minimum = minimum
+        self.maximum = maximum
+        self.key_len = key_len
+        self.uuid4 = uuid4
+        self.fake_pytypes = fake_pytypes
+        # the maxProperties of the schema, which bounds the properties added to reach a target size
+        self.max_properties = max_properties
+        # the minProperties of the schema, which is all a pruned object gets besides its required properties
+        self.min_properties = min_properties
+
+    def expand(self, limits: Limits, depth: int, prune: bool) -> Generator[Node, Any, dict]:
+        if limits.target_bytes is not None:
+            return (yield from self._expand_sized(limits, prune))
+        rng = self.rng
+        impostor = {} if limits.out is None else ObjectSink(limits.out, bool(self.patterns))
+        for key, node in self.required:
+            impostor[key] = node() if type(node) in _LEAVES else (yield key, node)
+        minimum, maximum = self.minimum, self.maximum
+        if prune:
+            make_properties = self.min_properties
+        else:
+            make_properties = minimum if minimum == maximum else rng.randrange(minimum, maximum)
+        if len(impostor) < make_properties:
+            properties = list(self.properties)
+            options = []
+            if properties:
+                options.append('pr')
+            if self.patterns:
+                options.append('pa')
+            if self.additional:
+                options.append('ad')
+            duplicates = 0
+            while len(impostor) < make_properties and options:
+                choice = rng.choice(options)
+                if choice == 'pr':
+                    # swap the chosen property with the last one so removing it is O(1)
+                    i = rng.randrange(len(properties))
+                    key, node = properties[i]
+                    properties[i] = properties[-1]
+                    properties.pop()
+                    if not properties:
+                        options.remove('pr')
+                    if key in impostor:
+                        # a pattern property already took the key
+                        continue
+                    impostor[key] = node() if type(node) in _LEAVES else (yield key, node)
+                elif choice == 'pa':
+                    sample_key, node = rng.choice(self.patterns)
+                    key = sample_key(rng)[:self.key_len]
+                    if key in impostor:
+                        # a key drawn again is skipped rather than replaced, since a streamed key can't be taken back
+                        duplicates += 1
+                        if duplicates >= MAX_DUPLICATE_KEYS:
+                            options.remove('pa')
+                        continue
+                    impostor[key] = node() if type(node) in _LEAVES else (yield key, node)
+                elif choice == 'ad':
+                    impostor[self.uuid4()] = rng.choice(self.fake_pytypes)()
+        limits.nodes += len(impostor)
+        return impostor
+
+    def _expand_sized(self, limits: Limits, prune: bool) -> Generator[Node, Any, dict]:
+        """
+        Generates the required properties, then adds optional properties until the object reaches its budget: declared
+        properties first, in a random order, then pattern properties, then additional properties.
+        """
+        rng = self.rng
+        capacities = limits.capacities
+        budget, start = limits.budget, limits.bytes
+        limits.bytes += 2
+        impostor = {} if limits.out is None else ObjectSink(limits.out, bool(self.patterns))
+        properties = list(self.properties)
+        maximum = inf if self.max_properties is None else self.max_properties
+        # the most bytes each property still to generate can take, which the budget is shared by
+        required = [_member_capacity(key, node, capacities) for key, node in self.required]
+        optional = [_member_capacity(key, node, capacities) for key, node in properties]
+        # pattern and additional properties can be added until maxProperties
+        unbounded = [inf] if (self.patterns or self.additional) and self.max_properties is None else []
+        for i, (key, node) in enumerate(self.required):
+            pending = required[i:] if prune else required[i:] + optional + unbounded
+            share = _level(budget - (limits.bytes - start), pending, required[i])
+            impostor[key] = yield from self._member(key, node, impostor, limits, share)
+        minimum = self.min_properties if prune else self.minimum
+        duplicates = 0
+        while len(impostor) < maximum:
+            used = limits.bytes - start
+            if len(impostor) >= minimum and (prune or used + (used - 2) / max(1, len(impostor)) / 2 >= budget):
+                break
+            if properties:
+                i = rng.randrange(len(properties))
+                key, node = properties[i]
+                properties[i] = properties[-1]
+                properties.pop()
+                capacity = optional[i]
+                optional[i] = optional[-1]
+                optional.pop()
+                if key in impostor:
+                    continue
+            elif self.patterns and duplicates < MAX_DUPLICATE_KEYS:
+                sample_key, node = rng.choice(self.patterns)
+                key = sample_key(rng)[:self.key_len]
+                if key in impostor:
+                    duplicates += 1
+                    continue
+                capacity = _member_capacity(key, node, capacities)
+            elif self.additional:
+                key, node = self.uuid4(), Leaf(rng.choice(self.fake_pytypes))
+                capacity = inf
+            else:
+                break
+            share = _level(budget - used, [capacity] + optional + unbounded, capacity)
+            impostor[key] = yield from self._member(key, node, impostor, limits, share)
+        limits.nodes += len(impostor)
+        return impostor
+
+    @staticmethod
+    def _member(key: str, node: Node, impostor: dict, limits: Limits, share: float) -> Generator[Node, Any, Any]:
+        """Generates the value of a property within its share of the budget, counting the key and separators."""
+        overhead = _size(key) + (4 if impostor else 2)
+        limits.bytes += overhead
+        limits.budget = share - overhead
+        return _sized(node, limits) if type(node) in _LEAVES else (yield key, node)
+
+
+class Array(Container):
+    """Generates the const items of an array, then contains and items, or the positional and additional items."""
+    __slots__ = ('rng', 'items', 'positional', 'additional', 'contains', 'unique', 'unique_items', 'unique_additional',
+                 'minimum', 'maximum', 'const', 'enums', 'max_items', 'min_items')
+
+    def __init__(self, rng, items: Optional[Node], positional: Optional[List[Node]], additional: Optional[Node],
+                 contains: Optional[Node], unique: bool, unique_items: Optional[UniqueItems],
+                 unique_additional: Optional[UniqueItems], minimum: int, maximum: int, const: list,
+                 enums: Optional[list], max_items: Optional[int]=None, min_items: int=0) -> None:
+        self.rng = rng
+        self.items = items
+        self.positional = positional
+        self.additional = additional
+        self.contains = contains
+        self.unique = unique
+        self.unique_items = unique_items
+        self.unique_additional = unique_additional
+        self.minimum = minimum
+        self.maximum = maximum
+        self.const = const
+        self.enums = enums
+        # the maxItems of the schema, which bounds the items added to reach a target size
+        self.max_items = max_items
+        # the minItems of the schema, which is all a pruned array gets
+        self.min_items = min_items
+
+    def expand(self, limits: Limits, depth: int, prune: bool) -> Generator[Node, Any, list]:
+        if limits.out is not None and self.unique:
+            # unique items are compared to each other, so the array is built in memory and run writes it once done
+            out, limits.out = limits.out, None
+            try:
+                return (yield from self.expand(limits, depth, prune))
+            finally:
+                limits.out = out
+        if limits.target_bytes is not None:
+            return (yield from self._expand_sized(limits, depth, prune))
+        minimum, maximum = self.minimum, self.maximum
+        if prune:
+            length = self.min_items
+        else:
+            length = minimum if minimum == maximum else self.rng.randrange(minimum, maximum)
+        impostor = list(self.const) if limits.out is None else ArraySink(limits.out, self.const)
+        if self.items is not None:
+            if self.contains is not None:
+                impostor.append(self.contains() if type(self.contains) in _LEAVES else (yield self.contains))
+            if self.unique:
+                self._unique_gen(impostor, self.unique_items, self.items, length, limits, depth)
+            elif self.enums:
+                impostor.extend(self.rng.choices(self.enums, k=length))
+            elif type(self.items) in _LEAVES:
+                items = self.items
+                impostor.extend([items() for _ in range(length - len(impostor))])
+            else:
+                while len(impostor) < length:
+                    impostor.append((yield self.items))
+        elif self.positional is not None:
+            if self.unique:
+                limits.retries += unique_positional([partial(run, node, limits, depth + 1) for node in self.positional],
+                                                    impostor)
+                if self.additional is not None:
+                    self._unique_gen(impostor, self.unique_additional, self.additional, length, limits, depth)
+            else:
+                for node in self.positional:
+                    impostor.append(node() if type(node) in _LEAVES else (yield node))
+                if self.additional is not None:
+                    if self.enums:
+                        impostor.extend(self.rng.choices(self.enums, k=length))
+                    else:
+                        while len(impostor) < length:
+                            impostor.append((yield self.additional))
+        limits.nodes += len(impostor)
+        return impostor
+
+    def _expand_sized(self, limits: Limits, depth: int, prune: bool) -> Generator[Node, Any, list]:
+        """
+        Adds items until the array reaches its budget. The budget is shared between as many items as the array would
+        have without a target size, and once items have been generated, as many as fit at their average size.
+        """
+        budget, start = limits.budget, limits.bytes
+        limits.bytes += 2
+        for value in self.const:
+            limits.bytes += _size(value) + 2
+        if self.unique and (self.items is not None or self.positional is not None):
+            # unique items are drawn until enough distinct ones are found, so they are generated at their usual length
+            # and counted once done
+            unsized = Limits(limits.max_depth, limits.max_nodes)
+            unsized.nodes = limits.nodes
+            impostor = yield from self.expand(unsized, depth, prune)
+            limits.nodes = unsized.nodes
+            limits.retries += unsized.retries
+            limits.bytes = start + _size(impostor)
+            return impostor
+        impostor = list(self.const) if limits.out is None else ArraySink(limits.out, self.const)
+        if self.positional is not None:
+            expected = len(self.positional) + (0 if self.additional is None else self.maximum - len(self.positional))
+            for node in self.positional:
+                impostor.append((yield from self._item(node, impostor, limits,
+                                                       _share(budget, start, limits, expected - len(impostor)))))
+        node = self.items if self.items is not None else self.additional
+        if node is None:
+            limits.nodes += len(impostor)
+            return impostor
+        if self.contains is not None:
+            impostor.append((yield from self._item(self.contains, impostor, limits,
+                                                   _share(budget, start, limits, self.maximum - len(impostor)))))
+        minimum = self.min_items if prune else self.minimum
+        maximum = inf if self.max_items is None else self.max_items
+        count = len(impostor)
+        # the number of items the budget is shared between
+        expected = max(minimum, min(maximum, self.maximum))
+        while len(impostor) < maximum:
+            used = limits.bytes - start
+            generated = len(impostor) - count
+            average = (used - 2) / len(impostor) if impostor else 0
+            if len(impostor) >= minimum and (prune or used + average / 2 >= budget):
+                break
+            if generated:
+                expected = max(minimum, min(maximum, len(impostor) + (budget - used) / max(1, average)))
+            item = Choice(self.rng.choice, self.enums) if self.enums else node
+            share = min(_share(budget, start, limits, expected - len(impostor)),
+                        max(MAX_ITEM_SHARE, (budget - used) / (maximum - len(impostor))))
+            impostor.append((yield from self._item(item, impostor, limits, share)))
+        limits.nodes += len(impostor)
+        return impostor
+
+    @staticmethod
+    def _item(node: Node, impostor: list, limits: Limits, share: float) -> Generator[Node, Any, Any]:
+        """Generates an item within its share of the budget, counting its separator."""
+        if impostor:
+            limits.bytes += 2
+            share -= 2
+        limits.budget = share
+        return _sized(node, limits) if type(node) in _LEAVES else (yield node)
+
+    def _unique_gen(self, impostor: list, unique_items: UniqueItems, node: Node, length: int, limits: Limits,
+                    depth: int) -> None:
+        if self.enums:
+            impostor.extend(self.rng.sample(self.enums, min(length, len(self.enums))))
+        else:
+            # unique items are compared as soon as they are generated, so each is generated by its own run
+            limits.retries += unique_items.extend(self.rng, impostor, length, self.min_items,
+                                                  partial(run, node, limits, depth + 1))
+
+
+class Profiled(Container):
+    """Records the generation of a node in the PathStats of its schema path, see jsongen.profile."""
+    __slots__ = ('node', 'profiler', 'stats', 'pattern')
+
+    def __init__(self, node: Node, profiler, stats, pattern: bool=False) -> None:
+        """
+        :param node: the node to profile.
+        :param profiler: the jsongen.profile.Profiler.
+        :param stats: the PathStats to record in.
+        :param pattern: whether the node generates strings matching a pattern, so its time is pattern time.
+        """
+        self.node = node
+        self.profiler = profiler
+        self.stats = stats
+        self.pattern = pattern
+
+    def expand(self, limits: Limits, depth: int, prune: bool) -> Generator[Node, Any, Any]:
+        profiler = self.profiler
+        profiler.enter()
+        retries = limits.retries
+        position = None if limits.out is None else limits.out.position
+        start = perf_counter()
+        node = self.node
+        while isinstance(node, (Branch, Ref)):
+            node = node.select()
+        if isinstance(node, Container):
+            # the wrapped container is expanded in place, so it has the same depth and doesn't recurse
+            value = yield from node.expand(limits, depth, prune)
+        else:
+            value = node() if limits.target_bytes is None else _sized(node, limits)
+        elapsed = perf_counter() - start
+        retries = limits.retries - retries
+        child_time, child_retries = profiler.exit(elapsed, retries)
+        stats = self.stats
+        stats.calls += 1
+        stats.cumulative += elapsed
+        stats.self_time += elapsed - child_time
+        if self.pattern:
+            stats.pattern_time += elapsed
+        stats.retries += retries - child_retries
+        if isinstance(value, Sink):
+            # the value was written as it was generated, with the separators of json.dumps, up to its closing bracket
+            stats.bytes += limits.out.position - position + 1
+        else:
+            stats.bytes += len(json.dumps(value, separators=(',', ':'), default=str))
+        return value
+
+
+# Nodes without children, which containers call directly.
+_LEAVES = frozenset((Const, Leaf, Text, Choice))
+
+
+class GenerationPlan(object):
+    """
+    A JSON schema compiled by JsonGenerator.compile. References are resolved, combinators are merged and the value
+    providers are bound once, so calling the plan repeatedly only does the work of generating each document.
+    """
+
+    def __init__(self, schema: dict, root: Node, max_depth: Optional[int]=None, max_nodes: Optional[int]=None) -> None:
+        """
+        :param schema: the JSON schema the plan was compiled from.
+        :param root: the compiled node for the top level of the schema.
+        :param max_depth: containers nested deeper than this only get their required properties and minItems items.
+        :param max_nodes: once a document has this many nodes, containers only get their required properties and
+        minItems items.
+        """
+        self.schema = schema
+        self.root = root
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        # the capacities of the nodes, found the first time a document is generated to a target size
+        self._capacities = None  # type: Optional[Dict[int, float]]
+
+    def __call__(self, target_bytes: Optional[int]=None):
+        """
+        :param target_bytes: the size the document should have once serialized by json.dumps, see JsonGenerator.
+        :return: generated JSON data
+        """
+        if target_bytes is None:
+            return run(self.root, Limits(self.max_depth, self.max_nodes))
+        return run(self.root, self._limits(target_bytes))
+
+    def write(self, out: JsonWriter, target_bytes: Optional[int]=None) -> None:
+        """
+        Writes a document to out as it is generated, without building it in memory. It is the document calling the plan
+        would have returned, serialized by json.dumps.
+        :param out: the writer to write to. It isn't flushed.
+        :param target_bytes: the size the document should have once serialized, see JsonGenerator.
+        """
+        limits = self._limits(target_bytes)
+        limits.out = out
+        run(self.root, limits)
+
+    def _limits(self, target_bytes: Optional[int]) -> Limits:
+        if target_bytes is None:
+            return Limits(self.max_depth, self.max_nodes)
+        if self._capacities is None:
+            self._capacities = capacities(self.root)
+        return Limits(self.max_depth, self.max_nodes, target_bytes, self._capacities)
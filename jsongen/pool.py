@@ -0,0 +1,112 @@
+"""
+Pools of pre-generated values for expensive providers. Faker's email, name or address providers take hundreds of
+microseconds per value, so schemas full of formatted strings spend most of their time in them. A pool generates its
+values in one batch up front and leaves then draw from it, which costs a single random choice.
+
+Pools trade variety for speed: a pool of size n only ever holds n distinct values at a time.
+"""
+import os
+import threading
+from random import Random
+from typing import Any, Callable, Collection, List, Optional, Tuple, Union
+
+
+class PoolPolicy(object):
+    """Which providers are pooled, how many values each pool holds and when the values are replaced."""
+
+    def __init__(self, size: int=1024, refresh: Optional[int]=None, background: bool=False,
+                 providers: Optional[Collection[str]]=None) -> None:
+        """
+        :param size: the number of values generated for each pool.
+        :param refresh: the number of draws after which a pool is refilled with new values. None keeps the first values,
+        so documents only depend on their seed and generate_at and generate_parallel stay reproducible. Refreshed pools
+        make each document depend on the documents generated before it in the same process.
+        :param background: if True the next values of a refreshed pool are generated in a thread while the current ones
+        are drawn, rather than all at once when they are replaced.
+        :param providers: the names of the providers to pool, such as 'email' for the email format or the value of
+        'fake' in a schema. None pools every format and 'fake' provider.
+        """
+        if size < 1:
+            raise ValueError("Pools need at least one value.")
+        if refresh is not None and refresh < 1:
+            raise ValueError("Pools must be refreshed after at least one draw.")
+        self.size = size
+        self.refresh = refresh
+        self.background = background
+        self.providers = frozenset(providers) if providers is not None else None
+
+    def covers(self, name: str) -> bool:
+        """
+        :param name: the name of a provider.
+        :return: True if the provider is pooled.
+        """
+        return self.providers is None or name in self.providers
+
+    @staticmethod
+    def parse(spec: Union[int, 'PoolPolicy', None]) -> Optional['PoolPolicy']:
+        """
+        :param spec: a pool size, a policy which is returned unchanged, or None for no pools.
+        :return: the pool policy, or None.
+        """
+        if spec is None or isinstance(spec, PoolPolicy):
+            return spec
+        return PoolPolicy(int(spec))
+
+    def __repr__(self):
+        return f'PoolPolicy(size={self.size}, refresh={self.refresh}, background={self.background})'
+
+
+class ValuePool(object):
+    """
+    Values generated by a provider, called in place of the provider. The provider draws from its own Random, so the
+    values don't depend on the documents generated, and draws come from the Random of the generator.
+    """
+
+    def __init__(self, provider: Callable[[], Any], rng: Random, policy: PoolPolicy) -> None:
+        """
+        :param provider: generates the values of the pool. It must not draw from rng.
+        :param rng: the random number generator values are drawn with.
+        :param policy: the size of the pool and when it is refilled.
+        """
+        self.provider = provider
+        self.size = policy.size
+        self.refresh = policy.refresh
+        self.background = policy.background and policy.refresh is not None
+        self._choice = rng.choice
+        self.values = self._generate()
+        self.draws = 0
+        # The process, thread and values of the next batch when they are generated in the background.
+        self._next = None  # type: Optional[Tuple[int, threading.Thread, List[Any]]]
+        if self.background:
+            self._start()
+
+    def __call__(self) -> Any:
+        if self.refresh is not None:
+            self.draws += 1
+            if self.draws > self.refresh:
+                self._refill()
+        return self._choice(self.values)
+
+    def _generate(self) -> List[Any]:
+        provider = self.provider
+        return [provider() for _ in range(self.size)]
+
+    def _refill(self) -> None:
+        """Replaces the values with the next batch, waiting for it if it is generated in the background."""
+        self.draws = 1
+        pending, self._next = self._next, None
+        if pending is not None and pending[0] == os.getpid():
+            _, thread, values = pending
+            thread.join()
+            self.values = values
+        else:
+            # A thread started before the process was forked doesn't run in the child.
+            self.values = self._generate()
+        if self.background:
+            self._start()
+
+    def _start(self) -> None:
+        values = []  # type: List[Any]
+        thread = threading.Thread(target=lambda: values.extend(self._generate()), daemon=True)
+        thread.start()
+        self._next = (os.getpid(), thread, values)
@@ -0,0 +1,109 @@
+"""
+Profiles generation per schema path. When JsonGenerator is created with profile=True every compiled node is wrapped in
+a plan.Profiled node that records its calls, time, pattern time, uniqueness retries and the bytes it produced under the
+JSON pointer of its schema, e.g. '#/properties/name'. Nodes of referenced schemas are recorded under the pointer of
+the schema they were defined in, e.g. '#/definitions/person'.
+"""
+import json
+from typing import Dict, List, Optional
+
+
+class PathStats(object):
+    """What was generated for one schema path. Times are in seconds."""
+    __slots__ = ('calls', 'cumulative', 'self_time', 'pattern_time', 'retries', 'bytes')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.cumulative = 0.0
+        self.self_time = 0.0
+        self.pattern_time = 0.0
+        self.retries = 0
+        self.bytes = 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Profiler(object):
+    """Collects PathStats by JSON pointer."""
+
+    COLUMNS = ('calls', 'cumulative', 'self_time', 'pattern_time', 'retries', 'bytes')
+
+    def __init__(self) -> None:
+        self.paths = {}  # type: Dict[str, PathStats]
+        # The time and retries of the profiled children of each node being generated.
+        self._children = []  # type: List[List[float]]
+
+    def stats(self, path: str) -> PathStats:
+        """
+        :param path: the JSON pointer of a schema.
+        :return: the stats recorded for the path.
+        """
+        stats = self.paths.get(path)
+        if stats is None:
+            stats = self.paths[path] = PathStats()
+        return stats
+
+    def enter(self) -> None:
+        """Called when a profiled node starts generating."""
+        self._children.append([0.0, 0])
+
+    def exit(self, elapsed: float, retries: int) -> List[float]:
+        """
+        Called when a profiled node is done.
+
+        :param elapsed: the time the node took, including its children.
+        :param retries: the uniqueness retries of the node, including its children.
+        :return: the time and retries of its profiled children.
+        """
+        children = self._children.pop()
+        if self._children:
+            parent = self._children[-1]
+            parent[0] += elapsed
+            parent[1] += retries
+        return children
+
+    def reset(self) -> None:
+        self.paths.clear()
+        self._children.clear()
+
+    def as_dict(self) -> Dict[str, dict]:
+        """
+        :return: the stats of every path, by path.
+        """
+        return {path: stats.as_dict() for path, stats in self.paths.items()}
+
+    def to_json(self, **kwargs) -> str:
+        """
+        :param kwargs: passed to json.dumps.
+        :return: the stats of every path as JSON.
+        """
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def table(self, sort_by: str='self_time', limit: Optional[int]=None) -> str:
+        """
+        :param sort_by: the column to sort by, descending.
+        :param limit: the most rows to show.
+        :return: a text table of the stats, one path per row, with times in milliseconds.
+        """
+        if sort_by not in self.COLUMNS:
+            raise ValueError(f"Can't sort by '{sort_by}', must be one of {', '.join(self.COLUMNS)}.")
+        rows = sorted(self.paths.items(), key=lambda item: getattr(item[1], sort_by), reverse=True)[:limit]
+        header = ('path', 'calls', 'cum ms', 'self ms', 'pattern ms', 'retries', 'bytes')
+        lines = [[path, str(s.calls), f'{s.cumulative * 1e3:.3f}', f'{s.self_time * 1e3:.3f}',
+                  f'{s.pattern_time * 1e3:.3f}', str(s.retries), str(s.bytes)] for path, s in rows]
+        widths = [max(len(row[i]) for row in [header] + lines) for i in range(len(header))]
+        return '\n'.join(
+            '  '.join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in
+                      enumerate(zip(row, widths)))
+            for row in [header] + lines)
+
+
+def pointer(segments: List[str]) -> str:
+    """
+    :param segments: the keys from the root of a schema, where the first segment is the URI of the root.
+    :return: the JSON pointer, as a URI fragment.
+    """
+    root, segments = segments[0], segments[1:]
+    escaped = ''.join('/' + str(segment).replace('~', '~0').replace('/', '~1') for segment in segments)
+    return (root if '#' in root else root + '#') + escaped
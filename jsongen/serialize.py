@@ -0,0 +1,81 @@
+"""
+Serializers for generated documents. 'auto' picks orjson when it is installed, e.g. with
+`pip install pyjsongen[orjson]`, which serializes several times faster than the json module and straight to bytes, and
+the json module otherwise.
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class Serializer(object):
+    """Turns generated documents into JSON."""
+
+    def dumps(self, document: Any) -> str:
+        """
+        :param document: a generated document.
+        :return: the document as JSON text.
+        """
+        return self.dumpb(document).decode('utf-8')
+
+    def dumpb(self, document: Any) -> bytes:
+        """
+        :param document: a generated document.
+        :return: the document as UTF-8 encoded JSON.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def parse(spec: Union[str, 'Serializer']) -> 'Serializer':
+        """
+        Creates a serializer from its name: 'auto', 'json' or 'orjson'.
+
+        :param spec: the name of a serializer, or a serializer which is returned unchanged.
+        :return: the serializer.
+        """
+        if isinstance(spec, Serializer):
+            return spec
+        elif spec == 'auto':
+            return Orjson() if orjson is not None else Json()
+        elif spec == 'json':
+            return Json()
+        elif spec == 'orjson':
+            if orjson is None:
+                raise ImportError("The orjson serializer requires orjson. Install it with "
+                                  "`pip install pyjsongen[orjson]`.")
+            return Orjson()
+        raise ValueError(f"Unknown serializer '{spec}'.")
+
+
+class Json(Serializer):
+    """The json module of the standard library."""
+
+    def dumps(self, document: Any) -> str:
+        return json.dumps(document)
+
+    def dumpb(self, document: Any) -> bytes:
+        # json.dumps escapes non-ASCII characters
+        return json.dumps(document).encode('ascii')
+
+    def __repr__(self):
+        return 'json'
+
+
+class Orjson(Serializer):
+    """
+    orjson, which writes compact UTF-8. Documents orjson can't serialize, such as integers beyond 64 bits, are
+    serialized by the json module in the same format.
+    """
+
+    def dumpb(self, document: Any) -> bytes:
+        try:
+            return orjson.dumps(document)
+        except TypeError:
+            return json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def __repr__(self):
+        return 'orjson'
@@ -1,6 +1,9 @@
 # A stub for the Cache Object
 class Cache(object):
 
-    @property
-    def resolve(self, URL: str):
+    def resolve(self, URL: str) -> bytes:
+        """
+        :param URL: the URL of a document.
+        :return: the content of the document.
+        """
         raise NotImplementedError
@@ -0,0 +1,186 @@
+"""
+Generates unique array items. Items are compared by their canonical keys in a hash set, so building an array is linear
+in its length. When the values an item schema can take are few enough to enumerate they are sampled without
+replacement instead.
+"""
+from collections.abc import Sequence
+from itertools import product
+from math import ceil, floor
+from random import Random
+from typing import Any, Callable, Optional, Tuple
+
+from jsongen.canonical import canonical_key
+
+# Domains are only enumerated or sampled from up to this size, larger ones are generated and duplicates dropped.
+ENUMERATE_LIMIT = 4096
+# How many generated duplicates in a row give up on filling an array past its minItems.
+MAX_RETRIES = 100
+
+_LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+class _Scaled(Sequence):
+    """The multiples of a number for a range of integers, without materializing them."""
+
+    def __init__(self, integers: range, multiple_of: float) -> None:
+        self.integers = integers
+        self.multiple_of = multiple_of
+
+    def __len__(self) -> int:
+        return len(self.integers)
+
+    def __getitem__(self, i):
+        return round(self.integers[i] * self.multiple_of, 12)
+
+
+def item_domain(generator, schema: dict) -> Tuple[Optional[int], Optional[Sequence]]:
+    """
+    Estimates the values an item schema can generate.
+
+    :param generator: the JsonGenerator generating the items, for its limits.
+    :param schema: the item schema.
+    :return: the number of distinct values, or None if it is unknown or unbounded, and a sequence of those values if
+    they can be sampled from directly.
+    """
+    if '$ref' in schema:
+        return None, None
+    effective = generator._effective_schemas(schema)
+    if len(effective) != 1:
+        return None, None
+    schema = effective[0]
+    if schema.get('fake'):
+        return None, None
+    const = schema.get('const')
+    enums = schema.get('enum')
+    json_type = schema.get('type', 'object')
+    if json_type != 'array':
+        if not const and enums:
+            values = list({canonical_key(value): value for value in enums}.values())
+            return len(values), values
+        if const is not None:
+            return 1, [const]
+    if json_type == 'boolean':
+        return 2, [False, True]
+    elif json_type == 'integer':
+        maximum = schema.get('maximum', schema.get('exclusiveMaximum', generator.UNBOUND_MAX_INT) - 1)
+        minimum = schema.get('minimum', schema.get('exclusiveMinimum', generator.UNBOUND_MIN_INT) + 1)
+        multiple_of = schema.get('multipleOf', 1)
+        if multiple_of <= 0:
+            raise ValueError("multipleOf must be > 0")
+        return _multiples(minimum, maximum, multiple_of)
+    elif json_type == 'number':
+        multiple_of = schema.get('multipleOf')
+        if multiple_of is None:
+            return None, None
+        if multiple_of <= 0:
+            raise ValueError("multipleOf must be > 0")
+        maximum = schema.get('maximum', schema.get('exclusiveMaximum', generator.UNBOUND_MAX_INT) - 1e-12)
+        minimum = schema.get('minimum', schema.get('exclusiveMinimum', generator.UNBOUND_MIN_INT) + 1e-12)
+        return _multiples(minimum, maximum, multiple_of)
+    elif json_type == 'string' and not schema.get('format') and not schema.get('pattern'):
+        minimum = schema.get('minLength', generator.UNBOUND_MIN_STRING)
+        maximum = schema.get('maxLength', generator.UNBOUND_MAX_STRING)
+        size = 0
+        for length in range(minimum, maximum + 1):
+            size += len(_LETTERS) ** length
+            if size > ENUMERATE_LIMIT:
+                # too many to count quickly for a long maxLength
+                return None, None
+        return size, [''.join(letters) for length in range(minimum, maximum + 1)
+                      for letters in product(_LETTERS, repeat=length)]
+    return None, None
+
+
+def _multiples(minimum: float, maximum: float, multiple_of: float) -> Tuple[int, Optional[Sequence]]:
+    """The number of multiples of multiple_of between minimum and maximum, and the multiples if there are few enough."""
+    if isinstance(minimum, int) and isinstance(maximum, int) and isinstance(multiple_of, int):
+        # exact for bounds too large for a float
+        low, high = -(-minimum // multiple_of), maximum // multiple_of
+    else:
+        low, high = ceil(minimum / multiple_of), floor(maximum / multiple_of)
+    size = max(0, high - low + 1)
+    if size > ENUMERATE_LIMIT:
+        return size, None
+    integers = range(low, high + 1)
+    return size, integers if multiple_of == 1 else _Scaled(integers, multiple_of)
+
+
+class UniqueItems(object):
+    """Appends unique items to arrays."""
+
+    def __init__(self, generate: Callable[[], Any], size: Optional[int]=None, domain: Optional[Sequence]=None) -> None:
+        """
+        :param generate: generates an item.
+        :param size: the number of distinct items generate can return, if known.
+        :param domain: the distinct items generate can return, to sample from without replacement.
+        """
+        self.generate = generate
+        self.size = size
+        self.domain = domain
+
+    def extend(self, rng: Random, impostor: list, length: int, minimum: int,
+               generate: Optional[Callable[[], Any]]=None) -> int:
+        """
+        Appends unique items until the array has length items.
+
+        :param rng: the random number generator to sample with.
+        :param impostor: the array, which may already hold unique items.
+        :param length: the length to fill the array to.
+        :param minimum: the minItems of the array. Raises a ValueError if it can't be met.
+        :param generate: generates an item, instead of self.generate.
+        :return: the number of duplicates that were generated and dropped.
+        """
+        seen = {canonical_key(item) for item in impostor}
+        duplicates = 0
+        if self.size is not None:
+            length = min(length, self.size + len(impostor))
+        if self.domain is not None:
+            # at most len(impostor) sampled items can already be in the array
+            k = min(len(self.domain), length - len(impostor) + len(seen))
+            for item in rng.sample(self.domain, k):
+                if len(impostor) >= length:
+                    break
+                key = canonical_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    impostor.append(item)
+        else:
+            generate = generate or self.generate
+            retries = 0
+            while len(impostor) < length and retries < MAX_RETRIES:
+                item = generate()
+                key = canonical_key(item)
+                if key in seen:
+                    retries += 1
+                    duplicates += 1
+                else:
+                    seen.add(key)
+                    impostor.append(item)
+                    retries = 0
+        if len(impostor) < minimum:
+            raise ValueError(f"Could not generate {minimum} unique items.")
+        return duplicates
+
+
+def unique_positional(generators: list, impostor: list) -> int:
+    """
+    Appends one item per positional item schema, each unique in the array.
+
+    :param generators: generate the item for each position.
+    :param impostor: the array.
+    :return: the number of duplicates that were generated and dropped.
+    """
+    seen = {canonical_key(item) for item in impostor}
+    duplicates = 0
+    for generate in generators:
+        for _ in range(MAX_RETRIES):
+            item = generate()
+            key = canonical_key(item)
+            if key not in seen:
+                seen.add(key)
+                impostor.append(item)
+                break
+            duplicates += 1
+        else:
+            raise ValueError("Could not generate a unique item.")
+    return duplicates
@@ -0,0 +1,106 @@
+import random
+import re
+from typing import Optional, Union
+
+
+class ValidationPolicy(object):
+    """Decides which generated documents are validated against their schema."""
+
+    def should_validate(self, count: int) -> bool:
+        """
+        :param count: the number of documents generated before this one.
+        :return: True if the document should be validated.
+        """
+        raise NotImplementedError
+
+    def seed(self, seed: int) -> None:
+        """
+        Reseeds the choices of the policy, so they only depend on the document being generated.
+
+        :param seed: the seed of the document.
+        """
+
+    @staticmethod
+    def parse(spec: Union[str, 'ValidationPolicy']) -> 'ValidationPolicy':
+        """
+        Creates a policy from its string form: 'always', 'never', 'sample(rate)' or 'first(n)'.
+
+        :param spec: the string form of a policy, or a policy which is returned unchanged.
+        :return: the validation policy.
+        """
+        if isinstance(spec, ValidationPolicy):
+            return spec
+        match = re.fullmatch(r'\s*(\w+)\s*(?:\(\s*([^)]*?)\s*\))?\s*', spec)
+        name, arg = match.groups() if match else (None, None)
+        if name == 'always' and not arg:
+            return Always()
+        elif name == 'never' and not arg:
+            return Never()
+        elif name == 'sample' and arg:
+            return Sample(float(arg))
+        elif name == 'first' and arg:
+            return First(int(arg))
+        raise ValueError(f"Unknown validation policy '{spec}'.")
+
+
+class Always(ValidationPolicy):
+    """Validates every document."""
+
+    def should_validate(self, count: int) -> bool:
+        return True
+
+    def __repr__(self):
+        return 'always'
+
+
+class Never(ValidationPolicy):
+    """Trusts the generator and never validates."""
+
+    def should_validate(self, count: int) -> bool:
+        return False
+
+    def __repr__(self):
+        return 'never'
+
+
+class Sample(ValidationPolicy):
+    """Validates a random fraction of documents."""
+
+    def __init__(self, rate: float, seed: Optional[int]=None) -> None:
+        """
+        :param rate: the fraction of documents to validate, between 0 and 1.
+        :param seed: seeds the sampling. Sampling never draws from the generator's own source of randomness, and
+        documents generated from a seed of their own, e.g. by generate_parallel, reseed it from theirs.
+        """
+        if not 0 <= rate <= 1:
+            raise ValueError("rate must be between 0 and 1")
+        self.rate = rate
+        self._random = random.Random(seed)
+
+    def should_validate(self, count: int) -> bool:
+        return self._random.random() < self.rate
+
+    def seed(self, seed: int) -> None:
+        # salted, so the choice doesn't follow the first draw of the document
+        self._random.seed(f'{seed}:sample')
+
+    def __repr__(self):
+        return f'sample({self.rate})'
+
+
+class First(ValidationPolicy):
+    """Validates only the first n documents."""
+
+    def __init__(self, n: int) -> None:
+        """
+        :param n: the number of documents to validate.
+        """
+        if n < 0:
+            raise ValueError("n must be >= 0")
+        self.n = n
+
+    def should_validate(self, count: int) -> bool:
+        return count < self.n
+
+    def __repr__(self):
+        return f'first({self.n})'
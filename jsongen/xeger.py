@@ -0,0 +1,203 @@
+"""
+Generates strings matching a regular expression. Each regex is parsed once into a tree of samplers that is cached by
+the regex string, so generating another string only draws random choices.
+"""
+import string
+from functools import lru_cache
+from random import Random
+from typing import Callable, Dict, List, Tuple
+
+try:
+    from re import _parser as sre_parse  # type: ignore
+except ImportError:  # Python < 3.11
+    import sre_parse  # type: ignore
+
+# Samplers take the random number generator and the groups matched so far, for backreferences.
+_Sampler = Callable[[Random, Dict[int, str]], str]
+
+_ANY = string.printable.replace('\n', '')
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: string.digits,
+    sre_parse.CATEGORY_NOT_DIGIT: ''.join(c for c in string.printable if c not in string.digits),
+    sre_parse.CATEGORY_SPACE: string.whitespace,
+    sre_parse.CATEGORY_NOT_SPACE: ''.join(c for c in string.printable if c not in string.whitespace),
+    sre_parse.CATEGORY_WORD: string.ascii_letters + string.digits + '_',
+    sre_parse.CATEGORY_NOT_WORD: ''.join(c for c in string.printable
+                                         if c not in string.ascii_letters + string.digits + '_'),
+}
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)}
+
+
+class PatternSampler(object):
+    """Generates strings matching a parsed regex."""
+
+    def __init__(self, pattern: str, max_repeat: int) -> None:
+        """
+        :param pattern: the regex to generate strings for.
+        :param max_repeat: the most repetitions added above the minimum for unbounded repeats such as '*' and '+'.
+        """
+        self.pattern = pattern
+        self.max_repeat = max_repeat
+        self._sample = self._compile(sre_parse.parse(pattern))
+
+    def __call__(self, rng: Random) -> str:
+        """
+        :param rng: the random number generator to draw from.
+        :return: a string matching the pattern.
+        """
+        return self._sample(rng, {})
+
+    def lengths(self) -> Tuple[float, int]:
+        """
+        :return: the expected and the maximum length of the strings generated, found without generating any.
+        """
+        return self._lengths(sre_parse.parse(self.pattern), {})
+
+    def _lengths(self, parsed, groups: Dict[int, Tuple[float, int]]) -> Tuple[float, int]:
+        expected, maximum = 0.0, 0
+        for op, av in parsed:
+            if op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN, sre_parse.ANY, sre_parse.CATEGORY):
+                lengths = 1.0, 1
+            elif op in _REPEATS:
+                minimum, most, sub = av
+                if most == sre_parse.MAXREPEAT:
+                    most = minimum + self.max_repeat
+                sub_expected, sub_maximum = self._lengths(sub, groups)
+                lengths = (minimum + most) / 2 * sub_expected, most * sub_maximum
+            elif op is sre_parse.BRANCH:
+                branches = [self._lengths(branch, groups) for branch in av[1]]
+                lengths = sum(e for e, _ in branches) / len(branches), max(m for _, m in branches)
+            elif op is sre_parse.SUBPATTERN:
+                lengths = self._lengths(av[-1], groups)
+                if av[0] is not None:
+                    groups[av[0]] = lengths
+            elif op is sre_parse.GROUPREF:
+                lengths = groups.get(av, (0.0, 0))
+            elif op is sre_parse.GROUPREF_EXISTS:
+                yes, no = self._lengths(av[1], groups), self._lengths(av[2], groups) if av[2] else (0.0, 0)
+                lengths = (yes[0] + no[0]) / 2, max(yes[1], no[1])
+            elif op is getattr(sre_parse, 'ATOMIC_GROUP', None):
+                lengths = self._lengths(av, groups)
+            else:
+                lengths = 0.0, 0
+            expected += lengths[0]
+            maximum += lengths[1]
+        return expected, maximum
+
+    def _compile(self, parsed) -> _Sampler:
+        samplers = []  # type: List[_Sampler]
+        literal = []  # type: List[str]
+        for op, av in parsed:
+            if op is sre_parse.LITERAL:
+                literal.append(chr(av))
+                continue
+            if literal:
+                samplers.append(_constant(''.join(literal)))
+                literal = []
+            sampler = self._compile_op(op, av)
+            if sampler is not None:
+                samplers.append(sampler)
+        if literal:
+            samplers.append(_constant(''.join(literal)))
+
+        if not samplers:
+            return _constant('')
+        if len(samplers) == 1:
+            return samplers[0]
+        return lambda rng, groups: ''.join([sample(rng, groups) for sample in samplers])
+
+    def _compile_op(self, op, av) -> _Sampler:
+        if op is sre_parse.IN:
+            return _choice(_charset(av))
+        elif op is sre_parse.ANY:
+            return _choice(_ANY)
+        elif op is sre_parse.NOT_LITERAL:
+            return _choice(_ANY.replace(chr(av), ''))
+        elif op is sre_parse.CATEGORY:
+            return _choice(_CATEGORIES[av])
+        elif op in _REPEATS:
+            return self._compile_repeat(*av)
+        elif op is sre_parse.BRANCH:
+            branches = [self._compile(branch) for branch in av[1]]
+            return lambda rng, groups: rng.choice(branches)(rng, groups)
+        elif op is sre_parse.SUBPATTERN:
+            group, sample = av[0], self._compile(av[-1])
+            if group is None:
+                return sample
+
+            def subpattern(rng, groups):
+                groups[group] = value = sample(rng, groups)
+                return value
+            return subpattern
+        elif op is sre_parse.GROUPREF:
+            return lambda rng, groups: groups.get(av, '')
+        elif op is sre_parse.GROUPREF_EXISTS:
+            group, yes, no = av[0], self._compile(av[1]), self._compile(av[2]) if av[2] else _constant('')
+            return lambda rng, groups: yes(rng, groups) if group in groups else no(rng, groups)
+        elif op is getattr(sre_parse, 'ATOMIC_GROUP', None):
+            return self._compile(av)
+        # anchors and lookaround assertions don't produce characters
+        return None
+
+    def _compile_repeat(self, minimum: int, maximum: int, parsed) -> _Sampler:
+        if maximum == sre_parse.MAXREPEAT:
+            maximum = minimum + self.max_repeat
+        if len(parsed) == 1 and parsed[0][0] in (sre_parse.IN, sre_parse.ANY, sre_parse.CATEGORY, sre_parse.LITERAL,
+                                                 sre_parse.NOT_LITERAL):
+            # a repeated single character is drawn in one call
+            op, av = parsed[0]
+            if op is sre_parse.IN:
+                chars = _charset(av)
+            elif op is sre_parse.ANY:
+                chars = _ANY
+            elif op is sre_parse.CATEGORY:
+                chars = _CATEGORIES[av]
+            elif op is sre_parse.LITERAL:
+                chars = chr(av)
+            else:
+                chars = _ANY.replace(chr(av), '')
+            if minimum == maximum:
+                return lambda rng, groups: ''.join(rng.choices(chars, k=minimum))
+            return lambda rng, groups: ''.join(rng.choices(chars, k=rng.randint(minimum, maximum)))
+        sample = self._compile(parsed)
+        return lambda rng, groups: ''.join([sample(rng, groups) for _ in range(rng.randint(minimum, maximum))])
+
+
+def _constant(value: str) -> _Sampler:
+    return lambda rng, groups: value
+
+
+def _choice(chars: str) -> _Sampler:
+    return lambda rng, groups: rng.choice(chars)
+
+
+def _charset(items) -> str:
+    """Expands the items of a character class into the characters it matches."""
+    chars = []
+    negate = False
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            negate = True
+        elif op is sre_parse.LITERAL:
+            chars.append(chr(av))
+        elif op is sre_parse.RANGE:
+            chars.extend(chr(c) for c in range(av[0], av[1] + 1))
+        elif op is sre_parse.CATEGORY:
+            chars.extend(_CATEGORIES[av])
+    if negate:
+        excluded = set(chars)
+        return ''.join(c for c in _ANY if c not in excluded)
+    # Duplicates would make some characters more likely than others.
+    return ''.join(dict.fromkeys(chars))
+
+
+@lru_cache(maxsize=4096)
+def compile_pattern(pattern: str, max_repeat: int) -> PatternSampler:
+    """
+    Parses the regex once. Samplers are cached by the pattern and max_repeat.
+
+    :param pattern: the regex to generate strings for.
+    :param max_repeat: the most repetitions added above the minimum for unbounded repeats such as '*' and '+'.
+    :return: a sampler that generates a string matching the pattern when called with a random number generator.
+    """
+    return PatternSampler(pattern, max_repeat)
@@ -16,8 +16,13 @@ setup(
     install_requires=install_requires,
     extras_require={
         ':python_version < "3.5"': ['typing >= 3.6.2, < 4'],
+        'columnar': ['numpy >= 1.17'],
+        'orjson': ['orjson >= 3'],
     },
     packages=find_packages(exclude=['test']),
+    entry_points={
+        'console_scripts': ['jsongen=jsongen.cli:main'],
+    },
     platforms=['MacOS X', 'Posix'],
     zip_safe=False,
     include_package_data=True,
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen.aio import AsyncHCAJsonGenerator
+from jsongen.hca_generator import HCAJsonGenerator
+
+
+class TestAsyncHCAGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.write('item.json', {'type': 'integer', 'minimum': 0, 'maximum': 1000})
+        self.write('bundle.json', {'type': 'object', 'required': ['item', 'tags'],
+                                   'properties': {'item': {'$ref': self.url('item.json')},
+                                                  'tags': {'type': 'array', 'items': {'type': 'string'}}}})
+        self.urls = [self.url('bundle.json'), self.url('item.json')]
+        self.agen = AsyncHCAJsonGenerator(self.urls, seed=0)
+        self.addCleanup(self.agen.close)
+
+    def url(self, file_name):
+        return 'file://' + os.path.join(self.directory.name, file_name)
+
+    def write(self, file_name, schema):
+        with open(os.path.join(self.directory.name, file_name), 'w') as fp:
+            json.dump(schema, fp)
+
+    def run_async(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def test_generate(self):
+        expected = HCAJsonGenerator(self.urls, seed=0)
+        for name in ['bundle.json', 'item.json', None]:
+            self.assertEqual(self.run_async(self.agen.generate(name)), expected.generate(name))
+        self.assertEqual(self.agen.stats['invalid'], 0)
+
+    def test_stream(self):
+        async def collect(**kwargs):
+            return [document async for document in self.agen.stream(n=20, seed=5, **kwargs)]
+
+        expected = [HCAJsonGenerator(self.urls).generate_at(index, 5) for index in range(20)]
+        self.assertEqual(self.run_async(collect()), expected)
+        self.assertEqual(self.run_async(collect(buffer=1)), expected)
+
+    def test_backpressure(self):
+        async def consume():
+            stream = self.agen.stream('bundle.json', n=100, buffer=3)
+            await stream.__anext__()
+            await asyncio.sleep(0.2)
+            generated = self.agen.stats['documents']
+            await stream.aclose()
+            await asyncio.sleep(0.1)
+            return generated
+
+        generated = self.run_async(consume())
+        # the document yielded, the buffered ones and the one the producer waits to put
+        self.assertLessEqual(generated, 5)
+        self.assertEqual(self.agen.stats['documents'], generated)
+
+    def test_loop_not_blocked(self):
+        generate = self.agen.generator.generate
+
+        def slow_generate(*args):
+            time.sleep(0.3)
+            return generate(*args)
+
+        self.agen.generator.generate = slow_generate
+
+        async def tick(ticks, done):
+            while not done.is_set():
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            ticks, done = [], asyncio.Event()
+            ticker = asyncio.ensure_future(tick(ticks, done))
+            await asyncio.gather(self.agen.generate('bundle.json'), self.agen.prefetch())
+            done.set()
+            await ticker
+            return ticks
+
+        self.assertGreater(len(self.run_async(run())), 10)
+
+    def test_shared_executor(self):
+        async def run(agen):
+            async with agen:
+                return await asyncio.gather(*[agen.generate_at(index, 1) for index in range(10)])
+
+        with ThreadPoolExecutor(4) as executor:
+            documents = self.run_async(run(AsyncHCAJsonGenerator(self.urls, executor=executor)))
+            self.assertFalse(executor._shutdown)
+        self.assertEqual(documents, [HCAJsonGenerator(self.urls).generate_at(index, 1) for index in range(10)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen.cache import DiskCache, LRUCache
+from jsongen.hca_generator import HCAJsonGenerator
+
+url = 'https://example.com/thing.json'
+content = json.dumps({'type': 'integer', 'minimum': 7, 'maximum': 7}).encode('utf-8')
+
+
+def _store(directory, i):
+    cache = DiskCache(directory, fetch=None)
+    for j in range(50):
+        cache.store(url, content)
+    return cache.resolve(url)
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.fetch = mock.Mock(return_value=content)
+
+    def cache(self, **kwargs):
+        return DiskCache(self.tmp.name, fetch=self.fetch, **kwargs)
+
+    def test_fetched_once(self):
+        self.assertEqual(self.cache().resolve(url), content)
+        self.assertEqual(self.cache().resolve(url), content)
+        self.fetch.assert_called_once_with(url)
+
+    def test_content_addressed(self):
+        cache = self.cache()
+        digest = cache.store(url, content)
+        self.assertEqual(cache.store('https://example.com/copy.json', content), digest)
+        self.assertEqual(cache.resolve('https://example.com/copy.json'), content)
+        self.assertEqual(os.listdir(os.path.join(self.tmp.name, 'objects', digest[:2])), [digest])
+
+    def test_ttl(self):
+        cache = self.cache(ttl=60)
+        cache.resolve(url)
+        with mock.patch('time.time', return_value=cache._entry(url)['fetched'] + 61):
+            cache.resolve(url)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_expired_served_when_fetch_fails(self):
+        self.cache().resolve(url)
+        self.fetch.side_effect = OSError("network is down")
+        self.assertEqual(self.cache(ttl=0).resolve(url), content)
+
+    def test_offline(self):
+        with self.assertRaises(LookupError):
+            self.cache(offline=True).resolve(url)
+        self.cache().resolve(url)
+        self.assertEqual(self.cache(offline=True, ttl=0).resolve(url), content)
+        self.fetch.assert_called_once_with(url)
+
+    def test_evict(self):
+        cache = self.cache()
+        cache.resolve(url)
+        cache.evict(url)
+        cache.resolve(url)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_corrupt_object_refetched(self):
+        cache = self.cache()
+        digest = cache.store(url, content)
+        with open(cache._object_path(digest), 'wb') as fh:
+            fh.write(content[:5])
+        self.assertEqual(cache.resolve(url), content)
+        self.assertEqual(cache.resolve(url), content)
+        self.fetch.assert_called_once_with(url)
+
+    def test_concurrent_processes(self):
+        with multiprocessing.get_context('fork').Pool(4) as pool:
+            results = pool.starmap(_store, [(self.tmp.name, i) for i in range(8)])
+        self.assertEqual(results, [content] * 8)
+        self.assertFalse([name for _, _, files in os.walk(self.tmp.name) for name in files if name.startswith('.tmp-')])
+
+    def test_hca_generator(self):
+        generator = HCAJsonGenerator([url], cache=self.cache())
+        self.assertEqual(json.loads(generator.generate()), {'thing.json': 7})
+        self.fetch.assert_called_once_with(url)
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_bounded(self):
+        cache = LRUCache(2)
+        cache['a'], cache['b'] = 1, 2
+        self.assertEqual(cache.get('a'), 1)
+        cache['c'] = 3
+        # 'b' was used least recently
+        self.assertNotIn('b', cache)
+        self.assertEqual((cache.get('a'), cache.get('b', 0), cache.get('c')), (1, 0, 3))
+        self.assertEqual(len(cache), 2)
+        with self.assertRaises(ValueError):
+            LRUCache(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
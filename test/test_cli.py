@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen.cli import main
+
+schema = {'type': 'object',
+          'required': ['name', 'count'],
+          'properties': {'name': {'type': 'string', 'maxLength': 12},
+                         'count': {'type': 'integer', 'minimum': 0}}}
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.schema_path = os.path.join(self.tmp.name, 'thing.json')
+        with open(self.schema_path, 'w') as fh:
+            json.dump(schema, fh)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _main(self, *args):
+        stdout, stderr = io.TextIOWrapper(io.BytesIO()), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            self.assertEqual(main([self.schema_path, *args]), 0)
+        stdout.flush()
+        return stdout.buffer.getvalue().decode('utf-8'), stderr.getvalue()
+
+    def test_stdout(self):
+        stdout, stderr = self._main('-n', '5', '-s', '1')
+        lines = stdout.splitlines()
+        self.assertEqual(len(lines), 5)
+        for line in lines:
+            self.assertIsInstance(json.loads(line)['thing.json']['count'], int)
+        self.assertIn("Generated 5 documents", stderr)
+        self.assertIn("docs/s", stderr)
+
+    def test_file(self):
+        output = os.path.join(self.tmp.name, 'out.jsonl')
+        self._main('-n', '4', '-s', '1', '-o', output)
+        with open(output) as fh:
+            self.assertEqual(len(fh.readlines()), 4)
+
+    def test_directory(self):
+        output = os.path.join(self.tmp.name, 'out') + os.sep
+        self._main('-n', '3', '-o', output)
+        self.assertEqual(sorted(os.listdir(output)), ['thing-000000.json', 'thing-000001.json', 'thing-000002.json'])
+
+    def test_workers_are_deterministic(self):
+        expected, _ = self._main('-n', '6', '-s', '3')
+        stdout, _ = self._main('-n', '6', '-s', '3', '-w', '2')
+        self.assertEqual(stdout, expected)
+
+    def test_serializer(self):
+        expected, _ = self._main('-n', '4', '-s', '3')
+        stdout, stderr = self._main('-n', '4', '-s', '3', '-w', '2', '--serializer', 'auto')
+        self.assertEqual([json.loads(line) for line in stdout.splitlines()],
+                         [json.loads(line) for line in expected.splitlines()])
+        self.assertIn("serialization", stderr)
+
+    def test_pool(self):
+        expected, _ = self._main('-n', '6', '-s', '3', '--pool', '4')
+        stdout, _ = self._main('-n', '6', '-s', '3', '--pool', '4', '-w', '2')
+        self.assertEqual(stdout, expected)
+        self.assertEqual(len(stdout.splitlines()), 6)
+
+    def test_estimate(self):
+        stdout, _ = self._main('-n', '100', '--estimate')
+        self.assertIn('thing.json: ', stdout)
+        self.assertIn('for 100 documents', stdout)
+        self.assertIn('thing.json#/properties/count', stdout)
+
+    def test_profile(self):
+        output = os.path.join(self.tmp.name, 'profile.json')
+        _, stderr = self._main('-n', '3', '--profile', '--profile-json', output)
+        self.assertIn('self ms', stderr)
+        with open(output) as fh:
+            profile = json.load(fh)
+        root = [path for path in profile if path.endswith('thing.json#')]
+        self.assertEqual(len(root), 1)
+        self.assertEqual(profile[root[0] + '/properties/count']['calls'], 3)
+
+    def test_target_bytes(self):
+        stdout, _ = self._main('-n', '2', '--target-bytes', '1KB')
+        self.assertEqual(len(stdout.splitlines()), 2)
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main([self.schema_path, '--target-bytes', 'large'])
+
+    def test_validate(self):
+        _, stderr = self._main('-n', '4', '--validate', 'first(1)')
+        self.assertIn('Validated 1,', stderr)
+        for policy in ('bogus', 'sample(2)', 'first(x)'):
+            with self.subTest(policy), redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+                main([self.schema_path, '--validate', policy])
+            self.assertIn('error: --validate', stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
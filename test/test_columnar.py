@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+
+from jsonschema import Draft4Validator, RefResolver
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen import columnar
+from jsongen.generator import JsonGenerator
+
+schema = {'type': 'object',
+          'required': ['name', 'count', 'kind'],
+          'properties': {'name': {'type': 'string', 'minLength': 2, 'maxLength': 8},
+                         'count': {'type': 'integer', 'minimum': 10, 'maximum': 25, 'multipleOf': 5},
+                         'ratio': {'type': 'number', 'minimum': 0, 'maximum': 1, 'multipleOf': 0.25},
+                         'score': {'type': 'number', 'minimum': -1, 'maximum': 1},
+                         'flag': {'type': 'boolean'},
+                         'kind': {'enum': ['a', 'b', 1]},
+                         'const': {'type': 'string', 'const': 'x'},
+                         'id': {'type': 'string', 'pattern': '^[a-f0-9]{8}$'},
+                         'tags': {'type': 'array', 'items': {'type': 'string'}, 'maxItems': 3},
+                         'nested': {'type': 'object', 'required': ['depth'],
+                                    'properties': {'depth': {'type': 'integer', 'minimum': 0, 'maximum': 3}}}},
+          'additionalProperties': False}
+
+
+@unittest.skipIf(columnar.np is None, "numpy is not installed")
+class TestColumnar(unittest.TestCase):
+    n = 500
+
+    def setUp(self):
+        self.json_gen = JsonGenerator(seed=1)
+
+    def test_documents_are_valid(self):
+        documents = self.json_gen.generate_columns(schema, self.n)
+        self.assertEqual(len(documents), self.n)
+        validator = Draft4Validator(schema)
+        for document in documents:
+            validator.validate(document)
+        self.assertEqual(self.json_gen.stats['validated'], self.n)
+
+    def test_python_types(self):
+        for document in self.json_gen.generate_columns(schema, 50):
+            self.assertIs(type(document['count']), int)
+            self.assertIn(document['kind'], ['a', 'b', 1])
+            if 'flag' in document:
+                self.assertIs(type(document['flag']), bool)
+
+    def test_optional_properties(self):
+        documents = self.json_gen.generate_columns(schema, self.n)
+        for key in ['ratio', 'flag', 'id', 'tags', 'nested']:
+            with self.subTest(key):
+                present = sum(key in document for document in documents)
+                self.assertTrue(0 < present < self.n)
+
+    def test_max_properties(self):
+        bounded = dict(schema, minProperties=4, maxProperties=5)
+        for document in self.json_gen.generate_columns(bounded, self.n):
+            self.assertEqual(len(document), 4)
+
+    def test_columns(self):
+        batch = self.json_gen.generate_columns(schema, self.n, as_columns=True)
+        self.assertIn('/nested/depth', batch.columns)
+        self.assertEqual(len(batch.columns['/count']), self.n)
+        self.assertNotIn('/count', batch.present)
+        self.assertEqual(len(batch.present['/nested/depth']), self.n)
+        self.assertEqual(len(batch.to_documents()), self.n)
+
+    def test_seeded(self):
+        self.assertEqual(JsonGenerator(seed=3).generate_columns(schema, 20),
+                         JsonGenerator(seed=3).generate_columns(schema, 20))
+
+    def test_fallback(self):
+        """schemas that can't be vectorized are generated by the scalar plan"""
+        for fallback in [{'type': 'array', 'items': {'type': 'integer'}},
+                         {'type': 'object', 'additionalProperties': True},
+                         {'type': 'string', 'format': 'date-time'}]:
+            with self.subTest(fallback):
+                documents = self.json_gen.generate_columns(fallback, 10)
+                self.assertEqual(len(documents), 10)
+
+    def test_fallback_limits(self):
+        """the scalar plan is limited by the max_depth and max_nodes of the generator"""
+        tree = {'type': 'object', 'required': ['value'], 'additionalProperties': False,
+                'properties': {'value': {'type': 'integer', 'minimum': 0, 'maximum': 9},
+                               'children': {'type': 'array', 'maxItems': 4, 'items': {'$ref': '#'}}}}
+        json_gen = JsonGenerator(resolver=RefResolver.from_schema(tree), seed=1, max_depth=4, max_nodes=2000)
+        batch = json_gen.generate_columns(tree, 5, as_columns=True)
+        # the fallback is only run for the documents the optional property is present in
+        for value, present in zip(batch.columns['/children'], batch.present['/children'].tolist()):
+            self.assertEqual(value is not None, present)
+        self.assertEqual(len(json_gen.generate_columns(tree, 5)), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
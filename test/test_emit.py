@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+import io
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+import unittest
+
+from jsonschema import RefResolver
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen.emit import JsonWriter
+from jsongen.generator import JsonGenerator
+from jsongen.hca_generator import HCAJsonGenerator
+
+schema = {'type': 'object',
+          'required': ['name', 'tags', 'nested', 'unique'],
+          'additionalProperties': True,
+          'properties': {'name': {'type': 'string'},
+                         'ratio': {'type': 'number'},
+                         'flag': {'type': 'boolean'},
+                         'tags': {'type': 'array', 'items': {'$ref': '#/definitions/tag'}},
+                         'nested': {'type': 'object', 'additionalProperties': False,
+                                    'properties': {'either': {'anyOf': [{'type': 'integer'}, {'type': 'array'}]},
+                                                   'fixed': {'enum': [{'a': [1, 2]}, None]}},
+                                    'patternProperties': {'^p[0-9]{4}$': {'type': 'object'}}},
+                         'unique': {'type': 'array', 'uniqueItems': True, 'minItems': 2,
+                                    'items': {'type': 'object', 'required': ['q'],
+                                              'properties': {'q': {'type': 'integer', 'minimum': 0,
+                                                                   'maximum': 9}}}}},
+          'definitions': {'tag': {'type': 'object', 'required': ['label'],
+                                  'properties': {'label': {'type': 'string', 'pattern': '^[a-z]{3}$'},
+                                                 'created': {'type': 'string', 'format': 'date-time'}}}}}
+
+log_schema = {'type': 'object', 'required': ['lines'],
+              'properties': {'lines': {'type': 'array',
+                                       'items': {'type': 'object', 'required': ['time', 'message'],
+                                                 'properties': {'time': {'type': 'string', 'format': 'date-time'},
+                                                                'message': {'type': 'string'}}}}}}
+
+
+class TestJsonWriter(unittest.TestCase):
+
+    def test_tokens(self):
+        stream = io.BytesIO()
+        out = JsonWriter(stream, buffer_size=4)
+        out.begin('{')
+        out.key('a')
+        out.begin('[')
+        out.value(1)
+        out.value('é"')
+        out.begin('{')
+        out.end('}')
+        out.value(None)
+        out.end(']')
+        out.key('b')
+        out.value({'c': 1.5, 'd': True})
+        out.end('}')
+        out.flush()
+        expected = json.dumps({'a': [1, 'é"', {}, None], 'b': {'c': 1.5, 'd': True}}).encode('ascii')
+        self.assertEqual(stream.getvalue(), expected)
+        self.assertEqual(out.position, len(expected))
+
+
+class TestEmit(unittest.TestCase):
+    repeat = 50
+
+    def emit(self, json_gen, schema, target_bytes=None):
+        stream = io.BytesIO()
+        size = json_gen.emit_json(schema, stream, target_bytes)
+        self.assertEqual(size, len(stream.getvalue()))
+        return stream.getvalue()
+
+    def test_same_as_dumps(self):
+        for target_bytes in (None, 5000):
+            for validation in ('never', 'always'):
+                with self.subTest(target_bytes=target_bytes, validation=validation):
+                    json_gen = JsonGenerator(resolver=RefResolver.from_schema(schema), validation=validation)
+                    for seed in range(self.repeat):
+                        json_gen._seed(seed)
+                        expected = json.dumps(json_gen.generate_json(schema, target_bytes)).encode('ascii')
+                        json_gen._seed(seed)
+                        self.assertEqual(self.emit(json_gen, schema, target_bytes), expected)
+                    self.assertEqual(json_gen.stats['documents'], 2 * self.repeat)
+
+    def test_duplicate_keys(self):
+        # four keys for up to four pattern properties, so keys are often drawn twice
+        colliding = {'type': 'object', 'minProperties': 2, 'maxProperties': 4,
+                     'patternProperties': {'^[a-d]$': {'type': 'integer', 'minimum': 0, 'maximum': 9}}}
+        json_gen = JsonGenerator(validation='never')
+        for seed in range(self.repeat):
+            json_gen._seed(seed)
+            expected = json_gen.generate_json(colliding)
+            json_gen._seed(seed)
+            emitted = self.emit(json_gen, colliding)
+            self.assertEqual(emitted, json.dumps(expected).encode('ascii'))
+            pairs = json.loads(emitted, object_pairs_hook=lambda pairs: pairs)
+            self.assertEqual(len(pairs), len({key for key, _ in pairs}))
+            self.assertGreaterEqual(len(pairs), 2)
+        # declared properties can be drawn after a pattern property took their key
+        overlapping = {'type': 'object', 'minProperties': 2, 'maxProperties': 4,
+                       'properties': {'a': {'type': 'string', 'enum': ['x']}, 'b': {'type': 'boolean'}},
+                       'patternProperties': {'^[ab]$': {'type': 'integer', 'minimum': 0, 'maximum': 9}}}
+        for target_bytes in (None, 100):
+            for seed in range(self.repeat):
+                json_gen._seed(seed)
+                expected = json_gen.generate_json(overlapping, target_bytes)
+                json_gen._seed(seed)
+                self.assertEqual(self.emit(json_gen, overlapping, target_bytes), json.dumps(expected).encode('ascii'))
+        # an object whose keys run out stops adding pattern properties instead of looping
+        self.assertEqual(json_gen.generate_json({'type': 'object', 'minProperties': 3,
+                                                 'patternProperties': {'^a$': {'type': 'boolean'}}}).keys(), {'a'})
+
+    def test_profile(self):
+        json_gen = JsonGenerator(resolver=RefResolver.from_schema(schema), validation='never', profile=True)
+        for seed in range(self.repeat):
+            json.loads(self.emit(json_gen, schema))
+        self.assertEqual(json_gen.profiler.paths['#'].calls, self.repeat)
+        self.assertGreater(json_gen.profiler.paths['#'].bytes, 0)
+
+    def test_constant_memory(self):
+        json_gen = JsonGenerator(validation='never', backend='fast')
+        peaks = {}
+        for target_bytes in (10 ** 6, 10 ** 7):
+            tracemalloc.start()
+            try:
+                with tempfile.TemporaryFile() as stream:
+                    self.assertAlmostEqual(json_gen.emit_json(log_schema, stream, target_bytes), target_bytes,
+                                           delta=target_bytes * 0.01)
+                peaks[target_bytes] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        self.assertLess(peaks[10 ** 7], 2 * peaks[10 ** 6])
+        self.assertLess(peaks[10 ** 7], 10 ** 6)
+
+
+class TestHCAEmit(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        with open(os.path.join(self.directory.name, 'log.json'), 'w') as fp:
+            json.dump(log_schema, fp)
+        self.urls = ['file://' + os.path.join(self.directory.name, 'log.json')]
+
+    def test_emit(self):
+        faker, expected = HCAJsonGenerator(self.urls, seed=3), HCAJsonGenerator(self.urls, seed=3)
+        for target_bytes in (None, '10KB'):
+            stream = io.BytesIO()
+            self.assertEqual(faker.emit(stream, target_bytes=target_bytes), len(stream.getvalue()))
+            self.assertEqual(stream.getvalue().decode('ascii'), expected.generate(target_bytes=target_bytes))
+            stream = io.BytesIO()
+            faker.emit_at(stream, 4, 7, 'log.json', target_bytes)
+            self.assertEqual(stream.getvalue().decode('ascii'), expected.generate_at(4, 7, 'log.json', target_bytes))
+        for count in ('documents', 'validated', 'invalid'):
+            self.assertEqual(faker.stats[count], expected.stats[count])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+import unittest
+from math import inf
+
+from jsonschema import RefResolver
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen import plan
+from jsongen.estimate import UNKNOWN_PROVIDER, Estimate, estimate
+from jsongen.generator import JsonGenerator
+
+schema = {'type': 'object',
+          'required': ['name', 'tags', 'nested'],
+          'properties': {'name': {'type': 'string', 'maxLength': 20},
+                         'ratio': {'type': 'number'},
+                         'flag': {'type': 'boolean'},
+                         'tags': {'type': 'array', 'maxItems': 8, 'items': {'$ref': '#/definitions/tag'}},
+                         'nested': {'type': 'object', 'additionalProperties': False,
+                                    'properties': {'either': {'anyOf': [{'type': 'integer'}, {'type': 'array'}]},
+                                                   'fixed': {'enum': [{'a': [1, 2]}, None]}},
+                                    'patternProperties': {'^p[0-9]{4}$': {'type': 'object'}}},
+                         'unique': {'type': 'array', 'uniqueItems': True, 'maxItems': 4,
+                                    'items': {'type': 'integer', 'minimum': 0, 'maximum': 99}}},
+          'definitions': {'tag': {'type': 'object', 'required': ['label'],
+                                  'properties': {'label': {'type': 'string', 'pattern': '^[a-z]{3}$'},
+                                                 'created': {'type': 'string', 'format': 'date-time'}}}}}
+tree_schema = {'type': 'object', 'required': ['value'],
+               'properties': {'value': {'type': 'integer', 'minimum': 0, 'maximum': 9},
+                              'children': {'type': 'array', 'maxItems': 3, 'items': {'$ref': '#'}}}}
+
+
+def count(value):
+    if isinstance(value, dict):
+        return 1 + sum(count(item) for item in value.values())
+    if isinstance(value, list):
+        return 1 + sum(count(item) for item in value)
+    return 1
+
+
+class TestEstimate(unittest.TestCase):
+    repeat = 2000
+
+    def check(self, json_gen, schema, estimate):
+        documents = [json_gen.generate_json(schema) for _ in range(self.repeat)]
+        nodes = [count(document) for document in documents]
+        sizes = [len(json.dumps(document)) for document in documents]
+        document = estimate.document
+        self.assertAlmostEqual(sum(nodes) / self.repeat, document.nodes, delta=document.nodes * 0.1)
+        self.assertAlmostEqual(sum(sizes) / self.repeat, document.bytes, delta=document.bytes * 0.1)
+        self.assertLessEqual(max(nodes), document.max_nodes)
+        self.assertLessEqual(max(sizes), document.max_bytes)
+
+    def test_expected(self):
+        for backend in ('faker', 'fast'):
+            with self.subTest(backend=backend):
+                json_gen = JsonGenerator(resolver=RefResolver.from_schema(schema), validation='never', seed=0,
+                                         backend=backend)
+                estimate = json_gen.estimate(schema)
+                self.assertIsInstance(estimate, Estimate)
+                self.check(json_gen, schema, estimate)
+                self.assertEqual(estimate.paths['#'].calls, 1)
+                self.assertEqual(estimate.paths['#/properties/name'].max_bytes, 22)
+                self.assertEqual(estimate.paths['#/definitions/tag/properties/label'].bytes, 5)
+                # a referenced schema is estimated where it is referenced and where it is defined
+                self.assertEqual(estimate.paths['#/definitions/tag'].calls,
+                                 estimate.paths['#/properties/tags/items'].calls)
+                self.assertEqual(estimate.flagged, {'#/properties/nested': ['unbounded']})
+
+    def test_leaves_generation_alone(self):
+        resolver = RefResolver.from_schema(schema)
+        expected = JsonGenerator(resolver=resolver, seed=1).generate_json(schema)
+        json_gen = JsonGenerator(resolver=resolver, seed=1)
+        json_gen.estimate(schema)
+        self.assertEqual(json_gen.stats['documents'], 0)
+        self.assertEqual(json_gen.generate_json(schema), expected)
+        self.assertIsNone(json_gen.profiler)
+
+    def test_costs(self):
+        json_gen = JsonGenerator(validation='never')
+        fast = JsonGenerator(validation='never', backend='fast')
+        formatted = {'type': 'string', 'format': 'email'}
+        self.assertGreater(json_gen.estimate(formatted).document.cost, 10 * fast.estimate(formatted).document.cost)
+        pooled = JsonGenerator(validation='never', pools=4)
+        self.assertGreater(json_gen.estimate(formatted).document.cost, 10 * pooled.estimate(formatted).document.cost)
+        self.assertEqual(json_gen.estimate(formatted).document.bytes, pooled.estimate(formatted).document.bytes)
+
+    def test_providers(self):
+        plain = {'type': 'integer', 'minimum': 0, 'maximum': 10 ** 6}
+        multiples = {'type': 'integer', 'minimum': 0, 'maximum': 10 ** 6, 'multipleOf': 1000}
+        fast = JsonGenerator(validation='never', backend='fast')
+        self.assertEqual(fast.estimate(multiples).document.max_bytes, 7)
+        self.assertEqual(fast.estimate(multiples).document.cost, fast.estimate(plain).document.cost)
+        self.assertLess(fast.estimate(plain).document.cost, JsonGenerator().estimate(plain).document.cost)
+        # leaves are recognized by their provider, not by the name of their function
+        random_int = fast.provider.random_int
+        text = estimate(plan.Leaf(lambda a, b: 'x' * 40, 0, 10 ** 6), {})
+        self.assertEqual(text.document.bytes, UNKNOWN_PROVIDER[1])
+        self.assertEqual(estimate(plan.Leaf(lambda a, b: random_int(a, b), 0, 1), {}).document.bytes,
+                         UNKNOWN_PROVIDER[1])
+        self.assertEqual(estimate(plan.Leaf(random_int, 0, 10 ** 6), {}).document.max_bytes, 7)
+
+    def test_recursive(self):
+        json_gen = JsonGenerator(resolver=RefResolver.from_schema(tree_schema), validation='never', seed=0,
+                                 max_depth=4)
+        estimate = json_gen.estimate(tree_schema)
+        self.check(json_gen, tree_schema, estimate)
+        self.assertEqual(estimate.flagged['#/properties/children/items'], ['recursive'])
+        self.assertGreater(estimate.paths['#'].calls, 1)
+
+        unbounded = JsonGenerator(resolver=RefResolver.from_schema(tree_schema), max_depth=None).estimate(tree_schema)
+        self.assertEqual(unbounded.document.max_nodes, inf)
+        self.assertIn('recursive', unbounded.document.flags)
+        self.assertIsNone(json.loads(unbounded.to_json())['#']['max_nodes'])
+
+    def test_explosive(self):
+        nested = {'type': 'integer'}
+        for i in range(4):
+            nested = {'type': 'array', 'maxItems': 101, 'items': nested}
+        estimate = JsonGenerator(validation='never').estimate(nested)
+        self.assertEqual(estimate.flagged, {'#/items': ['explosive']})
+        self.assertEqual(estimate.document.max_nodes, 1 + 100 + 100 ** 2 + 100 ** 3 + 100 ** 4)
+        self.assertEqual(JsonGenerator().estimate(nested, explosive=10 ** 9).flagged, {})
+
+    def test_unbounded(self):
+        unbounded = {'type': 'object', 'required': ['text', 'items', 'patterns'],
+                     'properties': {'text': {'type': 'string'},
+                                    'items': {'type': 'array', 'items': {'type': 'boolean'}},
+                                    'patterns': {'type': 'object', 'patternProperties': {'^x[0-9]{4}$': {}}},
+                                    'declared': {'type': 'object', 'properties': {'a': {'type': 'integer'}}}}}
+        estimate = JsonGenerator().estimate(unbounded)
+        self.assertEqual(estimate.flagged, {'#/properties/text': ['unbounded'], '#/properties/items': ['unbounded'],
+                                            '#/properties/patterns': ['unbounded']})
+
+    def test_table(self):
+        estimate = JsonGenerator(resolver=RefResolver.from_schema(schema)).estimate(schema)
+        lines = estimate.table(sort_by='bytes', limit=3).splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith('# '))
+        self.assertIn('cost %', lines[0])
+        with self.assertRaises(ValueError):
+            estimate.table(sort_by='time')
+        self.assertEqual(set(json.loads(estimate.to_json())), set(estimate.paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import datetime
+import os
+import random
+import sys
+import unittest
+import uuid
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+import test_jsongenerator
+from jsongen.fast import FastProvider
+from jsongen.generator import JsonGenerator
+
+
+class FastBase(object):
+    def setUp(self):
+        self.json_gen = JsonGenerator(backend='fast')
+
+
+# The schema guarantees tested for the Faker backend hold for the fast backend
+class TestFastNumber(FastBase, test_jsongenerator.TestNumber):
+    pass
+
+
+class TestFastInteger(FastBase, test_jsongenerator.TestInteger):
+    pass
+
+
+class TestFastString(FastBase, test_jsongenerator.TestString):
+    pass
+
+
+class TestFastArray(FastBase, test_jsongenerator.TestArray):
+    pass
+
+
+class TestFastObject(FastBase, test_jsongenerator.TestObject):
+    pass
+
+
+class TestFastProvider(unittest.TestCase):
+    repeat = 1000
+
+    def setUp(self):
+        self.provider = FastProvider(random.Random(0))
+
+    def test_random_int(self):
+        values = {self.provider.random_int(-2, 2) for i in range(self.repeat)}
+        self.assertEqual(values, {-2, -1, 0, 1, 2})
+        # ranges wider than the 53 bits of a float still reach every integer
+        large = [self.provider.random_int(0, 2 ** 64) for i in range(100)]
+        self.assertTrue(any(value % 2 for value in large))
+        self.assertTrue(all(0 <= value <= 2 ** 64 for value in large))
+
+    def test_pystr(self):
+        lengths = set()
+        for i in range(self.repeat):
+            value = self.provider.pystr(3, 6)
+            self.assertTrue(value.isalpha() and value.isascii())
+            lengths.add(len(value))
+        self.assertEqual(lengths, {3, 4, 5, 6})
+        self.assertEqual(len(self.provider.pystr(max_chars=5000)), 5000)
+
+    def test_uuid4(self):
+        value = self.provider.uuid4()
+        self.assertEqual(str(uuid.UUID(value)), value)
+        self.assertEqual(uuid.UUID(value).version, 4)
+        self.assertEqual(uuid.UUID(value).variant, uuid.RFC_4122)
+
+    def test_formats(self):
+        datetime.datetime.strptime(self.provider.iso8601(), '%Y-%m-%dT%H:%M:%S')
+        datetime.datetime.strptime(self.provider.date(), '%Y-%m-%d')
+        datetime.datetime.strptime(self.provider.time(), '%H:%M:%S')
+        self.assertRegex(self.provider.email(), r'^[a-z]+@[a-z]+\.[a-z]+$')
+
+    def test_reset(self):
+        """after reseeding and reset the provider repeats itself"""
+        rng = random.Random(1)
+        provider = FastProvider(rng)
+        expected = [provider.pystr(1, 10) for i in range(10)]
+        rng.seed(1)
+        provider.reset()
+        self.assertEqual([provider.pystr(1, 10) for i in range(10)], expected)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            JsonGenerator(backend='slow')
+
+    def test_generate_json(self):
+        json_gen = JsonGenerator(backend='fast', seed=3)
+        for i in range(100):
+            json_gen.generate_json(test_jsongenerator.TestCompile.schema['definitions']['person'])
+        self.assertEqual(json_gen.generate_at(test_jsongenerator.simple_object, 4, 1),
+                         JsonGenerator(backend='fast').generate_at(test_jsongenerator.simple_object, 4, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,11 +3,19 @@
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
 import unittest
+from collections import Counter
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
 pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
 sys.path.insert(0, pkg_root)  # noqa
 
+from jsongen import plan
 from jsongen.hca_generator import HCAJsonGenerator
 
 schema_urls = [
@@ -41,6 +49,185 @@ class TestHCAGenerator(unittest.TestCase):
                     self.assertIsInstance(json.loads(fake_json), dict)
                     self.assertEqual(name, self.faker.last_name)
 
+    def test_generate_parallel(self):
+        expected = list(self.faker.generate_parallel(n=8, workers=1, seed=3))
+        self.assertEqual(list(self.faker.generate_parallel(n=8, workers=2, seed=3)), expected)
+        for fake_json in expected:
+            self.assertIsInstance(json.loads(fake_json), dict)
+
+
+class TestResolvedCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.write('item.json', {'type': 'integer', 'minimum': 1, 'maximum': 1})
+        self.write('bundle.json', {'type': 'object', 'required': ['item'],
+                                   'properties': {'item': {'$ref': self.url('item.json')}}})
+        self.faker = HCAJsonGenerator([self.url('bundle.json')], seed=0)
+
+    def url(self, file_name):
+        return 'file://' + os.path.join(self.directory.name, file_name)
+
+    def write(self, file_name, schema):
+        with open(os.path.join(self.directory.name, file_name), 'w') as fp:
+            json.dump(schema, fp)
+
+    def test_resolved_once(self):
+        with mock.patch.object(self.faker.resolver, 'resolve', wraps=self.faker.resolver.resolve) as resolve:
+            for i in range(5):
+                self.assertEqual(json.loads(self.faker.generate('bundle.json')), {'bundle.json': {'item': 1}})
+        self.assertEqual(resolve.call_count, 2)
+        self.assertEqual(self.faker.schemas['bundle.json'], {'$ref': self.url('bundle.json'),
+                                                             'id': self.url('bundle.json')})
+
+    def test_return_type(self):
+        expected = {'bundle.json': {'item': 1}}
+        for return_type, serializer in [('dict', 'json'), ('str', 'json'), ('bytes', 'json'), ('bytes', 'auto')]:
+            with self.subTest(return_type=return_type, serializer=serializer):
+                faker = HCAJsonGenerator([self.url('bundle.json')], return_type=return_type, serializer=serializer)
+                documents = [faker.generate(), faker.generate_at(0, 1)] + list(faker.generate_parallel(n=2, workers=1))
+                for document in documents:
+                    self.assertIsInstance(document, {'dict': dict, 'str': str, 'bytes': bytes}[return_type])
+                    self.assertEqual(document if return_type == 'dict' else json.loads(document), expected)
+                self.assertGreater(faker.stats['generation_time'], 0)
+                self.assertEqual(faker.stats['serialization_time'] > 0, return_type != 'dict')
+        with self.assertRaises(ValueError):
+            HCAJsonGenerator([self.url('bundle.json')], return_type='list')
+        # documents are serialized like json.dumps unless another serializer is asked for
+        faker = HCAJsonGenerator([self.url('bundle.json')])
+        self.assertEqual(faker.generate(), json.dumps(expected))
+
+    def test_generate_parallel(self):
+        self.write('other.json', {'type': 'object', 'properties': {'item': {'$ref': self.url('item.json')},
+                                                                   'text': {'type': 'string'}}})
+        urls = [self.url('bundle.json'), self.url('other.json')]
+        expected = HCAJsonGenerator(urls, validation='sample(0.5)')
+        documents = list(expected.generate_parallel(n=40, workers=1, seed=3))
+        for workers, chunk_size in [(2, None), (3, 4)]:
+            with self.subTest(workers=workers, chunk_size=chunk_size):
+                faker = HCAJsonGenerator(urls, validation='sample(0.5)')
+                self.assertEqual(list(faker.generate_parallel(n=40, workers=workers, seed=3, chunk_size=chunk_size)),
+                                 documents)
+                for count in ('documents', 'validated'):
+                    self.assertEqual(faker.stats[count], expected.stats[count])
+        first = HCAJsonGenerator(urls, validation='first(3)')
+        list(first.generate_parallel(n=40, workers=2, seed=3, chunk_size=5))
+        self.assertEqual((first.stats['documents'], first.stats['validated']), (40, 3))
+
+    def test_estimate(self):
+        estimate = self.faker.estimate('bundle.json')
+        self.assertEqual((estimate.document.nodes, estimate.document.max_nodes), (2, 2))
+        self.assertEqual(estimate.document.bytes, len(json.dumps({'item': 1})))
+        self.assertEqual(self.faker.stats['documents'], 0)
+
+    def test_cached_by_url(self):
+        self.assertIs(self.faker.resolved_schema('bundle.json'), self.faker.resolved_schema('bundle.json'))
+        self.assertIn(self.url('bundle.json'), self.faker._resolved)
+
+    def test_invalidate(self):
+        self.faker.generate('bundle.json')
+        self.write('item.json', {'type': 'integer', 'minimum': 2, 'maximum': 2})
+        self.assertEqual(json.loads(self.faker.generate('bundle.json')), {'bundle.json': {'item': 1}})
+        self.faker.invalidate()
+        self.write('bundle.json', {'type': 'object', 'required': ['item'],
+                                   'properties': {'item': {'$ref': self.url('item.json')}}})
+        self.assertEqual(json.loads(self.faker.generate('bundle.json')), {'bundle.json': {'item': 2}})
+
+    def test_shared_nodes(self):
+        self.write('list.json', {'type': 'array', 'minItems': 1, 'items': {'$ref': self.url('item.json')}})
+        self.write('other.json', {'type': 'object', 'required': ['items', 'item'],
+                                  'properties': {'items': {'$ref': self.url('list.json')},
+                                                 'item': {'$ref': self.url('item.json')}}})
+        faker = HCAJsonGenerator([self.url('bundle.json'), self.url('other.json')], seed=0)
+        bundle, other = faker.resolved_schema('bundle.json'), faker.resolved_schema('other.json')
+        item = bundle['properties']['item']
+        self.assertEqual(item, {'type': 'integer', 'minimum': 1, 'maximum': 1, 'id': self.url('item.json')})
+        self.assertIs(other['properties']['item'], item)
+        self.assertIs(other['properties']['items']['items'], item)
+        self.assertNotIn('id', faker.resolver.store[self.url('item.json')])
+        self.assertEqual(json.loads(faker.generate('other.json'))['other.json']['item'], 1)
+
+    def test_cycle(self):
+        self.write('tree.json', {'type': 'object', 'additionalProperties': False, 'maxProperties': 1,
+                                 'properties': {'leaf': {'type': 'integer'},
+                                                'child': {'$ref': self.url('tree.json')}}})
+        faker = HCAJsonGenerator([self.url('tree.json')], seed=0)
+        tree = faker.resolved_schema('tree.json')
+        self.assertEqual(tree['properties']['child'], {'$ref': self.url('tree.json')})
+        for i in range(20):
+            self.assertIsInstance(json.loads(faker.generate('tree.json'))['tree.json'], dict)
+
+    def test_target_bytes(self):
+        self.write('log.json', {'type': 'object', 'required': ['lines'],
+                                'properties': {'lines': {'type': 'array', 'items': {'type': 'string'}}}})
+        faker = HCAJsonGenerator([self.url('log.json')], seed=0)
+        for target in (2000, '50KB'):
+            # the target includes the name of the schema the document is wrapped in
+            self.assertAlmostEqual(len(faker.generate('log.json', target)), plan.parse_size(target),
+                                   delta=plan.parse_size(target) * 0.05)
+        self.assertEqual(faker.stats['invalid'], 0)
+
+
+class _CountingHandler(SimpleHTTPRequestHandler):
+    lock = threading.Lock()
+
+    def do_GET(self):
+        server = self.server
+        with self.lock:
+            server.requests[self.path] += 1
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            time.sleep(0.05)
+            super().do_GET()
+        finally:
+            with self.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestPrefetch(unittest.TestCase):
+    schemas = {
+        'bundle.json': {'type': 'object', 'required': ['a', 'b'],
+                        'properties': {'a': {'$ref': '{base}/a.json'}, 'b': {'$ref': '{base}/b.json'}}},
+        'a.json': {'type': 'object', 'required': ['c'], 'properties': {'c': {'$ref': '{base}/c.json'}}},
+        'b.json': {'type': 'array', 'minItems': 1, 'maxItems': 2, 'items': {'$ref': '{base}/c.json'}},
+        'c.json': {'type': 'object', 'required': ['d'],
+                   'properties': {'d': {'$ref': '{base}/definitions.json#/definitions/d'}}},
+        'definitions.json': {'definitions': {'d': {'type': 'integer', 'minimum': 3, 'maximum': 3}}},
+        'other.json': {'$ref': 'c.json'},
+    }
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_CountingHandler, directory=directory.name))
+        self.server.requests = Counter()
+        self.server.active = self.server.peak = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        for file_name, schema in self.schemas.items():
+            with open(os.path.join(directory.name, file_name), 'w') as fp:
+                fp.write(json.dumps(schema).replace('{base}', self.base))
+
+    def test_prefetch(self):
+        faker = HCAJsonGenerator([self.base + '/bundle.json', self.base + '/other.json'])
+        fetched = faker.prefetch(max_workers=2)
+        expected = {'/bundle.json', '/a.json', '/b.json', '/c.json', '/definitions.json', '/other.json'}
+        self.assertEqual(fetched, {self.base + path for path in expected})
+        self.assertEqual(self.server.requests, Counter({path: 1 for path in expected}))
+        self.assertLessEqual(self.server.peak, 2)
+
+        document = json.loads(faker.generate('bundle.json'))
+        self.assertEqual(document['bundle.json']['a'], {'c': {'d': 3}})
+        self.assertEqual(self.server.requests, Counter({path: 1 for path in expected}))
+        self.assertEqual(faker.prefetch(), set())
+
 
 if __name__ == "__main__":
     unittest.main()
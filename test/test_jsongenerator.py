@@ -2,17 +2,21 @@
 
 import json
 import os
+import random
 import sys
 import unittest
-from typing import Callable, Any, Dict, Union, Tuple
+from unittest import mock
+from typing import Any, Dict, Union, Tuple
 
 from faker import Faker
-from jsonschema import Draft4Validator
+from jsonschema import Draft4Validator, RefResolver, SchemaError
 
 pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
 sys.path.insert(0, pkg_root)  # noqa
 
-from jsongen.generator import JsonGenerator
+from jsongen import plan
+from jsongen.generator import JsonGenerator, _update, _symmetric_difference, _remove
+from jsongen.unique import item_domain
 
 type_mapping = {'string': str,
                 'object': dict,
@@ -227,19 +231,23 @@ class Base(unittest.TestCase):
     def setUp(self):
         self.json_gen = JsonGenerator()
 
-    def _test_common(self, func: Callable[[dict], Any], jtype: str, enums: list=None, const: Any=None):
+    def generate(self, schema: dict) -> Any:
+        """Generates a value with the compiled plan generate_json runs, without checking the schema or the value."""
+        return self.json_gen.compile(schema)()
+
+    def _test_common(self, jtype: str, enums: list=None, const: Any=None):
         with self.subTest(f"with only 'type: {jtype}' in schema"):
-            self.assertTrue(isinstance(func({'type': jtype}), type_mapping[jtype]),
-                            msg=f"{func.__name__} did not return type {type_mapping[jtype]}.")
+            self.assertTrue(isinstance(self.generate({'type': jtype}), type_mapping[jtype]),
+                            msg=f"{jtype} schema did not generate type {type_mapping[jtype]}.")
 
         if const and enums:
             with self.subTest("test constant take precedence over enum"):
-                self.assertEqual(func({'type': jtype, 'enum': enums, 'const': const}), const)
+                self.assertEqual(self.generate({'type': jtype, 'enum': enums, 'const': const}), const)
 
         if enums:
             with self.subTest("test enum value are used"):
                 for i in range(len(enums)):
-                    self.assertIn(func({'type': jtype, 'enum': enums}), enums)
+                    self.assertIn(self.generate({'type': jtype, 'enum': enums}), enums)
 
 
 class TestNumber(Base):
@@ -248,27 +256,27 @@ class TestNumber(Base):
     invalid_multiple_ofs = [0, -2]
 
     def test_common(self):
-        self._test_common(self.json_gen._number, 'number', self.numbers, 0.999)
+        self._test_common('number', self.numbers, 0.999)
 
     def test_inclusive_range(self):
         for minimum in self.numbers:
             with self.subTest(f"does not exceed minimum of {minimum}"):
                 schema = {'type': 'number', 'minimum': minimum}
                 for i in range(self.repeat):
-                    self.assertGreaterEqual(self.json_gen._number(schema), minimum)
+                    self.assertGreaterEqual(self.generate(schema), minimum)
 
         for maximum in self.numbers:
             with self.subTest(f"does not exceed maximum of {maximum}"):
                 schema = {'type': 'number', 'maximum': maximum}
                 for i in range(self.repeat):
-                    self.assertLessEqual(self.json_gen._number(schema), maximum)
+                    self.assertLessEqual(self.generate(schema), maximum)
 
         with self.subTest("minimum == maximum"):
             maximum = 1.0
             minimum = 1.0
             schema = {'type': 'number', 'minimum': minimum, 'maximum': maximum}
             for i in range(self.repeat):
-                value = self.json_gen._number(schema)
+                value = self.generate(schema)
                 self.assertEqual(value, 1.0)
 
         with self.subTest("does not exceed minimum or maximum"):
@@ -276,7 +284,7 @@ class TestNumber(Base):
             minimum = -1.0
             schema = {'type': 'number', 'minimum': minimum, 'maximum': maximum}
             for i in range(self.repeat):
-                value = self.json_gen._number(schema)
+                value = self.generate(schema)
                 self.assertLessEqual(value, maximum)
                 self.assertGreaterEqual(value, minimum)
 
@@ -285,14 +293,14 @@ class TestNumber(Base):
             with self.subTest(f"is a multiple of {multiple_of}"):
                 schema = {'type': 'number', 'multipleOf': multiple_of}
                 for i in range(self.repeat):
-                    value = self.json_gen._number(schema)
+                    value = self.generate(schema)
                     self.assertTrue(round(value / multiple_of, 3).is_integer(), msg=f"value:{value} is not a "
                                                                                     f"multipleOf:{multiple_of}.")
         for multiple_of in self.invalid_multiple_ofs:
             with self.subTest(f"is a multiple of {multiple_of}"):
                 schema = {'type': 'number', 'multipleOf': multiple_of}
                 with self.assertRaises(ValueError):
-                    self.json_gen._number(schema)
+                    self.generate(schema)
 
     def test_multiple_of_in_inclusive_range(self):
         maximum = 10.0
@@ -301,7 +309,7 @@ class TestNumber(Base):
             with self.subTest(f"is a multiple of {multiple_of} and within boundaries"):
                 schema = {'type': 'number', 'minimum': minimum, 'maximum': maximum, 'multipleOf': multiple_of}
                 for i in range(self.repeat):
-                    value = self.json_gen._number(schema)
+                    value = self.generate(schema)
                     v = round(value / multiple_of, 3)
                     self.assertLessEqual(value, maximum)
                     self.assertGreaterEqual(value, minimum)
@@ -314,7 +322,7 @@ class TestNumber(Base):
             minimum = 1.0
             schema = {'type': 'number', 'exclusiveMinimum': minimum, 'exclusiveMaximum': maximum}
             for i in range(self.repeat):
-                value = self.json_gen._number(schema)
+                value = self.generate(schema)
                 self.assertLess(value, maximum)
                 self.assertGreater(value, minimum)
 
@@ -324,33 +332,33 @@ class TestNumber(Base):
                 minimum = 1.0
                 schema = {'type': 'number', 'exclusiveMinimum': minimum, 'exclusiveMaximum': maximum}
                 for i in range(self.repeat):
-                    value = self.json_gen._number(schema)
+                    value = self.generate(schema)
                     self.assertEqual(value, 1.0)
 
 
 class TestInteger(Base):
 
     def test_common(self):
-        self._test_common(self.json_gen._integer, 'integer', [1, 2], 999)
+        self._test_common('integer', [1, 2], 999)
 
     def test_inclusive_range(self):
         minimum = 1
         with self.subTest(f"does not exceed minimum of {minimum}"):
             schema = {'type': 'integer', 'minimum': minimum}
             for i in range(self.repeat):
-                self.assertGreaterEqual(self.json_gen._integer(schema), minimum)
+                self.assertGreaterEqual(self.generate(schema), minimum)
 
         maximum = 10
         with self.subTest(f"does not exceed maximum of {maximum}"):
 
             schema = {'type': 'integer', 'maximum': maximum}
             for i in range(self.repeat):
-                self.assertLessEqual(self.json_gen._integer(schema), maximum)
+                self.assertLessEqual(self.generate(schema), maximum)
 
         with self.subTest("does not exceed minimum or maximum"):
             schema = {'type': 'integer', 'minimum': minimum, 'maximum': maximum}
             for i in range(self.repeat):
-                value = self.json_gen._integer(schema)
+                value = self.generate(schema)
                 self.assertLessEqual(value, maximum)
                 self.assertGreaterEqual(value, minimum)
 
@@ -358,7 +366,7 @@ class TestInteger(Base):
             maximum = 1
             schema = {'type': 'integer', 'minimum': minimum, 'maximum': maximum}
             for i in range(self.repeat):
-                value = self.json_gen._integer(schema)
+                value = self.generate(schema)
                 self.assertEqual(value, 1)
 
     def test_multiple_of(self):
@@ -367,14 +375,14 @@ class TestInteger(Base):
             with self.subTest(f"is a multiple of {multiple_of}"):
                 schema = {'type': 'integer', 'multipleOf': multiple_of}
                 for i in range(self.repeat):
-                    self.assertFalse(self.json_gen._integer(schema) % multiple_of)
+                    self.assertFalse(self.generate(schema) % multiple_of)
 
         invalid_multiple_ofs = [0, -2]
         for multiple_of in invalid_multiple_ofs:
             with self.subTest(f"is a multiple of {multiple_of}"):
                 schema = {'type': 'number', 'multipleOf': multiple_of}
                 with self.assertRaises(ValueError):
-                    self.json_gen._integer(schema)
+                    self.generate(schema)
 
     def test_multiple_of_in_range(self):
         """is a multiple of and within boundaries"""
@@ -383,7 +391,7 @@ class TestInteger(Base):
         minimum = 10
         schema = {'type': 'integer', 'minimum': minimum, 'maximum': maximum, 'multipleOf': multiple_of}
         for i in range(self.repeat):
-            value = self.json_gen._integer(schema)
+            value = self.generate(schema)
             self.assertLessEqual(value, maximum)
             self.assertGreaterEqual(value, minimum)
             self.assertFalse(value % multiple_of)
@@ -394,7 +402,7 @@ class TestInteger(Base):
         minimum = 1
         schema = {'type': 'integer', 'exclusiveMinimum': minimum, 'exclusiveMaximum': maximum}
         for i in range(self.repeat):
-            value = self.json_gen._integer(schema)
+            value = self.generate(schema)
             self.assertEqual(value, 2)
 
 
@@ -407,25 +415,25 @@ class TestString(Base):
               }
 
     def test_common(self):
-        self._test_common(self.json_gen._string, 'string', ['abcd', 'ferwvtg', 'c2452642@$%^@  grg56y7'], 'hello')
+        self._test_common('string', ['abcd', 'ferwvtg', 'c2452642@$%^@  grg56y7'], 'hello')
 
     def test_minLength(self):
         """does not exceed minLength"""
         schema = {'type': 'string', 'minLength': self.minimum}
         for i in range(self.repeat):
-            self.assertGreaterEqual(len(self.json_gen._string(schema)), self.minimum)
+            self.assertGreaterEqual(len(self.generate(schema)), self.minimum)
 
     def test_maxLength(self):
         """does not exceed maxLength"""
         schema = {'type': 'string', 'maxLength': self.maximum}
         for i in range(self.repeat):
-            self.assertLessEqual(len(self.json_gen._string(schema)), self.maximum)
+            self.assertLessEqual(len(self.generate(schema)), self.maximum)
 
     def test_range(self):
         """does not exceed maxLength or minLength"""
         schema = {'type': 'string', 'maxLength': self.maximum, 'minLength': self.minimum}
         for i in range(self.repeat):
-            value = self.json_gen._string(schema)
+            value = self.generate(schema)
             msg = f"{value} exceed range({self.minimum},{self.maximum})"
             self.assertLessEqual(len(value), self.maximum, msg=msg)
             self.assertGreaterEqual(len(value), self.minimum, msg=msg)
@@ -436,7 +444,7 @@ class TestString(Base):
         minimum = 1
         schema = {'type': 'string', 'minLength': minimum, 'maxLength': maximum}
         for i in range(self.repeat):
-            value = self.json_gen._string(schema)
+            value = self.generate(schema)
             self.assertEqual(len(value), 1)
 
     def test_pattern(self):
@@ -444,7 +452,7 @@ class TestString(Base):
             with self.subTest(f"matches {name} pattern "):
                 schema = {'type': 'string', 'pattern': regex}
                 for i in range(self.repeat):
-                    value = self.json_gen._string(schema)
+                    value = self.generate(schema)
                     self.assertRegex(value, regex)
 
     def test_pattern_within_range(self):
@@ -455,7 +463,7 @@ class TestString(Base):
             regex = self.regexs['email']
             schema = {'type': 'string', 'minLength': minimum, 'maxLength': maximum, 'pattern': regex}
             for i in range(self.repeat):
-                value = self.json_gen._string(schema)
+                value = self.generate(schema)
                 self.assertRegex(value, regex)
                 self.assertLessEqual(len(value), maximum)
                 self.assertGreaterEqual(len(value), minimum)
@@ -464,18 +472,18 @@ class TestString(Base):
 class TestArray(Base):
 
     def test_common(self):
-        self._test_common(self.json_gen._array, 'array')
+        self._test_common('array')
 
     def test_enums(self):
         schema = {'type': 'array', 'enum': [1, 2], 'minItems': 10, 'items': simple_integer}
-        value = self.json_gen._array(schema)
+        value = self.generate(schema)
         self.assertIn(1, value)
         self.assertIn(2, value)
 
     def test_unique_enums(self):
         schema = {'type': 'array', 'enum': [1, 2, 3], 'uniqueItems': True, 'minItems': 3,
                   'items': simple_integer}
-        value = self.json_gen._array(schema)
+        value = self.generate(schema)
         self.assertIn(1, value)
         self.assertIn(2, value)
 
@@ -484,12 +492,12 @@ class TestArray(Base):
 
     def test_items_is_schema(self):
         schema = {'type': 'array', 'items': simple_string}
-        value = self.json_gen._array(schema)
+        value = self.generate(schema)
         self.assertIn('ac', value)
 
     def test_items_is_array(self):
         schema = {'type': 'array', 'items': [simple_integer, simple_string]}
-        value = self.json_gen._array(schema)
+        value = self.generate(schema)
         self.assertEqual([123, 'ac'], value)
 
     def test_in_range(self):
@@ -497,28 +505,28 @@ class TestArray(Base):
             maximum = 3
             schema = {'type': 'array', 'maxItems': maximum, 'items': simple_string}
             for i in range(self.repeat):
-                self.assertLessEqual(len(self.json_gen._array(schema)), maximum)
+                self.assertLessEqual(len(self.generate(schema)), maximum)
 
         with self.subTest("with minItems"):
             minimum = 1
             schema = {'type': 'array', 'minItems': minimum, 'items': simple_string}
             for i in range(self.repeat):
-                self.assertGreaterEqual(len(self.json_gen._array(schema)), minimum)
+                self.assertGreaterEqual(len(self.generate(schema)), minimum)
 
         with self.subTest("with minItems and maxItems"):
             maximum = 3
             minimum = 1
             schema = {'type': 'array', 'minItems': minimum, 'maxItems': maximum, 'items': simple_string}
             for i in range(self.repeat):
-                self.assertLessEqual(len(self.json_gen._array(schema)), maximum)
-                self.assertGreaterEqual(len(self.json_gen._array(schema)), minimum)
+                self.assertLessEqual(len(self.generate(schema)), maximum)
+                self.assertGreaterEqual(len(self.generate(schema)), minimum)
 
         with self.subTest("minItems == maxItems"):
             maximum = 1
             minimum = 1
             schema = {'type': 'array', 'minItems': minimum, 'maxItems': maximum, 'items': simple_string}
             for i in range(self.repeat):
-                value = self.json_gen._array(schema)
+                value = self.generate(schema)
                 self.assertEqual(len(value), 1)
 
     def test_additionalItems(self):
@@ -528,14 +536,14 @@ class TestArray(Base):
             schema = {'type': 'array', 'maxItems': maximum, 'minItems': minimum,
                       'items': [simple_string, simple_string],
                       'additionalItems': simple_integer}
-            self.assertListEqual(self.json_gen._array(schema), ['ac', 'ac', 123, 123])
+            self.assertListEqual(self.generate(schema), ['ac', 'ac', 123, 123])
 
         with self.subTest("additionalItems is ignored when items is schema"):
             minimum = 3
             maximum = 3
             schema = {'type': 'array', 'maxItems': maximum, 'minItems': minimum, 'items': simple_string,
                       'additional_items': simple_integer}
-            self.assertListEqual(self.json_gen._array(schema), ['ac', 'ac', 'ac'])
+            self.assertListEqual(self.generate(schema), ['ac', 'ac', 'ac'])
 
     def test_contains(self):
         with self.subTest("TODO items as schema with contains"):
@@ -545,11 +553,50 @@ class TestArray(Base):
             pass
 
     def test_unique(self):
-        with self.subTest("TODO items as schema with unique items"):
-            pass
+        with self.subTest("items as schema with unique items"):
+            schema = {'type': 'array', 'uniqueItems': True, 'minItems': 50, 'maxItems': 50,
+                      'items': {'type': 'integer', 'minimum': 1, 'maximum': 50}}
+            for i in range(self.repeat):
+                self.assertListEqual(sorted(self.generate(schema)), list(range(1, 51)))
 
-        with self.subTest("TODO items as array of schema with unique items"):
-            pass
+        with self.subTest("items as array of schema with unique items"):
+            schema = {'type': 'array', 'uniqueItems': True,
+                      'items': [{'type': 'boolean'}, {'type': 'boolean'}]}
+            for i in range(self.repeat):
+                self.assertCountEqual(self.generate(schema), [True, False])
+
+        with self.subTest("enum items are sampled without replacement"):
+            schema = {'type': 'array', 'uniqueItems': True, 'minItems': 3, 'maxItems': 3,
+                      'items': {'type': 'string', 'enum': ['a', 'b', 'c']}}
+            for i in range(self.repeat):
+                self.assertCountEqual(self.generate(schema), ['a', 'b', 'c'])
+
+        with self.subTest("objects are compared by value"):
+            schema = {'type': 'array', 'uniqueItems': True, 'minItems': 20, 'maxItems': 20,
+                      'items': {'type': 'object', 'required': ['a'], 'additionalProperties': False,
+                                'properties': {'a': {'type': 'integer', 'minimum': 0, 'maximum': 1000}}}}
+            value = self.generate(schema)
+            self.assertEqual(len(value), 20)
+            self.assertEqual(len({item['a'] for item in value}), 20)
+
+        with self.subTest("minItems larger than the domain"):
+            schema = {'type': 'array', 'uniqueItems': True, 'minItems': 3, 'items': {'type': 'boolean'}}
+            self.assertRaises(ValueError, self.generate, schema)
+
+        with self.subTest("large domains are generated rather than counted or sampled"):
+            huge = {'type': 'integer', 'minimum': 0, 'maximum': 2 ** 64, 'multipleOf': 2}
+            self.assertEqual(item_domain(self.json_gen, huge), (2 ** 63 + 1, None))
+            self.assertEqual(item_domain(self.json_gen, dict(huge, minimum=2 ** 64 + 1))[0], 0)
+            self.assertEqual(item_domain(self.json_gen, {'type': 'string', 'maxLength': 20000}), (None, None))
+            value = self.generate({'type': 'array', 'uniqueItems': True, 'minItems': 10, 'maxItems': 10, 'items': huge})
+            self.assertEqual(len(set(value)), 10)
+
+        with self.subTest("compiled"):
+            schema = {'type': 'array', 'uniqueItems': True, 'minItems': 30, 'maxItems': 30,
+                      'items': {'type': 'number', 'minimum': 0, 'maximum': 3, 'multipleOf': 0.1}}
+            value = self.json_gen.compile(schema)()
+            self.assertEqual(len(value), 30)
+            self.assertEqual(len(set(value)), 30)
 
 
 class TestObject(Base):
@@ -564,12 +611,12 @@ class TestObject(Base):
 
     def test_properties(self):
         schema = {'type': 'object', 'properties': {'thing1': simple_string}}
-        value = self.json_gen._object(schema)
+        value = self.generate(schema)
         self.assertTrue(value.get('thing1'))
 
     def test_required(self):
         schema = {'type': 'object', 'required': self.properties.keys(), 'properties': self.properties}
-        value = self.json_gen._object(schema)
+        value = self.generate(schema)
         self.assertIsInstance(value.get('thing1'), str)
         self.assertIsInstance(value.get('thing2'), int)
         self.assertIsInstance(value.get('thing3'), list)
@@ -584,7 +631,7 @@ class TestObject(Base):
                       'properties': self.properties
                       }
             for i in range(self.repeat):
-                self.assertLessEqual(len(self.json_gen._object(schema)), maximum)
+                self.assertLessEqual(len(self.generate(schema)), maximum)
 
         with self.subTest("with minProperties"):
             minimum = 1
@@ -592,7 +639,7 @@ class TestObject(Base):
                       'properties': self.properties
                       }
             for i in range(self.repeat):
-                self.assertGreaterEqual(len(self.json_gen._object(schema)), minimum)
+                self.assertGreaterEqual(len(self.generate(schema)), minimum)
 
         with self.subTest("with minProperties and maxProperties"):
             maximum = 3
@@ -600,8 +647,8 @@ class TestObject(Base):
             schema = {'type': 'object', 'minProperties': minimum, 'maxProperties': maximum,
                       'properties': self.properties}
             for i in range(self.repeat):
-                self.assertLessEqual(len(self.json_gen._object(schema)), maximum)
-                self.assertGreaterEqual(len(self.json_gen._object(schema)), minimum)
+                self.assertLessEqual(len(self.generate(schema)), maximum)
+                self.assertGreaterEqual(len(self.generate(schema)), minimum)
 
         with self.subTest("minLength == maxProperties"):
             maximum = 1
@@ -609,7 +656,7 @@ class TestObject(Base):
             schema = {'type': 'object', 'minProperties': minimum, 'maxProperties': maximum,
                       'properties': self.properties}
             for i in range(self.repeat):
-                value = self.json_gen._object(schema)
+                value = self.generate(schema)
                 self.assertEqual(len(value), 1)
 
     def test_additionalProperties(self):
@@ -618,12 +665,12 @@ class TestObject(Base):
             minimum = 4
             schema = {'type': 'object', 'additionalProperties': True,
                       'minProperties': minimum, 'maxProperties': maximum}
-            value = self.json_gen._object(schema)
+            value = self.generate(schema)
             self.assertEqual(len(value), 4)
 
         with self.subTest("False"):
             schema = {'type': 'object', 'properties': {'thing1': simple_string}, 'additionalProperties': False}
-            value = self.json_gen._object(schema)
+            value = self.generate(schema)
             self.assertTrue(value.get('thing1'))
             self.assertEqual(len(value), 1)
 
@@ -632,7 +679,7 @@ class TestObject(Base):
             regex = r'[^.]+'
             expected_regex = r'[^.]+'
             schema = {'type': 'object', 'patternProperties': {regex: simple_integer}}
-            value = self.json_gen._object(schema)
+            value = self.generate(schema)
             for key, item in value.items():
                 self.assertRegex(key, expected_regex)
                 self.assertEqual(item, 123)
@@ -641,7 +688,7 @@ class TestObject(Base):
             regex = '12...[^.]'
             expected_regex = '12\.\.\.[^.]'
             schema = {'type': 'object', 'patternProperties': {regex: simple_integer}}
-            value = self.json_gen._object(schema)
+            value = self.generate(schema)
             for key, item in value.items():
                 self.assertRegex(key, expected_regex)
                 self.assertEqual(item, 123)
@@ -709,6 +756,53 @@ class TestJsonGenerator(Base):
             self.assertTrue(len(keys.difference({"firstName", "lastName", "sport"})) != len(
                 keys.difference({"vehicle", "price"})))
 
+    def test_effective_schemas(self):
+        schema = {'type': 'object',
+                  'properties': {'thing1': simple_string},
+                  'oneOf': [{'properties': {'thing2': simple_integer}, 'required': ['thing2']},
+                            {'properties': {'thing3': simple_float}, 'required': ['thing3']},
+                            {'properties': {'thing4': simple_bool}, 'required': ['thing4']}]}
+        original = json.loads(json.dumps(schema))
+        effective = self.json_gen._effective_schemas(schema)
+        with self.subTest("one effective schema per branch"):
+            self.assertEqual([sorted(s['properties']) for s in effective],
+                             [['thing1', 'thing2'], ['thing1', 'thing3'], ['thing1', 'thing4']])
+        with self.subTest("effective schemas are cached"):
+            self.assertIs(self.json_gen._effective_schemas(schema), effective)
+        with self.subTest("the schema is not modified"):
+            for i in range(self.repeat):
+                self.json_gen.generate_json(schema)
+            self.assertEqual(schema, original)
+
+    def test_bounded_caches(self):
+        class SmallCaches(JsonGenerator):
+            CACHE_SIZE = EFFECTIVE_CACHE_SIZE = 8
+
+        json_gen = SmallCaches()
+        for i in range(50):
+            json_gen.generate_json({'type': 'integer', 'anyOf': [{'minimum': i}, {'maximum': i}]})
+        for cache in (json_gen._fingerprints, json_gen._plans, json_gen._validators, json_gen._effective_cache):
+            self.assertEqual(len(cache), 8)
+        schema = {'type': 'object', 'properties': {'thing1': simple_string}}
+        with mock.patch.object(json_gen, 'compile', wraps=json_gen.compile) as compiled:
+            for i in range(5):
+                json_gen.generate_json(schema)
+            # an equal schema shares the plan of the first
+            self.assertIs(json_gen._plan(json.loads(json.dumps(schema))), json_gen._plan(schema))
+            self.assertEqual(compiled.call_count, 1)
+
+    def test_modified_schema(self):
+        json_gen = JsonGenerator(validation='always', strict=True)
+        schema = {'type': 'object', 'required': ['a'], 'additionalProperties': False,
+                  'properties': {'a': {'type': 'integer', 'anyOf': [{'minimum': 0, 'maximum': 5}]}}}
+        self.assertLessEqual(json_gen.generate_json(schema)['a'], 5)
+        schema['properties']['a']['anyOf'][0].update(minimum=10, maximum=15)
+        schema['properties']['b'] = {'type': 'string', 'enum': ['b']}
+        schema['required'].append('b')
+        for i in range(10):
+            self.assertEqual(json_gen.generate_json(schema)['b'], 'b')
+            self.assertGreaterEqual(json_gen.compile(schema)()['a'], 10)
+
     def test_anyOf(self):
         schema = {'type': 'object',
                   'anyOf': [{'properties': {'thing1': simple_string}},
@@ -728,5 +822,253 @@ class TestJsonGenerator(Base):
             assertItemType('thing3', float)
 
 
+class TestCompile(Base):
+    repeat = 200
+    schema = {'type': 'object',
+              'required': ['name', 'count', 'tags', 'person'],
+              'properties': {'name': {'type': 'string', 'minLength': 2, 'maxLength': 8},
+                             'count': {'type': 'integer', 'minimum': 10, 'maximum': 25, 'multipleOf': 5},
+                             'ratio': {'type': 'number', 'minimum': 0, 'maximum': 1},
+                             'flag': simple_bool,
+                             'kind': {'type': 'string', 'enum': ['a', 'b', 'c']},
+                             'tags': {'type': 'array', 'items': {'type': 'string', 'pattern': '^[a-z]{3}$'},
+                                      'minItems': 1, 'maxItems': 4, 'uniqueItems': True},
+                             'person': {'$ref': '#/definitions/person'}},
+              'patternProperties': {'^x-[0-9]{2}$': simple_integer},
+              'additionalProperties': False,
+              'definitions': {'person': {
+                  'type': 'object',
+                  'oneOf': [{'properties': {'firstName': {'type': 'string'}}, 'required': ['firstName']},
+                            {'properties': {'vehicle': {'type': 'string'}}, 'additionalProperties': False}]}}}
+
+    def setUp(self):
+        self.json_gen = JsonGenerator(resolver=RefResolver.from_schema(self.schema))
+
+    def test_plan_is_valid(self):
+        plan = self.json_gen.compile(self.schema)
+        validator = Draft4Validator(self.schema)
+        for i in range(self.repeat):
+            validator.validate(plan())
+
+    def test_plan_outcomes(self):
+        """the plan generates every combination of anyOf and oneOf branches"""
+        schema = {'type': 'object',
+                  'anyOf': [{'properties': {'thing1': simple_string}, 'required': ['thing1']},
+                            {'properties': {'thing2': simple_integer}, 'required': ['thing2']}],
+                  'oneOf': [{'properties': {'thing3': simple_float}, 'required': ['thing3']},
+                            {'properties': {'thing4': simple_bool}, 'required': ['thing4']}]}
+        plan = self.json_gen.compile(schema)
+        planned = {tuple(sorted(plan().keys())) for i in range(self.repeat)}
+        self.assertEqual(planned, {('thing1', 'thing3'), ('thing1', 'thing4'), ('thing2', 'thing3'),
+                                   ('thing2', 'thing4')})
+
+    def test_recursive_ref(self):
+        schema = {'definitions': {'node': {'type': 'object',
+                                           'properties': {'child': {'$ref': '#/definitions/node'}},
+                                           'maxProperties': 1}},
+                  '$ref': '#/definitions/node'}
+        json_gen = JsonGenerator(resolver=RefResolver.from_schema(schema))
+        plan = json_gen.compile(schema)
+        self.assertIs(plan.root.target.properties[0][1], plan.root)
+
+    def test_enums_not_mutated(self):
+        enums = [1, 2, 3, 4]
+        schema = {'type': 'array', 'items': simple_integer, 'enum': enums, 'uniqueItems': True, 'minItems': 4,
+                  'maxItems': 4}
+        plan = self.json_gen.compile(schema)
+        for i in range(10):
+            self.assertCountEqual(plan(), enums)
+        self.assertEqual(enums, [1, 2, 3, 4])
+
+    def test_invalid_multiple_of(self):
+        with self.assertRaises(ValueError):
+            self.json_gen.compile({'type': 'integer', 'multipleOf': 0})
+
+
+class TestLimits(unittest.TestCase):
+    linked_list = {'definitions': {'node': {'type': 'object', 'required': ['value'], 'additionalProperties': False,
+                                            'properties': {'value': simple_integer,
+                                                           'next': {'$ref': '#/definitions/node'}}}},
+                   '$ref': '#/definitions/node'}
+
+    @staticmethod
+    def depth(value):
+        depth = 0
+        while isinstance(value, dict) and 'next' in value:
+            value, depth = value['next'], depth + 1
+        return depth
+
+    def json_gen(self, schema, **kwargs):
+        return JsonGenerator(resolver=RefResolver.from_schema(schema), seed=0, **kwargs)
+
+    def test_max_depth(self):
+        json_gen = self.json_gen(self.linked_list, max_depth=5)
+        for i in range(20):
+            self.assertLessEqual(self.depth(json_gen.generate_json(self.linked_list)), 5)
+
+    def test_no_max_depth_by_default(self):
+        # a chain 40 objects deep where each object may have an extra property
+        schema = {'type': 'integer'}
+        for i in range(40):
+            schema = {'type': 'object', 'required': ['next'], 'additionalProperties': False,
+                      'properties': {'next': schema, 'extra': simple_integer}}
+        json_gen = self.json_gen(schema)
+        self.assertIsNone(json_gen.max_depth)
+        value = json_gen.generate_json(schema)
+        extras = []
+        while isinstance(value, dict):
+            extras.append('extra' in value)
+            value = value['next']
+        self.assertEqual(len(extras), 40)
+        self.assertTrue(any(extras[32:]))
+        pruned = self.json_gen(schema, max_depth=32).generate_json(schema)
+        for i in range(32):
+            pruned = pruned['next']
+        self.assertNotIn('extra', pruned)
+
+    def test_deeper_than_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 2
+        node = plan.Const(1)
+        for i in range(depth):
+            node = plan.Object(random.Random(0), [('next', node)], [], [], False, 1, 1, 64, None, [])
+        self.assertEqual(self.depth(plan.run(node, plan.Limits())), depth)
+
+    def test_max_nodes(self):
+        schema = {'type': 'array', 'minItems': 50, 'maxItems': 50,
+                  'items': {'type': 'array', 'minItems': 2, 'maxItems': 50, 'items': simple_integer}}
+        json_gen = self.json_gen(schema, max_nodes=60)
+        for i in range(20):
+            value = json_gen.generate_json(schema)
+            # the budget is checked before each inner array, which then gets at most 49 items
+            self.assertLessEqual(sum(len(items) for items in value), 60 + 49 + 2 * 50)
+            self.assertEqual(len(value[-1]), 2)
+
+    def test_required_recursion(self):
+        schema = {'definitions': {'node': {'type': 'object', 'required': ['next'],
+                                           'properties': {'next': {'$ref': '#/definitions/node'}}}},
+                  '$ref': '#/definitions/node'}
+        with self.assertRaises(ValueError):
+            self.json_gen(schema, max_depth=5).generate_json(schema)
+
+    def test_optional_recursion(self):
+        # pruned containers only get the minProperties and minItems the schema declares
+        optional = {'type': 'object', 'additionalProperties': False, 'properties': {'child': {'$ref': '#'}}}
+        tree = {'type': 'object', 'required': ['children'], 'additionalProperties': False,
+                'properties': {'children': {'type': 'array', 'maxItems': 3, 'items': {'$ref': '#'}}}}
+        for schema, child in ((optional, 'child'), (tree, 'children')):
+            with self.subTest(child=child):
+                json_gen = self.json_gen(schema, max_depth=4)
+                for target_bytes in (None, 10000):
+                    for i in range(10):
+                        value, depth = json_gen.generate_json(schema, target_bytes), 0
+                        while value.get(child) or value.get(child) == {}:
+                            value = value[child][0] if child == 'children' else value[child]
+                            depth += 1
+                        self.assertLessEqual(depth, 5)
+
+
+class TestTargetBytes(unittest.TestCase):
+    schema = {'type': 'object', 'required': ['id', 'events'],
+              'properties': {'id': {'type': 'string', 'pattern': '^[a-f0-9]{8}$'},
+                             'note': {'type': 'string'},
+                             'events': {'type': 'array', 'items': {
+                                 'type': 'object', 'required': ['at'],
+                                 'properties': {'at': {'type': 'integer', 'minimum': 0},
+                                                'kind': {'type': 'string', 'enum': ['a', 'bb', 'ccc']},
+                                                'text': {'type': 'string', 'maxLength': 40}}}}}}
+
+    def setUp(self):
+        self.json_gen = JsonGenerator(resolver=RefResolver.from_schema(self.schema), seed=0)
+
+    def test_target_bytes(self):
+        for target in (1000, 100000, '1MB'):
+            with self.subTest(target=target):
+                for i in range(3):
+                    size = len(json.dumps(self.json_gen.generate_json(self.schema, target_bytes=target)))
+                    self.assertAlmostEqual(size, plan.parse_size(target), delta=plan.parse_size(target) * 0.05)
+
+    def test_bounded(self):
+        schema = {'type': 'array', 'maxItems': 3, 'items': {'type': 'string', 'maxLength': 5}}
+        for i in range(10):
+            value = self.json_gen.generate_json(schema, target_bytes=10000)
+            self.assertEqual(len(value), 3)
+            self.assertTrue(all(len(item) == 5 for item in value))
+
+    def test_small_target(self):
+        # the required properties are always generated, however small the target
+        value = self.json_gen.generate_json(self.schema, target_bytes=10)
+        self.assertEqual(sorted(value), ['events', 'id'])
+        self.assertEqual(len(value['events']), 1)
+
+    def test_recursive(self):
+        schema = TestLimits.linked_list
+        json_gen = JsonGenerator(resolver=RefResolver.from_schema(schema), seed=0, max_depth=10)
+        for i in range(5):
+            self.assertLessEqual(TestLimits.depth(json_gen.generate_json(schema, target_bytes=100000)), 10)
+
+    def test_seeded(self):
+        first = JsonGenerator(resolver=RefResolver.from_schema(self.schema), seed=1)
+        second = JsonGenerator(resolver=RefResolver.from_schema(self.schema), seed=1)
+        self.assertEqual(first.generate_json(self.schema, target_bytes=5000),
+                         second.generate_json(self.schema, target_bytes=5000))
+
+    def test_parse_size(self):
+        self.assertEqual(plan.parse_size(512), 512)
+        self.assertEqual(plan.parse_size('1KB'), 1000)
+        self.assertEqual(plan.parse_size('100 KiB'), 102400)
+        self.assertEqual(plan.parse_size('1.5mb'), 1500000)
+        with self.assertRaises(ValueError):
+            plan.parse_size('big')
+
+
+class TestGenerateMany(Base):
+    schema = {'type': 'object', 'required': ['thing1', 'thing2'], 'properties': {'thing1': simple_string,
+                                                                                 'thing2': simple_integer}}
+
+    def test_generate_many(self):
+        documents = self.json_gen.generate_many(self.schema, 50)
+        self.assertNotIsInstance(documents, list)
+        documents = list(documents)
+        self.assertEqual(len(documents), 50)
+        for document in documents:
+            self.assertEqual(document['thing1'], 'ac')
+            self.assertEqual(document['thing2'], 123)
+
+    def test_schema_checked_once(self):
+        with mock.patch.object(Draft4Validator, 'check_schema', wraps=Draft4Validator.check_schema) as check_schema:
+            list(self.json_gen.generate_many(self.schema, 10))
+        self.assertEqual(check_schema.call_count, 1)
+
+    def test_iter_json(self):
+        documents = self.json_gen.iter_json(self.schema)
+        for i in range(10):
+            self.assertIsInstance(next(documents), dict)
+
+    def test_invalid_schema(self):
+        with self.assertRaises(SchemaError):
+            self.json_gen.iter_json({'type': 'object', 'minProperties': 'one'})
+
+
+class TestMerge(unittest.TestCase):
+
+    def test_update(self):
+        target = {'required': ['b', 'a'], 'enum': [{'x': 1}], 'minLength': 1, 'maxLength': 10}
+        _update(target, {'required': ['c', 'a'], 'enum': [{'x': 1}, {'y': 2}], 'minLength': 3, 'maxLength': 5})
+        self.assertEqual(target, {'required': ['b', 'a', 'c'], 'enum': [{'x': 1}, {'y': 2}], 'minLength': 3,
+                                  'maxLength': 5})
+
+    def test_symmetric_difference(self):
+        provided = {'required': ['a', 'b', 'c'], 'enum': [{'x': 1}, {'y': 2}], 'properties': {'a': {}, 'd': {}}}
+        chosen = {'required': ['b'], 'enum': [{'x': 1.0}], 'properties': {'a': {}}}
+        self.assertEqual(_symmetric_difference(provided, chosen),
+                         {'required': ['a', 'c'], 'enum': [{'y': 2}], 'properties': {'a': {}, 'd': {}}})
+        self.assertEqual(provided['required'], ['a', 'b', 'c'])
+
+    def test_remove(self):
+        target = {'required': ['a', 'b', 'c'], 'properties': {'a': {}, 'b': {}, 'c': {}}, 'enum': [[1], [2]]}
+        _remove(target, {'required': ['b'], 'enum': [[1]]})
+        self.assertEqual(target, {'required': ['a', 'c'], 'properties': {'a': {}, 'c': {}}, 'enum': [[2]]})
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import json
+import os
+import random
+import sys
+import unittest
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen.generator import JsonGenerator
+from jsongen.parallel import document_seed
+
+schema = {'type': 'object',
+          'required': ['name', 'count', 'tags'],
+          'properties': {'name': {'type': 'string', 'maxLength': 12},
+                         'count': {'type': 'integer', 'minimum': 0},
+                         'ratio': {'type': 'number'},
+                         'id': {'type': 'string', 'pattern': '^[a-f0-9]{8}$'},
+                         'tags': {'type': 'array', 'items': {'type': 'string', 'enum': ['a', 'b', 'c']}}},
+          'additionalProperties': True}
+
+
+class TestParallel(unittest.TestCase):
+    n = 40
+
+    def setUp(self):
+        self.json_gen = JsonGenerator()
+
+    def _generate(self, workers, seed=7, chunk_size=None):
+        documents = self.json_gen.generate_parallel(schema, self.n, workers=workers, seed=seed, chunk_size=chunk_size)
+        return json.dumps(list(documents))
+
+    def test_same_output_for_any_worker_count(self):
+        expected = self._generate(1)
+        for workers, chunk_size in [(2, None), (3, 1), (4, 7)]:
+            with self.subTest(workers=workers, chunk_size=chunk_size):
+                self.assertEqual(self._generate(workers, chunk_size=chunk_size), expected)
+
+    def test_seed_changes_output(self):
+        self.assertNotEqual(self._generate(2, seed=1), self._generate(2, seed=2))
+
+    def test_stats(self):
+        self._generate(2)
+        self.assertEqual(self.json_gen.stats['documents'], self.n)
+        self.assertEqual(self.json_gen.stats['validated'], self.n)
+
+    def test_validation_across_chunks(self):
+        for workers, chunk_size in [(1, None), (2, 5), (3, 1)]:
+            with self.subTest(workers=workers, chunk_size=chunk_size):
+                json_gen = JsonGenerator(validation='first(8)')
+                json_gen.generate_json(schema)
+                list(json_gen.generate_parallel(schema, self.n, workers=workers, seed=1, chunk_size=chunk_size))
+                self.assertEqual(json_gen.stats['documents'], self.n + 1)
+                self.assertEqual(json_gen.stats['validated'], 8)
+
+    def test_sample_across_workers(self):
+        def validated(workers, chunk_size):
+            json_gen = JsonGenerator(validation='sample(0.5)')
+            list(json_gen.generate_parallel(schema, self.n, workers=workers, seed=1, chunk_size=chunk_size))
+            return json_gen.stats['validated']
+
+        expected = validated(1, None)
+        self.assertTrue(0 < expected < self.n)
+        for workers, chunk_size in [(2, 5), (4, 3)]:
+            with self.subTest(workers=workers, chunk_size=chunk_size):
+                self.assertEqual(validated(workers, chunk_size), expected)
+
+    def test_generate_at(self):
+        documents = list(self.json_gen.generate_parallel(schema, self.n, workers=2, seed=7))
+        for index in [0, 13, self.n - 1]:
+            with self.subTest(index):
+                self.assertEqual(self.json_gen.generate_at(schema, index, 7), documents[index])
+
+    def test_seeded_generator(self):
+        """generators with the same seed generate the same documents"""
+        first, second = JsonGenerator(seed=5), JsonGenerator(seed=5)
+        for i in range(5):
+            self.assertEqual(json.dumps(first.generate_json(schema)), json.dumps(second.generate_json(schema)))
+        self.assertEqual(json.dumps(first.compile(schema)()), json.dumps(second.compile(schema)()))
+
+    def test_global_random_untouched(self):
+        state = random.getstate()
+        self.json_gen.generate_json(schema)
+        self.json_gen.generate_at(schema, 3, 7)
+        self.assertEqual(random.getstate(), state)
+
+    def test_document_seed(self):
+        self.assertEqual(document_seed(1, 2), document_seed(1, 2))
+        self.assertNotEqual(document_seed(1, 2), document_seed(2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+from random import Random
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen.generator import JsonGenerator
+from jsongen.pool import PoolPolicy, ValuePool
+
+schema = {'type': 'object',
+          'required': ['email', 'created', 'name', 'label'],
+          'properties': {'email': {'type': 'string', 'format': 'email'},
+                         'created': {'type': 'string', 'format': 'date-time'},
+                         'name': {'type': 'string', 'fake': 'name'},
+                         'label': {'type': 'string', 'maxLength': 8}}}
+other_schema = {'type': 'object', 'required': ['contact'],
+                'properties': {'contact': {'type': 'string', 'format': 'email'}}}
+
+
+class TestValuePool(unittest.TestCase):
+
+    def test_static(self):
+        counter = iter(range(100))
+        pool = ValuePool(lambda: next(counter), Random(0), PoolPolicy(10))
+        self.assertEqual(pool.values, list(range(10)))
+        self.assertTrue({pool() for _ in range(200)} <= set(range(10)))
+        self.assertEqual(next(counter), 10)
+
+    def test_refresh(self):
+        for background in (False, True):
+            with self.subTest(background=background):
+                counter = iter(range(100))
+                pool = ValuePool(lambda: next(counter), Random(0), PoolPolicy(10, refresh=5, background=background))
+                self.assertTrue({pool() for _ in range(5)} <= set(range(10)))
+                self.assertTrue({pool() for _ in range(5)} <= set(range(10, 20)))
+                self.assertTrue({pool() for _ in range(5)} <= set(range(20, 30)))
+
+    def test_policy(self):
+        self.assertIsNone(PoolPolicy.parse(None))
+        policy = PoolPolicy(5, providers=['email'])
+        self.assertIs(PoolPolicy.parse(policy), policy)
+        self.assertEqual(PoolPolicy.parse(64).size, 64)
+        self.assertTrue(policy.covers('email'))
+        self.assertFalse(policy.covers('name'))
+        with self.assertRaises(ValueError):
+            PoolPolicy(0)
+        with self.assertRaises(ValueError):
+            PoolPolicy(5, refresh=0)
+
+
+class TestPools(unittest.TestCase):
+    repeat = 200
+
+    def generate(self, json_gen, schema=schema):
+        return [json_gen.generate_json(schema) for _ in range(self.repeat)]
+
+    def test_pooled(self):
+        json_gen = JsonGenerator(seed=0, pools=16)
+        documents = self.generate(json_gen)
+        for key in ('email', 'created', 'name'):
+            self.assertLessEqual(len({document[key] for document in documents}), 16)
+        self.assertGreater(len({document['label'] for document in documents}), 16)
+        self.assertEqual(json_gen.stats['invalid'], 0)
+
+    def test_fast_backend(self):
+        json_gen = JsonGenerator(seed=0, backend='fast', pools=16)
+        self.assertLessEqual(len({document['created'] for document in self.generate(json_gen)}), 16)
+
+    def test_providers(self):
+        json_gen = JsonGenerator(seed=0, pools=PoolPolicy(16, providers=['email']))
+        documents = self.generate(json_gen)
+        self.assertLessEqual(len({document['email'] for document in documents}), 16)
+        self.assertGreater(len({document['name'] for document in documents}), 16)
+
+    def test_reproducible(self):
+        first, second = JsonGenerator(seed=3, pools=16), JsonGenerator(seed=3, pools=16)
+        # pools don't depend on which schema is compiled first
+        second.generate_json(other_schema)
+        second._seed(5)
+        first._seed(5)
+        self.assertEqual(self.generate(second), self.generate(first))
+        self.assertNotEqual(self.generate(JsonGenerator(seed=4, pools=16)),
+                            self.generate(JsonGenerator(seed=3, pools=16)))
+
+    def test_refresh(self):
+        json_gen = JsonGenerator(seed=0, pools=PoolPolicy(16, refresh=32))
+        self.assertGreater(len({document['email'] for document in self.generate(json_gen)}), 16)
+        background = JsonGenerator(seed=0, pools=PoolPolicy(16, refresh=32, background=True))
+        synchronous = JsonGenerator(seed=0, pools=PoolPolicy(16, refresh=32))
+        self.assertEqual(self.generate(background), self.generate(synchronous))
+
+
+if __name__ == "__main__":
+    unittest.main()
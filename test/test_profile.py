@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+import unittest
+
+from jsonschema import RefResolver
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen.generator import JsonGenerator
+from jsongen.profile import pointer
+
+schema = {'type': 'object',
+          'required': ['name', 'tags', 'person'],
+          'additionalProperties': False,
+          'properties': {'name': {'type': 'string', 'pattern': '^[a-z]{5}$'},
+                         'tags': {'type': 'array', 'uniqueItems': True, 'minItems': 3, 'maxItems': 5,
+                                  'items': {'type': 'string', 'pattern': '^[ab]{2}$'}},
+                         'person': {'$ref': '#/definitions/person'}},
+          'definitions': {'person': {'type': 'object', 'required': ['age'], 'additionalProperties': False,
+                                     'properties': {'age': {'type': 'integer', 'minimum': 0, 'maximum': 99}}}}}
+
+
+class TestProfiler(unittest.TestCase):
+    repeat = 50
+
+    def setUp(self):
+        self.json_gen = JsonGenerator(resolver=RefResolver.from_schema(schema), seed=0, profile=True)
+        for i in range(self.repeat):
+            self.json_gen.generate_json(schema)
+        self.paths = self.json_gen.profiler.paths
+
+    def test_paths(self):
+        self.assertEqual(set(self.paths), {'#', '#/properties/name', '#/properties/tags', '#/properties/tags/items',
+                                           '#/properties/person', '#/definitions/person',
+                                           '#/definitions/person/properties/age'})
+        for path in ('#', '#/properties/name', '#/properties/person', '#/definitions/person/properties/age'):
+            self.assertEqual(self.paths[path].calls, self.repeat)
+
+    def test_times(self):
+        root = self.paths['#']
+        self.assertGreater(root.cumulative, 0)
+        self.assertLessEqual(root.self_time, root.cumulative)
+        self.assertAlmostEqual(sum(stats.self_time for stats in self.paths.values()), root.cumulative, delta=1e-3)
+        name = self.paths['#/properties/name']
+        self.assertEqual(name.pattern_time, name.cumulative)
+        self.assertEqual(root.pattern_time, 0)
+
+    def test_retries_and_bytes(self):
+        self.assertGreater(self.paths['#/properties/tags'].retries, 0)
+        self.assertEqual(self.paths['#/properties/tags/items'].retries, 0)
+        self.assertEqual(self.paths['#/properties/name'].bytes, self.repeat * len('"abcde"'))
+        self.assertEqual(self.paths['#/properties/tags/items'].bytes, self.paths['#/properties/tags/items'].calls * 4)
+
+    def test_reports(self):
+        profiler = self.json_gen.profiler
+        table = profiler.table(sort_by='calls').splitlines()
+        self.assertTrue(table[0].startswith('path'))
+        self.assertEqual(len(table), len(self.paths) + 1)
+        calls = [int(line.split()[1]) for line in table[1:]]
+        self.assertEqual(calls, sorted(calls, reverse=True))
+        self.assertEqual(len(profiler.table(limit=2).splitlines()), 3)
+        self.assertEqual(json.loads(profiler.to_json())['#/properties/name']['calls'], self.repeat)
+        with self.assertRaises(ValueError):
+            profiler.table(sort_by='path')
+
+    def test_off_by_default(self):
+        self.assertIsNone(JsonGenerator().profiler)
+
+    def test_pointer(self):
+        self.assertEqual(pointer(['', 'properties', 'a/b', 'items', 0]), '#/properties/a~1b/items/0')
+        self.assertEqual(pointer(['http://example.com/a.json#/definitions/x', 'items']),
+                         'http://example.com/a.json#/definitions/x/items')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen import serialize
+from jsongen.serialize import Json, Orjson, Serializer
+
+document = {'name': 'é"\n', 'count': 3, 'ratio': -0.25, 'flag': True, 'none': None, 'tags': ['a', {'b': []}]}
+
+
+class TestSerializer(unittest.TestCase):
+
+    def test_json(self):
+        serializer = Serializer.parse('json')
+        self.assertIsInstance(serializer, Json)
+        self.assertEqual(serializer.dumps(document), json.dumps(document))
+        self.assertEqual(serializer.dumpb(document), json.dumps(document).encode('ascii'))
+
+    @unittest.skipIf(serialize.orjson is None, "orjson is not installed")
+    def test_orjson(self):
+        serializer = Serializer.parse('orjson')
+        self.assertIsInstance(serializer, Orjson)
+        self.assertIsInstance(Serializer.parse('auto'), Orjson)
+        for value in (document, {'big': [2 ** 70, 'é']}):
+            with self.subTest(value=value):
+                self.assertEqual(json.loads(serializer.dumpb(value)), value)
+                self.assertEqual(json.loads(serializer.dumps(value)), value)
+        self.assertEqual(serializer.dumpb({'big': [2 ** 70, 'é']}), '{"big":[1180591620717411303424,"é"]}'.encode())
+
+    def test_without_orjson(self):
+        with mock.patch.object(serialize, 'orjson', None):
+            self.assertIsInstance(Serializer.parse('auto'), Json)
+            with self.assertRaises(ImportError):
+                Serializer.parse('orjson')
+
+    def test_parse(self):
+        serializer = Json()
+        self.assertIs(Serializer.parse(serializer), serializer)
+        with self.assertRaises(ValueError):
+            Serializer.parse('pickle')
+
+
+if __name__ == "__main__":
+    unittest.main()
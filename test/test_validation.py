@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+from jsonschema import Draft4Validator, ValidationError
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen.generator import JsonGenerator
+from jsongen.validation import ValidationPolicy, Always, Never, Sample, First
+
+schema = {'type': 'object', 'required': ['thing1'], 'properties': {'thing1': {'type': 'string', 'enum': ['ac']}}}
+# additionalProperties are not generated from their schema, so documents with them fail validation
+invalid_schema = {'type': 'object', 'minProperties': 2, 'maxProperties': 2, 'additionalProperties': {'type': 'null'}}
+
+
+class TestValidationPolicy(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertIsInstance(ValidationPolicy.parse('always'), Always)
+        self.assertIsInstance(ValidationPolicy.parse('never'), Never)
+        self.assertEqual(ValidationPolicy.parse('sample(0.25)').rate, 0.25)
+        self.assertEqual(ValidationPolicy.parse('first( 10 )').n, 10)
+        policy = First(3)
+        self.assertIs(ValidationPolicy.parse(policy), policy)
+        for spec in ['sometimes', 'sample', 'first()', 'always(1)']:
+            with self.subTest(spec):
+                with self.assertRaises(ValueError):
+                    ValidationPolicy.parse(spec)
+
+    def test_sample(self):
+        policy = Sample(0.5, seed=1)
+        validated = sum(policy.should_validate(i) for i in range(1000))
+        self.assertTrue(400 < validated < 600)
+        with self.assertRaises(ValueError):
+            Sample(1.5)
+
+    def test_first(self):
+        policy = First(3)
+        self.assertEqual([policy.should_validate(i) for i in range(5)], [True, True, True, False, False])
+
+
+class TestGeneratorValidation(unittest.TestCase):
+
+    def test_never(self):
+        json_gen = JsonGenerator(validation='never')
+        with mock.patch.object(Draft4Validator, 'validate') as validate:
+            for i in range(10):
+                json_gen.generate_json(schema)
+        validate.assert_not_called()
+        self.assertEqual(json_gen.stats['documents'], 10)
+        self.assertEqual(json_gen.stats['validated'], 0)
+
+    def test_first(self):
+        json_gen = JsonGenerator(validation='first(3)')
+        list(json_gen.generate_many(schema, 10))
+        self.assertEqual(json_gen.stats['documents'], 10)
+        self.assertEqual(json_gen.stats['validated'], 3)
+
+    def test_validator_cached(self):
+        json_gen = JsonGenerator()
+        with mock.patch.object(Draft4Validator, 'check_schema') as check_schema:
+            for i in range(10):
+                json_gen.generate_json(dict(schema))
+        self.assertEqual(check_schema.call_count, 1)
+
+    def test_strict(self):
+        json_gen = JsonGenerator()
+        with self.assertRaises(ValidationError):
+            json_gen.generate_json(invalid_schema)
+        self.assertEqual(json_gen.stats['invalid'], 1)
+
+    def test_not_strict(self):
+        json_gen = JsonGenerator(strict=False)
+        with self.assertLogs('jsongen.generator', 'WARNING'):
+            for i in range(5):
+                json_gen.generate_json(invalid_schema)
+        self.assertEqual(json_gen.stats['invalid'], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
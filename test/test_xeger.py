@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+import os
+import random
+import re
+import sys
+import unittest
+
+pkg_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))  # noqa
+sys.path.insert(0, pkg_root)  # noqa
+
+from jsongen.xeger import compile_pattern
+
+
+class TestXeger(unittest.TestCase):
+    repeat = 200
+    patterns = [r'^[0-9]{2}\.[A-Za-z]{4}\.[0-9a-z]{3}$',
+                r'^(\([0-9]{3}\))?[0-9]{3}-[0-9]{4}$',
+                r'[A-Za-z][0-9A-Za-z.]*@[A-Za-z][0-9A-Za-z]{,4}\.[A-Za-z][0-9A-Za-z]{,4}',
+                r'^(SRR|ERR|DRR)\d+$',
+                r'^[^\s,]+$',
+                r'^\w+-\W\S\D$',
+                r'^(?:ab|cd)+?x{2,}$',
+                r'^(?P<word>[a-z]{3})-(?P=word)$',
+                r'^(a)?(?(1)b|c)$',
+                r'^.{5}[^abc]$',
+                r'^https?://[a-z.]+(/\S*)?$',
+                r'^[à-ÿ]{3}$']
+
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def test_matches(self):
+        for pattern in self.patterns:
+            with self.subTest(pattern):
+                sample = compile_pattern(pattern, 16)
+                for i in range(self.repeat):
+                    value = sample(self.rng)
+                    self.assertRegex(value, pattern)
+
+    def test_max_repeat(self):
+        for max_repeat in [0, 3, 16]:
+            with self.subTest(max_repeat):
+                sample = compile_pattern('^a+b*$', max_repeat)
+                for i in range(self.repeat):
+                    value = sample(self.rng)
+                    self.assertLessEqual(value.count('a'), 1 + max_repeat)
+                    self.assertLessEqual(value.count('b'), max_repeat)
+
+    def test_lengths(self):
+        for pattern in self.patterns:
+            with self.subTest(pattern):
+                sample = compile_pattern(pattern, 16)
+                expected, maximum = sample.lengths()
+                lengths = [len(sample(self.rng)) for i in range(self.repeat)]
+                self.assertLessEqual(max(lengths), maximum)
+                self.assertAlmostEqual(sum(lengths) / len(lengths), expected, delta=expected * 0.2 + 1)
+        self.assertEqual(compile_pattern('^p[0-9]{4}$', 16).lengths(), (5.0, 5))
+
+    def test_cached(self):
+        self.assertIs(compile_pattern('^[a-z]+$', 16), compile_pattern('^[a-z]+$', 16))
+        self.assertIsNot(compile_pattern('^[a-z]+$', 16), compile_pattern('^[a-z]+$', 8))
+
+    def test_seeded(self):
+        sample = compile_pattern(self.patterns[2], 16)
+        self.assertEqual([sample(random.Random(1)) for i in range(5)], [sample(random.Random(1)) for i in range(5)])
+
+    def test_invalid(self):
+        with self.assertRaises(re.error):
+            compile_pattern('[a-', 16)
+
+
+if __name__ == "__main__":
+    unittest.main()